@@ -1,6 +1,6 @@
 from flask import Flask, render_template, redirect, url_for, request, flash
 from flask_login import LoginManager, login_user, logout_user, login_required
-from models import db, User, Volunteer, Evaluation, Role, Event
+from models import db, User, Volunteer, Role, Event
 from config import Config
 from routes.evaluation_routes import evaluation_bp
 from routes.dashboard_routes import dashboard_bp
@@ -271,21 +271,44 @@ def list_events():
     print(f'Total: {len(events)} events')
 
 @app.cli.command()
-def generate_evaluation_id():
-    """Generate next evaluation ID"""
-    last_eval = Evaluation.query.order_by(Evaluation.id.desc()).first()
+def rebuild_rollups():
+    """Rebuild volunteer score rollups from all evaluations"""
+    from utils.rollups import rebuild_rollups as rebuild
     
-    if last_eval:
-        # Extract number from last evaluation_id
-        last_num = int(last_eval.evaluation_id.split('-')[1])
-        next_num = last_num + 1
-    else:
-        next_num = 1
+    count = rebuild()
+    print(f'Rebuilt score rollups for {count} volunteers')
+
+@app.cli.command()
+def rebuild_daily_stats():
+    """Rebuild daily evaluation stat buckets from all evaluations"""
+    from utils.daily_stats import rebuild_daily_stats as rebuild
     
-    next_id = f'EVAL-{next_num:05d}'
+    count = rebuild()
+    print(f'Rebuilt {count} daily stat buckets')
+
+@app.cli.command()
+def generate_evaluation_id():
+    """Show the next evaluation ID the allocator will hand out"""
+    from utils.id_allocator import format_evaluation_id, peek_next_evaluation_number
+    
+    next_id = format_evaluation_id(peek_next_evaluation_number())
     print(f'Next evaluation ID: {next_id}')
     return next_id
 
+@app.cli.command()
+def flush_submission_queue():
+    """Store every queued write-behind submission now"""
+    from utils.submission_queue import flush_submissions, get_queue_status
+    
+    total = 0
+    while True:
+        claimed = flush_submissions(app)
+        if not claimed:
+            break
+        total += claimed
+    status = get_queue_status(app)
+    print(f'Processed {total} queued submissions ({status["failed"]} failed)')
+
 if __name__ == '__main__':
     with app.app_context():
         db.create_all()  # Ensure tables exist
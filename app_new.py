@@ -2,7 +2,11 @@ from flask import Flask, render_template, redirect, url_for, flash, request, sen
 from flask_login import LoginManager, login_user, logout_user, current_user
 from models import db, User
 from config import Config
-from sqlalchemy import text
+from utils.cache import analytics_cache, fragment_cache
+from utils.roster import roster_cache
+from utils.live_feed import live_feed
+from utils.compression import init_compression
+from sqlalchemy import text, inspect
 import os
 
 def create_app():
@@ -18,6 +22,15 @@ def create_app():
     # Initialize database
     db.init_app(app)
     
+    # Initialize analytics result and dashboard fragment caches
+    analytics_cache.init_app(app)
+    fragment_cache.init_app(app)
+    roster_cache.init_app(app)
+    live_feed.init_app(app)
+    
+    # gzip/deflate responses for clients that accept it
+    init_compression(app)
+    
     # Initialize login manager
     login_manager = LoginManager()
     login_manager.init_app(app)
@@ -45,6 +58,40 @@ def create_app():
                 """))
                 conn.commit()
         
+        # Score rollups created before the work-again counts need the columns
+        # and a recount (see migrations/013_add_work_again_counts_to_rollups.sql)
+        rollup_columns = {c['name'] for c in inspect(engine).get_columns('volunteer_score_rollups')}
+        missing_columns = [c for c in ('work_again_yes_count', 'work_again_maybe_count', 'work_again_no_count')
+                           if c not in rollup_columns]
+        if missing_columns:
+            with engine.begin() as conn:
+                for column in missing_columns:
+                    conn.execute(text(
+                        f'ALTER TABLE volunteer_score_rollups ADD COLUMN {column} INTEGER NOT NULL DEFAULT 0'
+                    ))
+        
+        # Backfill score rollups and daily stats for databases that predate them
+        from models import Evaluation, VolunteerScoreRollup, EvaluationDailyStats
+        from utils.rollups import rebuild_rollups
+        from utils.daily_stats import rebuild_daily_stats
+        if Evaluation.query.count() > 0:
+            if missing_columns or VolunteerScoreRollup.query.count() == 0:
+                rebuild_rollups()
+            if EvaluationDailyStats.query.count() == 0:
+                rebuild_daily_stats()
+        
+        # Version row used for ETag/Last-Modified on dashboard and API responses
+        from utils.conditional import ensure_data_version
+        ensure_data_version()
+        
+        # Evaluation ID sequence (PostgreSQL) or counter row (SQLite)
+        from utils.id_allocator import ensure_evaluation_counter
+        ensure_evaluation_counter()
+        
+        # Unique index behind duplicate evaluation detection
+        from utils.submissions import ensure_submission_index
+        ensure_submission_index()
+        
         # Create default admin user if none exists
         if User.query.count() == 0:
             admin = User(username='admin', role='admin')
@@ -53,6 +100,11 @@ def create_app():
             db.session.commit()
             print("Created default admin user - username: admin, password: changeme123")
     
+    # Background flusher for write-behind form submissions
+    from utils.submission_queue import start_flusher
+    if app.config.get('SUBMISSION_QUEUE_ENABLED'):
+        start_flusher(app)
+    
     # Register blueprints
     from routes.evaluation_routes import evaluation_bp
     from routes.dashboard_routes import dashboard_bp
@@ -18,3 +18,49 @@ class Config:
     # Application settings
     EVALUATIONS_PER_PAGE = 50
     MAX_CONTENT_LENGTH = 16 * 1024 * 1024  # 16MB max file size
+    
+    # Evaluation IDs reserved per worker process at a time (1 = allocate per submission)
+    EVALUATION_ID_BLOCK_SIZE = int(os.environ.get('EVALUATION_ID_BLOCK_SIZE', 1))
+    
+    # Analytics result cache (per worker process)
+    ANALYTICS_CACHE_ENABLED = True
+    ANALYTICS_CACHE_MAX_ENTRIES = int(os.environ.get('ANALYTICS_CACHE_MAX_ENTRIES', 512))
+    ANALYTICS_CACHE_TTL = int(os.environ.get('ANALYTICS_CACHE_TTL', 300))  # seconds
+    
+    # Rendered dashboard panel cache (per worker process)
+    FRAGMENT_CACHE_ENABLED = True
+    FRAGMENT_CACHE_MAX_ENTRIES = int(os.environ.get('FRAGMENT_CACHE_MAX_ENTRIES', 64))
+    FRAGMENT_CACHE_TTL = int(os.environ.get('FRAGMENT_CACHE_TTL', 300))  # seconds
+    
+    # Active-volunteer roster for the public evaluation form (per worker process)
+    ROSTER_CACHE_ENABLED = True
+    ROSTER_CACHE_TTL = int(os.environ.get('ROSTER_CACHE_TTL', 300))  # seconds
+    
+    # gzip/deflate response compression
+    COMPRESSION_ENABLED = True
+    COMPRESSION_MIN_SIZE = 500  # bytes; smaller responses are sent as-is
+    COMPRESSION_LEVEL = 6
+    
+    # ETag/Last-Modified handling on dashboard and API responses
+    CONDITIONAL_RESPONSES_ENABLED = True
+    
+    # Live dashboard feed (server-sent events)
+    LIVE_FEED_HEARTBEAT_INTERVAL = 15  # seconds between keep-alive comments
+    LIVE_FEED_MAX_DURATION = 30 * 60  # seconds before a stream is closed and the browser reconnects
+    LIVE_FEED_MAX_SUBSCRIBERS = 4  # streams per worker; keep below gunicorn --threads (see Procfile)
+    LIVE_FEED_SYNC_INTERVAL = 5  # seconds between checks for other workers' changes
+    
+    # Write-behind submission queue: the public form journals submissions to a
+    # local SQLite file and a background thread per worker commits them in
+    # batches. Needs a persistent disk for SUBMISSION_QUEUE_PATH.
+    SUBMISSION_QUEUE_ENABLED = os.environ.get('SUBMISSION_QUEUE_ENABLED', '').lower() in ('1', 'true', 'yes')
+    SUBMISSION_QUEUE_PATH = os.environ.get('SUBMISSION_QUEUE_PATH') or 'instance/submission_queue.db'  # relative to app root
+    SUBMISSION_QUEUE_BATCH_SIZE = 50
+    SUBMISSION_QUEUE_FLUSH_INTERVAL = 1.0  # seconds between checks when idle
+    SUBMISSION_QUEUE_CLAIM_TIMEOUT = 5 * 60  # seconds before another worker retries a claimed batch
+    SUBMISSION_QUEUE_MAX_ATTEMPTS = 5
+    
+    # Background export jobs
+    EXPORT_ARTIFACTS_DIR = os.environ.get('EXPORT_ARTIFACTS_DIR') or 'exports'  # relative to app root
+    EXPORT_JOB_WORKERS = int(os.environ.get('EXPORT_JOB_WORKERS', 2))
+    EXPORT_ARTIFACT_MAX_AGE = 24 * 60 * 60  # seconds
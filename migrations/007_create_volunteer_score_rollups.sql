@@ -0,0 +1,27 @@
+-- Migration: Create volunteer score rollups table
+-- Description: Per-volunteer running sums/counts of each rating metric so
+--              average scores are a primary-key lookup instead of a scan of
+--              the evaluations table. Populate with: flask rebuild-rollups
+-- Created: 2026-10-18
+
+CREATE TABLE IF NOT EXISTS volunteer_score_rollups (
+    volunteer_id INTEGER PRIMARY KEY REFERENCES volunteers(id) ON DELETE CASCADE,
+    evaluation_count INTEGER NOT NULL DEFAULT 0,
+    reliability_sum INTEGER NOT NULL DEFAULT 0,
+    reliability_count INTEGER NOT NULL DEFAULT 0,
+    quality_of_work_sum INTEGER NOT NULL DEFAULT 0,
+    quality_of_work_count INTEGER NOT NULL DEFAULT 0,
+    initiative_sum INTEGER NOT NULL DEFAULT 0,
+    initiative_count INTEGER NOT NULL DEFAULT 0,
+    teamwork_sum INTEGER NOT NULL DEFAULT 0,
+    teamwork_count INTEGER NOT NULL DEFAULT 0,
+    communication_sum INTEGER NOT NULL DEFAULT 0,
+    communication_count INTEGER NOT NULL DEFAULT 0,
+    models_the_work_sum INTEGER NOT NULL DEFAULT 0,
+    models_the_work_count INTEGER NOT NULL DEFAULT 0,
+    enthusiasm_to_serve_again_sum INTEGER NOT NULL DEFAULT 0,
+    enthusiasm_to_serve_again_count INTEGER NOT NULL DEFAULT 0,
+    overall_average REAL,  -- Mean of the 5 core category averages
+    last_evaluation_date DATE,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
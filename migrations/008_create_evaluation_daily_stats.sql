@@ -0,0 +1,27 @@
+-- Migration: Create evaluation daily stats table
+-- Description: Per-day evaluation totals (by submission date and by
+--              evaluation date) backing the windowed /dashboard/api/stats
+--              endpoint. Populate with: flask rebuild-daily-stats
+-- Created: 2026-10-18
+
+CREATE TABLE IF NOT EXISTS evaluation_daily_stats (
+    basis VARCHAR(20) NOT NULL,  -- 'submitted' or 'evaluation'
+    day DATE NOT NULL,
+    evaluation_count INTEGER NOT NULL DEFAULT 0,
+    reliability_sum INTEGER NOT NULL DEFAULT 0,
+    reliability_count INTEGER NOT NULL DEFAULT 0,
+    quality_of_work_sum INTEGER NOT NULL DEFAULT 0,
+    quality_of_work_count INTEGER NOT NULL DEFAULT 0,
+    initiative_sum INTEGER NOT NULL DEFAULT 0,
+    initiative_count INTEGER NOT NULL DEFAULT 0,
+    teamwork_sum INTEGER NOT NULL DEFAULT 0,
+    teamwork_count INTEGER NOT NULL DEFAULT 0,
+    communication_sum INTEGER NOT NULL DEFAULT 0,
+    communication_count INTEGER NOT NULL DEFAULT 0,
+    overall_sum REAL NOT NULL DEFAULT 0,
+    overall_count INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (basis, day)
+);
+
+-- Range lookups on submission time (bucket refreshes, recent evaluations)
+CREATE INDEX IF NOT EXISTS ix_evaluations_submitted_at ON evaluations(submitted_at);
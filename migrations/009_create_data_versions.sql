@@ -0,0 +1,14 @@
+-- Migration: Create data versions table
+-- Description: Single-row counter bumped whenever volunteers, evaluations,
+--              events, roles or users change; used for ETag/Last-Modified
+--              on dashboard and API responses
+-- Created: 2026-10-18
+
+CREATE TABLE IF NOT EXISTS data_versions (
+    name VARCHAR(50) PRIMARY KEY,
+    version INTEGER NOT NULL DEFAULT 0,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+INSERT INTO data_versions (name, version) SELECT 'data', 0
+WHERE NOT EXISTS (SELECT 1 FROM data_versions WHERE name = 'data');
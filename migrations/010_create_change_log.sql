@@ -0,0 +1,13 @@
+-- Migration: Create change log table
+-- Description: Append-only log of inserts, updates and deletes of volunteers,
+--              evaluations, events and roles, written in the same transaction
+--              as the change; backs the /api/changes delta sync endpoint
+-- Created: 2026-10-18
+
+CREATE TABLE IF NOT EXISTS change_log (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    entity VARCHAR(20) NOT NULL,  -- volunteer, evaluation, event, role
+    entity_id INTEGER NOT NULL,
+    operation VARCHAR(10) NOT NULL,  -- insert, update, delete
+    changed_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
@@ -0,0 +1,15 @@
+-- Migration: Create id counters table
+-- Description: Counter used to allocate EVAL-xxxxx evaluation ids with an
+--              atomic increment instead of reading the last evaluation.
+--              PostgreSQL uses the evaluation_number_seq sequence instead,
+--              which the app creates at startup.
+-- Created: 2026-10-18
+
+CREATE TABLE IF NOT EXISTS id_counters (
+    name VARCHAR(50) PRIMARY KEY,
+    value INTEGER NOT NULL DEFAULT 0  -- last number handed out
+);
+
+INSERT INTO id_counters (name, value)
+SELECT 'evaluation', COALESCE(MAX(id), 0) FROM evaluations
+WHERE NOT EXISTS (SELECT 1 FROM id_counters WHERE name = 'evaluation');
@@ -0,0 +1,22 @@
+-- Migration: Add unique index for duplicate evaluation detection
+-- Description: One evaluation per volunteer, evaluator, event and date, with
+--              evaluator and event names compared trimmed and case-insensitively
+--              (a missing name counts as '').
+--              Submissions insert with ON CONFLICT against this index instead
+--              of checking for a duplicate first.
+-- Created: 2026-10-18
+--
+-- Creating the index fails if duplicates already exist. List them with:
+--   SELECT volunteer_id, lower(trim(coalesce(evaluator_name, ''))), lower(trim(coalesce(event_name, ''))),
+--          evaluation_date, COUNT(*)
+--   FROM evaluations
+--   GROUP BY 1, 2, 3, 4
+--   HAVING COUNT(*) > 1;
+-- Until the index exists the app falls back to checking before inserting.
+
+CREATE UNIQUE INDEX IF NOT EXISTS uq_evaluations_submission ON evaluations (
+    volunteer_id,
+    lower(trim(coalesce(evaluator_name, ''))),
+    lower(trim(coalesce(event_name, ''))),
+    evaluation_date
+);
@@ -0,0 +1,10 @@
+-- Migration: Add work-again counts to volunteer score rollups
+-- Description: Number of evaluations answering Yes / Maybe / No to "would you
+--              work with this person again", so the profile reads them from
+--              the rollup instead of the evaluations. Recount with:
+--              flask rebuild-rollups (app_new does both on startup)
+-- Created: 2026-10-18
+
+ALTER TABLE volunteer_score_rollups ADD COLUMN work_again_yes_count INTEGER NOT NULL DEFAULT 0;
+ALTER TABLE volunteer_score_rollups ADD COLUMN work_again_maybe_count INTEGER NOT NULL DEFAULT 0;
+ALTER TABLE volunteer_score_rollups ADD COLUMN work_again_no_count INTEGER NOT NULL DEFAULT 0;
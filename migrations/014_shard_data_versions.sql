@@ -0,0 +1,14 @@
+-- Migration: Shard the data version counter
+-- Description: Adds rows data:1 .. data:7 next to the original 'data' row.
+--              Each writing transaction bumps one of the 8 at random and the
+--              version is their sum, so concurrent writers no longer queue
+--              on a single row lock (app_new also adds them on startup)
+-- Created: 2026-10-18
+
+INSERT INTO data_versions (name, version) SELECT 'data:1', 0 WHERE NOT EXISTS (SELECT 1 FROM data_versions WHERE name = 'data:1');
+INSERT INTO data_versions (name, version) SELECT 'data:2', 0 WHERE NOT EXISTS (SELECT 1 FROM data_versions WHERE name = 'data:2');
+INSERT INTO data_versions (name, version) SELECT 'data:3', 0 WHERE NOT EXISTS (SELECT 1 FROM data_versions WHERE name = 'data:3');
+INSERT INTO data_versions (name, version) SELECT 'data:4', 0 WHERE NOT EXISTS (SELECT 1 FROM data_versions WHERE name = 'data:4');
+INSERT INTO data_versions (name, version) SELECT 'data:5', 0 WHERE NOT EXISTS (SELECT 1 FROM data_versions WHERE name = 'data:5');
+INSERT INTO data_versions (name, version) SELECT 'data:6', 0 WHERE NOT EXISTS (SELECT 1 FROM data_versions WHERE name = 'data:6');
+INSERT INTO data_versions (name, version) SELECT 'data:7', 0 WHERE NOT EXISTS (SELECT 1 FROM data_versions WHERE name = 'data:7');
@@ -1,6 +1,8 @@
 from datetime import datetime
 from flask_login import UserMixin
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import func, literal_column
+from sqlalchemy.orm import joinedload, selectinload
 from werkzeug.security import generate_password_hash, check_password_hash
 
 db = SQLAlchemy()
@@ -87,19 +89,15 @@ class Volunteer(db.Model):
         self.preferred_roles = json.dumps(role_ids) if role_ids else None
     
     def get_average_scores(self):
-        """Calculate average scores across all evaluations"""
-        if not self.evaluations or self.evaluations.count() == 0:
-            return None
-        
-        metrics = ['reliability', 'quality_of_work', 'initiative', 'teamwork', 'communication']
-        averages = {}
-        
-        for metric in metrics:
-            scores = [getattr(e, metric) for e in self.evaluations if getattr(e, metric)]
-            averages[metric] = round(sum(scores) / len(scores), 1) if scores else 0
-        
-        averages['overall'] = round(sum(averages.values()) / len(metrics), 1)
-        return averages
+        """Average scores across all evaluations (read from the score rollup)"""
+        rollup = db.session.get(VolunteerScoreRollup, self.id)
+        if not rollup:
+            # Evaluations written outside the app have no rollup row yet
+            from utils.rollups import compute_volunteer_rollup
+            rollup = compute_volunteer_rollup(self.id)
+            if not rollup:
+                return None
+        return rollup.get_average_scores()
 
 
 class Event(db.Model):
@@ -158,22 +156,56 @@ class Evaluation(db.Model):
     evaluator_name = db.Column(db.String(100))
     evaluator_email = db.Column(db.String(120))
     evaluator_role = db.Column(db.String(100))
-    submitted_at = db.Column(db.DateTime, default=datetime.utcnow)
+    submitted_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
     
     def __repr__(self):
         return f'<Evaluation {self.evaluation_id}>'
     
+    @classmethod
+    def related_loader_options(cls):
+        """Loader options for rendering lists of evaluations without a query per row"""
+        return (
+            joinedload(cls.volunteer),
+            selectinload(cls.role),
+            selectinload(cls.event)
+        )
+    
     def get_overall_score(self):
         """Calculate overall score from all metrics"""
-        scores = [
+        return self.overall_from_scores([
             self.reliability,
             self.quality_of_work,
             self.initiative,
             self.teamwork,
             self.communication
-        ]
+        ])
+    
+    @staticmethod
+    def overall_from_scores(scores):
+        """Overall score from the 5 core ratings (ignores missing ones)"""
         valid_scores = [s for s in scores if s is not None]
         return round(sum(valid_scores) / len(valid_scores), 1) if valid_scores else 0
+    
+    @classmethod
+    def submission_key(cls):
+        """Columns identifying one evaluator's evaluation of a volunteer at an event on a date
+
+        Evaluator and event names are compared trimmed and case-insensitively,
+        with a missing name counting as ''. Used both by the unique index and
+        as the ON CONFLICT target.
+        """
+        return [
+            cls.volunteer_id,
+            func.lower(func.trim(func.coalesce(cls.evaluator_name, literal_column("''")))),
+            func.lower(func.trim(func.coalesce(cls.event_name, literal_column("''")))),
+            cls.evaluation_date
+        ]
+
+
+# One evaluation per volunteer, evaluator, event and date
+evaluation_submission_index = db.Index(
+    'uq_evaluations_submission', *Evaluation.submission_key(), unique=True
+)
 
 
 class Role(db.Model):
@@ -208,3 +240,159 @@ class EvaluationPeriod(db.Model):
     
     def __repr__(self):
         return f'<EvaluationPeriod {self.name}>'
+
+
+class VolunteerScoreRollup(db.Model):
+    """Running per-volunteer score totals, maintained as evaluations are added/removed"""
+    __tablename__ = 'volunteer_score_rollups'
+    
+    # All integer rating metrics tracked by the rollup
+    METRICS = ['reliability', 'quality_of_work', 'initiative', 'teamwork', 'communication',
+               'models_the_work', 'enthusiasm_to_serve_again']
+    # The 5 core categories averaged into the overall score
+    CORE_METRICS = ['reliability', 'quality_of_work', 'initiative', 'teamwork', 'communication']
+    # would_work_again answers counted, by how the answer starts ("Maybe / With Reservations")
+    WORK_AGAIN_ANSWERS = {'Yes': 'work_again_yes_count', 'Maybe': 'work_again_maybe_count',
+                          'No': 'work_again_no_count'}
+    
+    volunteer_id = db.Column(db.Integer, db.ForeignKey('volunteers.id', ondelete='CASCADE'), primary_key=True)
+    evaluation_count = db.Column(db.Integer, nullable=False, default=0)
+    
+    # Sum and number of given ratings per metric (empty and 0 are not counted)
+    reliability_sum = db.Column(db.Integer, nullable=False, default=0)
+    reliability_count = db.Column(db.Integer, nullable=False, default=0)
+    quality_of_work_sum = db.Column(db.Integer, nullable=False, default=0)
+    quality_of_work_count = db.Column(db.Integer, nullable=False, default=0)
+    initiative_sum = db.Column(db.Integer, nullable=False, default=0)
+    initiative_count = db.Column(db.Integer, nullable=False, default=0)
+    teamwork_sum = db.Column(db.Integer, nullable=False, default=0)
+    teamwork_count = db.Column(db.Integer, nullable=False, default=0)
+    communication_sum = db.Column(db.Integer, nullable=False, default=0)
+    communication_count = db.Column(db.Integer, nullable=False, default=0)
+    models_the_work_sum = db.Column(db.Integer, nullable=False, default=0)
+    models_the_work_count = db.Column(db.Integer, nullable=False, default=0)
+    enthusiasm_to_serve_again_sum = db.Column(db.Integer, nullable=False, default=0)
+    enthusiasm_to_serve_again_count = db.Column(db.Integer, nullable=False, default=0)
+    
+    # Number of evaluations per would_work_again answer
+    work_again_yes_count = db.Column(db.Integer, nullable=False, default=0)
+    work_again_maybe_count = db.Column(db.Integer, nullable=False, default=0)
+    work_again_no_count = db.Column(db.Integer, nullable=False, default=0)
+    
+    overall_average = db.Column(db.Float)  # Mean of the 5 core category averages
+    last_evaluation_date = db.Column(db.Date)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    def __repr__(self):
+        return f'<VolunteerScoreRollup {self.volunteer_id}>'
+    
+    def get_metric_average(self, metric):
+        """Average for a single metric, or None if it has never been rated"""
+        count = getattr(self, f'{metric}_count')
+        if not count:
+            return None
+        return getattr(self, f'{metric}_sum') / count
+    
+    def get_average_scores(self):
+        """Averages in the same shape as Volunteer.get_average_scores"""
+        if not self.evaluation_count:
+            return None
+        
+        averages = {}
+        for metric in self.CORE_METRICS:
+            avg = self.get_metric_average(metric)
+            averages[metric] = round(avg, 1) if avg is not None else 0
+        
+        averages['overall'] = round(sum(averages.values()) / len(self.CORE_METRICS), 1)
+        return averages
+    
+    def get_work_again_summary(self):
+        """{'Yes': n, 'Maybe': n, 'No': n} counts of would_work_again answers"""
+        return {answer: getattr(self, column) or 0 for answer, column in self.WORK_AGAIN_ANSWERS.items()}
+
+
+class EvaluationDailyStats(db.Model):
+    """Per-day evaluation totals used for windowed dashboard statistics"""
+    __tablename__ = 'evaluation_daily_stats'
+    
+    # Date an evaluation is bucketed by: 'submitted' (submitted_at) or
+    # 'evaluation' (evaluation_date, falling back to date_of_service)
+    BASES = ['submitted', 'evaluation']
+    CORE_METRICS = ['reliability', 'quality_of_work', 'initiative', 'teamwork', 'communication']
+    
+    basis = db.Column(db.String(20), primary_key=True)
+    day = db.Column(db.Date, primary_key=True)
+    evaluation_count = db.Column(db.Integer, nullable=False, default=0)
+    
+    reliability_sum = db.Column(db.Integer, nullable=False, default=0)
+    reliability_count = db.Column(db.Integer, nullable=False, default=0)
+    quality_of_work_sum = db.Column(db.Integer, nullable=False, default=0)
+    quality_of_work_count = db.Column(db.Integer, nullable=False, default=0)
+    initiative_sum = db.Column(db.Integer, nullable=False, default=0)
+    initiative_count = db.Column(db.Integer, nullable=False, default=0)
+    teamwork_sum = db.Column(db.Integer, nullable=False, default=0)
+    teamwork_count = db.Column(db.Integer, nullable=False, default=0)
+    communication_sum = db.Column(db.Integer, nullable=False, default=0)
+    communication_count = db.Column(db.Integer, nullable=False, default=0)
+    
+    # Sum/count of each evaluation's overall rating (mean of the 5 core categories)
+    overall_sum = db.Column(db.Float, nullable=False, default=0)
+    overall_count = db.Column(db.Integer, nullable=False, default=0)
+    
+    def __repr__(self):
+        return f'<EvaluationDailyStats {self.basis} {self.day}>'
+
+
+class DataVersion(db.Model):
+    """Counter bumped in every transaction that changes app data
+
+    Split over several rows (shards) whose versions add up to the data
+    version; see utils/conditional.py. Used as a cheap validator for HTTP
+    conditional responses (ETag / Last-Modified) that is consistent across
+    worker processes.
+    """
+    __tablename__ = 'data_versions'
+    
+    name = db.Column(db.String(50), primary_key=True)
+    version = db.Column(db.Integer, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    def __repr__(self):
+        return f'<DataVersion {self.name}={self.version}>'
+
+
+class ChangeLog(db.Model):
+    """One row per insert/update/delete of a volunteer, evaluation, event or role
+
+    Rows are appended when the changing transaction commits, in commit
+    order, so the autoincrement id orders them and serves as the
+    /api/changes cursor (see utils/change_log.py).
+    """
+    __tablename__ = 'change_log'
+    
+    ENTITIES = ['volunteer', 'evaluation', 'event', 'role']
+    OPERATIONS = ['insert', 'update', 'delete']
+    
+    id = db.Column(db.Integer, primary_key=True)
+    entity = db.Column(db.String(20), nullable=False)
+    entity_id = db.Column(db.Integer, nullable=False)
+    operation = db.Column(db.String(10), nullable=False)
+    changed_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    
+    def __repr__(self):
+        return f'<ChangeLog {self.id} {self.operation} {self.entity} {self.entity_id}>'
+
+
+class IdCounter(db.Model):
+    """Named counters for allocating human-readable ids (e.g. EVAL-00001)
+
+    Used where the database has no sequences (SQLite); PostgreSQL uses a
+    real sequence instead.
+    """
+    __tablename__ = 'id_counters'
+    
+    name = db.Column(db.String(50), primary_key=True)
+    value = db.Column(db.Integer, nullable=False, default=0)  # Last number handed out
+    
+    def __repr__(self):
+        return f'<IdCounter {self.name}={self.value}>'
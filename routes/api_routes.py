@@ -1,122 +1,415 @@
-from flask import Blueprint, jsonify, request
+from flask import Blueprint, jsonify, request, url_for, Response, stream_with_context
 from flask_login import login_required
-from models import db, Volunteer, Evaluation
+from models import db, Volunteer, Evaluation, VolunteerScoreRollup, ChangeLog
+from utils.conditional import register_conditional_responses
+from utils.export import (
+    parse_export_filters, apply_evaluation_filters, parse_since, stream_rows, iter_ndjson
+)
+from utils.pagination import encode_cursor, decode_cursor, keyset_condition
+from utils.analytics import OVERALL_METRICS
+from utils.ingest import parse_ingest_body, ingest_evaluations
+from utils.aggregate import parse_aggregate_request, run_aggregate
+from utils.change_log import get_changes_since, get_latest_change_id
+from utils.roster import search_volunteers, parse_search_limit
+from sqlalchemy import func
 from datetime import datetime
 
 api_bp = Blueprint('api', __name__, url_prefix='/api')
 
+# Answer unchanged GETs with 304 before running the view
+register_conditional_responses(api_bp, html=False)
+
+# Columns the evaluations list can project, by source key
+EVALUATION_COLUMNS = {
+    'id': Evaluation.id,
+    'evaluation_id': Evaluation.evaluation_id,
+    'volunteer_id': Evaluation.volunteer_id,
+    'first_name': Volunteer.first_name,
+    'last_name': Volunteer.last_name,
+    'evaluator_name': Evaluation.evaluator_name,
+    'event_name': Evaluation.event_name,
+    'role_performed': Evaluation.role_performed,
+    'reliability': Evaluation.reliability,
+    'quality_of_work': Evaluation.quality_of_work,
+    'initiative': Evaluation.initiative,
+    'teamwork': Evaluation.teamwork,
+    'communication': Evaluation.communication,
+    'evaluation_date': Evaluation.evaluation_date,
+    'submitted_at': Evaluation.submitted_at
+}
+
+def _isoformat(value):
+    return value.isoformat() if value else None
+
+# Response field -> (source columns, value from the projected row)
+EVALUATION_FIELDS = {
+    'id': (['id'], lambda r: r.id),
+    'evaluation_id': (['evaluation_id'], lambda r: r.evaluation_id),
+    'volunteer_id': (['volunteer_id'], lambda r: r.volunteer_id),
+    'volunteer_name': (['first_name', 'last_name'], lambda r: f'{r.first_name} {r.last_name}'),
+    'evaluator_name': (['evaluator_name'], lambda r: r.evaluator_name),
+    'event_name': (['event_name'], lambda r: r.event_name),
+    'role_performed': (['role_performed'], lambda r: r.role_performed),
+    'overall_rating': (OVERALL_METRICS, lambda r: Evaluation.overall_from_scores(
+        [getattr(r, m) for m in OVERALL_METRICS])),
+    'reliability_rating': (['reliability'], lambda r: r.reliability),
+    'communication_rating': (['communication'], lambda r: r.communication),
+    'teamwork_rating': (['teamwork'], lambda r: r.teamwork),
+    'initiative_rating': (['initiative'], lambda r: r.initiative),
+    'quality_rating': (['quality_of_work'], lambda r: r.quality_of_work),
+    'evaluation_date': (['evaluation_date'], lambda r: _isoformat(r.evaluation_date)),
+    'created_at': (['submitted_at'], lambda r: _isoformat(r.submitted_at))
+}
+
+MAX_PAGE_SIZE = 500
+
+def _evaluation_projection(fields):
+    """Query selecting only the columns behind fields, plus the sort key"""
+    sources = ['submitted_at', 'id']
+    for field in fields:
+        sources.extend(s for s in EVALUATION_FIELDS[field][0] if s not in sources)
+    query = db.session.query(*[EVALUATION_COLUMNS[s].label(s) for s in sources])
+    if 'first_name' in sources:
+        query = query.join(Volunteer, Volunteer.id == Evaluation.volunteer_id)
+    return query
+
+def _parse_fields(value):
+    """Requested response fields (all of them if not given)"""
+    if not value:
+        return list(EVALUATION_FIELDS)
+    fields = [f.strip() for f in value.split(',') if f.strip()]
+    unknown = [f for f in fields if f not in EVALUATION_FIELDS]
+    if unknown or not fields:
+        raise ValueError(f'Unknown fields: {", ".join(unknown)} (available: {", ".join(EVALUATION_FIELDS)})')
+    return fields
+
 @api_bp.route('/volunteers', methods=['GET'])
 @login_required
 def get_volunteers():
     """Get all volunteers with optional filtering"""
     status = request.args.get('status')
-    department = request.args.get('department')
     
-    query = Volunteer.query
+    # Scores come from the rollup table in the same query
+    query = db.session.query(Volunteer, VolunteerScoreRollup).outerjoin(
+        VolunteerScoreRollup, VolunteerScoreRollup.volunteer_id == Volunteer.id
+    )
     
     if status:
-        query = query.filter_by(status=status)
-    if department:
-        query = query.filter_by(department=department)
+        query = query.filter(Volunteer.status == status)
     
-    volunteers = query.all()
+    rows = query.order_by(Volunteer.last_name, Volunteer.first_name).all()
     
     return jsonify([{
         'id': v.id,
-        'name': v.name,
+        'name': v.full_name,
         'email': v.email,
-        'department': v.department,
-        'role': v.role,
         'status': v.status,
-        'average_rating': v.average_rating,
-        'evaluation_count': v.evaluation_count
-    } for v in volunteers])
+        'average_rating': round(rollup.overall_average, 2) if rollup and rollup.overall_average is not None else None,
+        'evaluation_count': rollup.evaluation_count if rollup else 0
+    } for v, rollup in rows])
+
+@api_bp.route('/volunteers/search', methods=['GET'])
+@login_required
+def search_volunteer_names():
+    """Typeahead: volunteers whose first, last or full name starts with ?q=
+
+    Served from the in-memory name index (utils.roster), best matches
+    first. ?status= restricts to one status; ?limit= defaults to 10.
+    """
+    try:
+        limit = parse_search_limit(request.args.get('limit'))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    status = request.args.get('status') or None
+    return jsonify(search_volunteers(request.args.get('q', ''), limit, status))
+
+MAX_BATCH_IDS = 1000
+
+def _parse_ids(values):
+    """Unique volunteer ids, in request order, from a list of ints/strings"""
+    ids = []
+    for value in values:
+        for part in str(value).split(','):
+            part = part.strip()
+            if not part:
+                continue
+            try:
+                volunteer_id = int(part)
+            except ValueError:
+                raise ValueError(f'Invalid volunteer id "{part}"')
+            if volunteer_id not in ids:
+                ids.append(volunteer_id)
+    if not ids:
+        raise ValueError('No volunteer ids given')
+    if len(ids) > MAX_BATCH_IDS:
+        raise ValueError(f'At most {MAX_BATCH_IDS} volunteer ids can be requested at once')
+    return ids
+
+def _aggregate_stats(volunteer_ids):
+    """Rollup-shaped stats computed from evaluations, for volunteers without a rollup"""
+    metrics = VolunteerScoreRollup.CORE_METRICS
+    rows = db.session.query(
+        Evaluation.volunteer_id,
+        func.count(Evaluation.id),
+        func.max(func.coalesce(Evaluation.evaluation_date, Evaluation.date_of_service)),
+        *[func.avg(getattr(Evaluation, m)) for m in metrics]
+    ).filter(Evaluation.volunteer_id.in_(volunteer_ids)).group_by(Evaluation.volunteer_id).all()
+    
+    stats = {}
+    for volunteer_id, count, last_date, *averages in rows:
+        scores = {m: round(float(avg), 1) if avg is not None else 0 for m, avg in zip(metrics, averages)}
+        overall = sum(float(avg or 0) for avg in averages) / len(metrics)
+        scores['overall'] = round(sum(scores.values()) / len(metrics), 1)
+        stats[volunteer_id] = (count, overall, last_date, scores)
+    return stats
+
+@api_bp.route('/volunteers/batch', methods=['GET', 'POST'])
+@login_required
+def get_volunteers_batch():
+    """Many volunteers with their score stats in a constant number of queries
+
+    GET: ?ids=1,2,3 (or repeated ids=). POST: JSON {"ids": [...]} or a bare
+    list, for long lists. Volunteers are returned in request order; unknown
+    ids are listed under not_found.
+    """
+    try:
+        if request.method == 'POST':
+            payload = request.get_json(silent=True)
+            values = payload.get('ids') if isinstance(payload, dict) else payload
+            if not isinstance(values, list):
+                raise ValueError('Expected a JSON list of ids or {"ids": [...]}')
+        else:
+            values = request.args.getlist('ids')
+        ids = _parse_ids(values)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    # Volunteers and their rollups - one IN-filtered query
+    rows = db.session.query(Volunteer, VolunteerScoreRollup).outerjoin(
+        VolunteerScoreRollup, VolunteerScoreRollup.volunteer_id == Volunteer.id
+    ).filter(Volunteer.id.in_(ids)).all()
+    found = {v.id: (v, rollup) for v, rollup in rows}
+    
+    # Evaluations written without updating the rollup - one grouped query
+    missing_rollups = [vid for vid, (v, rollup) in found.items() if rollup is None]
+    fallback = _aggregate_stats(missing_rollups) if missing_rollups else {}
+    
+    volunteers = []
+    for volunteer_id in ids:
+        if volunteer_id not in found:
+            continue
+        v, rollup = found[volunteer_id]
+        if rollup is not None and rollup.evaluation_count:
+            stats = (rollup.evaluation_count, rollup.overall_average, rollup.last_evaluation_date,
+                     rollup.get_average_scores())
+        else:
+            stats = fallback.get(volunteer_id, (0, None, None, None))
+        count, overall, last_date, scores = stats
+        volunteers.append({
+            'id': v.id,
+            'name': v.full_name,
+            'email': v.email,
+            'phone': v.phone,
+            'status': v.status,
+            'start_date': _isoformat(v.date_first_volunteered),
+            'average_rating': round(overall, 2) if overall is not None else None,
+            'average_scores': scores,
+            'evaluation_count': count,
+            'last_evaluation_date': _isoformat(last_date)
+        })
+    
+    return jsonify({
+        'volunteers': volunteers,
+        'not_found': [vid for vid in ids if vid not in found]
+    })
 
 @api_bp.route('/volunteers/<int:volunteer_id>', methods=['GET'])
 @login_required
 def get_volunteer(volunteer_id):
     """Get detailed information about a specific volunteer"""
     volunteer = Volunteer.query.get_or_404(volunteer_id)
+    rollup = db.session.get(VolunteerScoreRollup, volunteer_id)
+    evaluations = volunteer.evaluations.order_by(Evaluation.evaluation_date.desc()).all()
     
     return jsonify({
         'id': volunteer.id,
-        'name': volunteer.name,
+        'name': volunteer.full_name,
         'email': volunteer.email,
         'phone': volunteer.phone,
-        'department': volunteer.department,
-        'role': volunteer.role,
         'status': volunteer.status,
-        'start_date': volunteer.start_date.isoformat() if volunteer.start_date else None,
-        'average_rating': volunteer.average_rating,
-        'evaluation_count': volunteer.evaluation_count,
+        'start_date': volunteer.date_first_volunteered.isoformat() if volunteer.date_first_volunteered else None,
+        'average_rating': round(rollup.overall_average, 2) if rollup and rollup.overall_average is not None else None,
+        'evaluation_count': len(evaluations),
         'evaluations': [{
             'id': e.id,
             'evaluator_name': e.evaluator_name,
-            'overall_rating': e.overall_rating,
-            'evaluation_date': e.evaluation_date.isoformat(),
-            'created_at': e.created_at.isoformat()
-        } for e in volunteer.evaluations.order_by(Evaluation.evaluation_date.desc()).all()]
+            'overall_rating': e.get_overall_score(),
+            'evaluation_date': e.evaluation_date.isoformat() if e.evaluation_date else None,
+            'created_at': e.submitted_at.isoformat() if e.submitted_at else None
+        } for e in evaluations]
     })
 
 @api_bp.route('/evaluations', methods=['GET'])
 @login_required
 def get_evaluations():
-    """Get all evaluations with optional filtering"""
-    volunteer_id = request.args.get('volunteer_id', type=int)
-    limit = request.args.get('limit', type=int, default=50)
+    """Evaluations newest first, one keyset page at a time
+
+    Query params: limit, cursor (from the previous page), fields
+    (comma-separated), and the export filters - start_date, end_date,
+    event, role, evaluator, volunteer_id. The body is a list; when more
+    rows remain, the next page's cursor is in the X-Next-Cursor header and
+    a Link rel="next" header.
+    """
+    try:
+        filters = parse_export_filters(request.args)
+        fields = _parse_fields(request.args.get('fields'))
+        cursor = request.args.get('cursor')
+        after = decode_cursor(cursor, [datetime, int]) if cursor else None
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    limit = min(max(request.args.get('limit', type=int, default=50), 1), MAX_PAGE_SIZE)
     
-    query = Evaluation.query
+    query = apply_evaluation_filters(_evaluation_projection(fields), filters)
+    if after:
+        query = query.filter(keyset_condition([Evaluation.submitted_at, Evaluation.id], after))
+    rows = query.order_by(Evaluation.submitted_at.desc(), Evaluation.id.desc()).limit(limit + 1).all()
     
-    if volunteer_id:
-        query = query.filter_by(volunteer_id=volunteer_id)
+    response = jsonify([
+        {field: EVALUATION_FIELDS[field][1](row) for field in fields}
+        for row in rows[:limit]
+    ])
+    if len(rows) > limit:
+        last = rows[limit - 1]
+        next_cursor = encode_cursor([last.submitted_at, last.id])
+        args = request.args.to_dict()
+        args['cursor'] = next_cursor
+        response.headers['X-Next-Cursor'] = next_cursor
+        response.headers['Link'] = f'<{url_for("api.get_evaluations", **args)}>; rel="next"'
+    return response
+
+@api_bp.route('/evaluations/bulk', methods=['POST'])
+@login_required
+def bulk_create_evaluations():
+    """Ingest many evaluations at once (JSON array or NDJSON body)
+
+    Returns counts per status and one result per submitted row, in order.
+    """
+    try:
+        rows = parse_ingest_body(request.get_data(), request.content_type)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     
-    evaluations = query.order_by(Evaluation.created_at.desc()).limit(limit).all()
+    results = ingest_evaluations(rows)
     
-    return jsonify([{
-        'id': e.id,
-        'volunteer_id': e.volunteer_id,
-        'volunteer_name': e.volunteer.name,
-        'evaluator_name': e.evaluator_name,
-        'overall_rating': e.overall_rating,
-        'reliability_rating': e.reliability_rating,
-        'communication_rating': e.communication_rating,
-        'teamwork_rating': e.teamwork_rating,
-        'initiative_rating': e.initiative_rating,
-        'quality_rating': e.quality_rating,
-        'evaluation_date': e.evaluation_date.isoformat(),
-        'created_at': e.created_at.isoformat()
-    } for e in evaluations])
+    counts = {}
+    for result in results:
+        counts[result['status']] = counts.get(result['status'], 0) + 1
+    return jsonify({'counts': counts, 'results': results})
 
 @api_bp.route('/evaluations/<int:evaluation_id>', methods=['GET'])
 @login_required
 def get_evaluation(evaluation_id):
     """Get detailed information about a specific evaluation"""
-    evaluation = Evaluation.query.get_or_404(evaluation_id)
+    evaluation = Evaluation.query.options(
+        *Evaluation.related_loader_options()
+    ).filter_by(id=evaluation_id).first_or_404()
     
     return jsonify({
         'id': evaluation.id,
         'volunteer': {
             'id': evaluation.volunteer.id,
-            'name': evaluation.volunteer.name
+            'name': evaluation.volunteer.full_name
         },
         'evaluator_name': evaluation.evaluator_name,
         'evaluator_email': evaluation.evaluator_email,
         'evaluator_role': evaluation.evaluator_role,
+        'event_name': evaluation.event_name,
+        'role_performed': evaluation.role_performed,
         'ratings': {
-            'reliability': evaluation.reliability_rating,
-            'communication': evaluation.communication_rating,
-            'teamwork': evaluation.teamwork_rating,
-            'initiative': evaluation.initiative_rating,
-            'quality': evaluation.quality_rating,
-            'overall': evaluation.overall_rating
+            'reliability': evaluation.reliability,
+            'communication': evaluation.communication,
+            'teamwork': evaluation.teamwork,
+            'initiative': evaluation.initiative,
+            'quality': evaluation.quality_of_work,
+            'overall': evaluation.get_overall_score()
         },
         'feedback': {
             'strengths': evaluation.strengths,
             'areas_for_improvement': evaluation.areas_for_improvement,
             'additional_comments': evaluation.additional_comments
         },
-        'evaluation_date': evaluation.evaluation_date.isoformat(),
-        'created_at': evaluation.created_at.isoformat()
+        'evaluation_date': evaluation.evaluation_date.isoformat() if evaluation.evaluation_date else None,
+        'created_at': evaluation.submitted_at.isoformat() if evaluation.submitted_at else None
+    })
+
+@api_bp.route('/aggregate', methods=['GET'])
+@login_required
+def get_aggregate():
+    """Grouped evaluation metrics computed in a single GROUP BY
+
+    Query params: group_by (volunteer, event_name, role_performed,
+    evaluator_name, service_year, service_month), metrics (count or
+    avg_/min_/max_ of a rating or overall; default count,avg_overall),
+    order_by (a group_by field or metric, "-" for descending), limit, and
+    the /api/evaluations filters.
+    """
+    try:
+        group_by, metrics, order_by, limit = parse_aggregate_request(request.args)
+        filters = parse_export_filters(request.args)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    rows, truncated = run_aggregate(group_by, metrics, tuple(sorted(filters.items())), order_by, limit)
+    
+    return jsonify({
+        'group_by': list(group_by),
+        'metrics': list(metrics),
+        'rows': rows,
+        'truncated': truncated
+    })
+
+MAX_CHANGES_PAGE_SIZE = 1000
+
+@api_bp.route('/changes', methods=['GET'])
+@login_required
+def get_changes():
+    """Inserts, updates and deletes since a cursor, oldest first
+
+    Query params: cursor (from the previous response; omit to start from
+    the beginning, or "latest" to start from now), limit, and entity
+    (comma-separated: volunteer, evaluation, event, role). Fetch the
+    current state of changed rows from the regular endpoints.
+    """
+    cursor = request.args.get('cursor')
+    entities = [e.strip() for e in request.args.get('entity', '').split(',') if e.strip()]
+    try:
+        unknown = [e for e in entities if e not in ChangeLog.ENTITIES]
+        if unknown:
+            raise ValueError(f'Unknown entity: {", ".join(unknown)} (available: {", ".join(ChangeLog.ENTITIES)})')
+        if cursor == 'latest':
+            after_id = get_latest_change_id()
+        elif cursor:
+            after_id = decode_cursor(cursor, [int])[0]
+        else:
+            after_id = 0
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    limit = min(max(request.args.get('limit', type=int, default=500), 1), MAX_CHANGES_PAGE_SIZE)
+    
+    changes, has_more = get_changes_since(after_id, limit, entities)
+    last_id = changes[-1].id if changes else after_id
+    
+    return jsonify({
+        'changes': [{
+            'id': c.id,
+            'entity': c.entity,
+            'entity_id': c.entity_id,
+            'operation': c.operation,
+            'changed_at': _isoformat(c.changed_at)
+        } for c in changes],
+        'next_cursor': encode_cursor([last_id]),
+        'has_more': has_more
     })
 
 @api_bp.route('/departments', methods=['GET'])
@@ -125,3 +418,81 @@ def get_departments():
     """Get list of all departments"""
     departments = db.session.query(Volunteer.department).distinct().all()
     return jsonify([d[0] for d in departments if d[0]])
+
+
+# NDJSON exports for bulk consumers (BI sync)
+
+VOLUNTEER_EXPORT_COLUMNS = [
+    Volunteer.id, Volunteer.first_name, Volunteer.last_name, Volunteer.email, Volunteer.phone,
+    Volunteer.status, Volunteer.date_first_volunteered, Volunteer.created_at
+]
+
+def _volunteer_export_row(r):
+    return {
+        'id': r.id,
+        'name': f'{r.first_name} {r.last_name}',
+        'first_name': r.first_name,
+        'last_name': r.last_name,
+        'email': r.email,
+        'phone': r.phone,
+        'status': r.status,
+        'start_date': _isoformat(r.date_first_volunteered),
+        'created_at': _isoformat(r.created_at)
+    }
+
+def _ndjson_response(query, serialize, name):
+    rows = stream_rows(query)
+    return Response(
+        stream_with_context(iter_ndjson(rows, serialize)),
+        mimetype='application/x-ndjson',
+        headers={'Content-Disposition': f'attachment; filename={name}.ndjson'}
+    )
+
+@api_bp.route('/export/evaluations.ndjson', methods=['GET'])
+@login_required
+def export_evaluations_ndjson():
+    """Every matching evaluation as one JSON object per line, oldest first
+
+    since= (YYYY-MM-DD or ISO datetime) returns only evaluations submitted
+    at or after that time, for incremental syncs. Also accepts fields= and
+    the same filters as /api/evaluations.
+    """
+    try:
+        filters = parse_export_filters(request.args)
+        fields = _parse_fields(request.args.get('fields'))
+        since = parse_since(request.args.get('since'))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    query = apply_evaluation_filters(_evaluation_projection(fields), filters)
+    if since:
+        query = query.filter(Evaluation.submitted_at >= since)
+    query = query.order_by(Evaluation.submitted_at, Evaluation.id)
+    
+    return _ndjson_response(
+        query,
+        lambda row: {field: EVALUATION_FIELDS[field][1](row) for field in fields},
+        'evaluations'
+    )
+
+@api_bp.route('/export/volunteers.ndjson', methods=['GET'])
+@login_required
+def export_volunteers_ndjson():
+    """Every volunteer as one JSON object per line, oldest first
+
+    since= (YYYY-MM-DD or ISO datetime) returns only volunteers created at
+    or after that time; status= filters by status.
+    """
+    try:
+        since = parse_since(request.args.get('since'))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    query = db.session.query(*VOLUNTEER_EXPORT_COLUMNS)
+    if request.args.get('status'):
+        query = query.filter(Volunteer.status == request.args['status'])
+    if since:
+        query = query.filter(Volunteer.created_at >= since)
+    query = query.order_by(Volunteer.created_at, Volunteer.id)
+    
+    return _ndjson_response(query, _volunteer_export_row, 'volunteers')
@@ -1,14 +1,30 @@
-from flask import Blueprint, render_template, request, jsonify, redirect, url_for, flash, Response
+from flask import (
+    Blueprint, render_template, request, jsonify, redirect, url_for, flash, Response, abort,
+    stream_with_context, send_file, current_app
+)
 from flask_login import login_required, current_user
-from sqlalchemy import func
 from models import db, Volunteer, Evaluation, User
-from utils.analytics import calculate_volunteer_stats, get_department_summary, get_trend_data
-from datetime import datetime, timedelta
-import csv
-from io import StringIO
+from utils.analytics import calculate_all_volunteer_stats, get_performance_lists, get_volunteer_profile
+from utils.rollups import record_evaluation_removed, remove_volunteer_rollup
+from utils.daily_stats import get_evaluation_days, refresh_daily_stats, get_window_stats
+from utils.export import parse_export_filters, build_export_query, iter_csv, gzip_stream
+from utils.export_jobs import start_export_job, get_export_job, get_artifact_path
+from utils.conditional import register_conditional_responses, get_data_version
+from utils.cache import analytics_cache, fragment_cache
+from utils.roster import roster_cache, get_roster
+from utils.live_feed import live_feed, stream_events, start_sync
+from utils.submission_queue import queue_enabled, get_queue_status, retry_failed, discard_failed
+from markupsafe import Markup
+from datetime import datetime
 
 dashboard_bp = Blueprint('dashboard', __name__, url_prefix='/dashboard')
 
+# Answer unchanged GETs with 304 before running the view
+register_conditional_responses(dashboard_bp, exempt=[
+    'export_evaluations', 'export_job_status', 'download_export_job', 'cache_stats',
+    'live_feed_stream', 'submission_queue_status', 'admin_panel'
+])
+
 @dashboard_bp.route('/qr-generator')
 @login_required
 def qr_generator():
@@ -20,76 +36,109 @@ def qr_generator():
 @login_required
 def index():
     """Main leadership dashboard"""
-    # Get summary statistics
-    total_volunteers = Volunteer.query.filter_by(status='active').count()
-    total_evaluations = Evaluation.query.count()
-    
-    # Recent evaluations
-    recent_evaluations = Evaluation.query.order_by(
-        Evaluation.submitted_at.desc()
-    ).limit(10).all()
-    
-    # Top performers - calculate from individual ratings
-    top_performers = []
-    needs_attention = []
-    
-    # Get all volunteers with evaluations
-    volunteers_with_evals = Volunteer.query.join(Evaluation).distinct().all()
-    
-    for volunteer in volunteers_with_evals:
-        evals = Evaluation.query.filter_by(volunteer_id=volunteer.id).all()
-        if evals:
-            # Calculate average of all 5 ratings
-            total_score = 0
-            for eval in evals:
-                avg = (eval.reliability + eval.quality_of_work + eval.initiative + 
-                       eval.teamwork + eval.communication) / 5.0
-                total_score += avg
-            overall_avg = total_score / len(evals)
-            
-            if overall_avg >= 8.0:
-                top_performers.append({'volunteer': volunteer, 'score': overall_avg})
-            elif overall_avg < 6.0:
-                needs_attention.append({'volunteer': volunteer, 'score': overall_avg})
-    
-    # Sort lists
-    top_performers = sorted(top_performers, key=lambda x: x['score'], reverse=True)[:10]
-    needs_attention = sorted(needs_attention, key=lambda x: x['score'])
-    
-    # Upcoming events (placeholder)
-    upcoming_events = 0
+    # Panels are rendered once per (viewer role, data version) and reused;
+    # the queries below only run for panels that are not cached yet
+    data = {}
+    
+    def performance_lists():
+        if 'top_performers' not in data:
+            # Top performers and needs attention - one grouped query over all evaluations
+            data['top_performers'], data['needs_attention'] = get_performance_lists(
+                top_threshold=8.0, attention_threshold=6.0, top_limit=10
+            )
+        return data['top_performers'], data['needs_attention']
+    
+    def render_summary():
+        top_performers, needs_attention = performance_lists()
+        return render_template(
+            'dashboard-summary.html',
+            total_volunteers=Volunteer.query.filter_by(status='active').count(),
+            total_evaluations=Evaluation.query.count(),
+            top_performers=top_performers,
+            needs_attention=needs_attention
+        )
     
-    return render_template(
-        'dashboard.html',
-        total_volunteers=total_volunteers,
-        total_evaluations=total_evaluations,
-        recent_evaluations=recent_evaluations,
-        top_performers=top_performers,
-        needs_attention=needs_attention,
-        upcoming_events=upcoming_events
+    def render_top_performers():
+        return render_template('dashboard-top-performers.html', top_performers=performance_lists()[0])
+    
+    def render_needs_attention():
+        return render_template('dashboard-needs-attention.html', needs_attention=performance_lists()[1])
+    
+    def render_recent_evaluations():
+        recent_evaluations = Evaluation.query.options(
+            *Evaluation.related_loader_options()
+        ).order_by(
+            Evaluation.submitted_at.desc()
+        ).limit(10).all()
+        return render_template('dashboard-recent-evaluations.html', recent_evaluations=recent_evaluations)
+    
+    data_version = get_data_version()
+    version = data_version[0] if data_version else None
+    panels = {}
+    for name, render in (
+        ('summary', render_summary),
+        ('top_performers', render_top_performers),
+        ('needs_attention', render_needs_attention),
+        ('recent_evaluations', render_recent_evaluations),
+    ):
+        panels[name] = Markup(fragment_cache.render(name, current_user.role, version, render))
+    
+    return render_template('dashboard.html', panels=panels)
+
+@dashboard_bp.route('/live')
+@login_required
+def live_feed_stream():
+    """Server-sent events: new evaluations and updated aggregates"""
+    subscriber = live_feed.subscribe()
+    if subscriber is None:
+        # Every stream holds a worker thread - the dashboard polls instead
+        return Response('Too many live dashboard connections', status=503,
+                        mimetype='text/plain', headers={'Retry-After': '60'})
+    start_sync(current_app._get_current_object())
+    events = stream_events(
+        subscriber,
+        heartbeat_interval=current_app.config.get('LIVE_FEED_HEARTBEAT_INTERVAL', 15),
+        max_duration=current_app.config.get('LIVE_FEED_MAX_DURATION')
     )
+    return Response(events, mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'  # Don't let proxies buffer the stream
+    })
+
+@dashboard_bp.route('/admin/cache-stats')
+@login_required
+def cache_stats():
+    """Analytics, fragment and roster cache counters for monitoring (admin only)"""
+    if current_user.role != 'admin':
+        return jsonify({'success': False, 'message': 'Access denied'}), 403
+    
+    return jsonify({
+        'analytics': analytics_cache.stats(),
+        'fragments': fragment_cache.stats(),
+        'roster': roster_cache.stats(),
+        'live_feed_subscribers': live_feed.subscriber_count
+    })
 
 @dashboard_bp.route('/volunteer/<int:volunteer_id>')
 @login_required
 def volunteer_profile(volunteer_id):
     """Detailed view of individual volunteer performance"""
-    volunteer = Volunteer.query.get_or_404(volunteer_id)
-    stats = calculate_volunteer_stats(volunteer_id)
-    trend_data = get_trend_data(volunteer_id)
-    
-    # Get evaluations ordered by date
-    evaluations = Evaluation.query.filter_by(volunteer_id=volunteer_id).order_by(
-        Evaluation.submitted_at.desc()
-    ).all()
+    # Volunteer, stats, trend and history all come from one evaluations fetch
+    profile = get_volunteer_profile(volunteer_id)
+    if profile is None:
+        abort(404)
     
     return render_template(
         'volunteer-profile.html',
-        volunteer=volunteer,
-        stats=stats,
-        trend_data=trend_data,
-        evaluations=evaluations
+        volunteer=profile['volunteer'],
+        stats=profile['stats'],
+        trend_data=profile['trend_data'],
+        evaluations=profile['evaluations']
     )
 
+# Most name search matches listed at once; keeps the id IN list short for broad queries
+VOLUNTEER_SEARCH_PAGE_SIZE = 100
+
 @dashboard_bp.route('/volunteers')
 @login_required
 def volunteers_list():
@@ -99,15 +148,13 @@ def volunteers_list():
     
     query = Volunteer.query
     
-    # Apply search filter
+    # Apply search filter - prefix match on first/last/full name via the roster name index
+    truncated = False
     if search_query:
-        search_pattern = f'%{search_query}%'
-        query = query.filter(
-            db.or_(
-                Volunteer.first_name.ilike(search_pattern),
-                Volunteer.last_name.ilike(search_pattern)
-            )
-        )
+        matching_ids = get_roster().search(search_query, limit=VOLUNTEER_SEARCH_PAGE_SIZE + 1,
+                                           status=status or None)
+        truncated = len(matching_ids) > VOLUNTEER_SEARCH_PAGE_SIZE
+        query = query.filter(Volunteer.id.in_(matching_ids[:VOLUNTEER_SEARCH_PAGE_SIZE]))
     
     # Apply status filter
     if status:
@@ -115,10 +162,15 @@ def volunteers_list():
     
     volunteers = query.order_by(Volunteer.last_name, Volunteer.first_name).all()
     
+    # Counts and averages for everyone from one columnar snapshot (cached)
+    volunteer_stats = calculate_all_volunteer_stats()
+    
     return render_template(
         'volunteers-list.html',
         volunteers=volunteers,
+        volunteer_stats=volunteer_stats,
         search_query=search_query,
+        search_truncated=truncated,
         selected_status=status
     )
 
@@ -175,77 +227,29 @@ def edit_volunteer(volunteer_id):
     
     return render_template('edit-volunteer.html', volunteer=volunteer)
 
-@dashboard_bp.route('/volunteers_old')
-@login_required
-def volunteers_list_old():
-    """List all volunteers with filtering options"""
-    department = request.args.get('department')
-    status = request.args.get('status', 'active')
-    
-    query = Volunteer.query
-    
-    if department:
-        query = query.filter_by(department=department)
-    if status:
-        query = query.filter_by(status=status)
-    
-    volunteers = query.order_by(Volunteer.name).all()
-    
-    # Add stats for each volunteer
-    volunteers_with_stats = []
-    for v in volunteers:
-        volunteers_with_stats.append({
-            'volunteer': v,
-            'stats': calculate_volunteer_stats(v.id)
-        })
-    
-    return render_template(
-        'volunteers-list.html',
-        volunteers=volunteers_with_stats,
-        selected_department=department,
-        selected_status=status
-    )
-
 @dashboard_bp.route('/api/stats')
 @login_required
 def get_stats():
-    """API endpoint for dashboard statistics"""
-    period = request.args.get('period', '30')  # days
+    """API endpoint for dashboard statistics
+    
+    period: window in days (default 30), or periods=7,30,90 for several
+    windows in one call. basis: 'submitted' (default) buckets by submission
+    date, 'evaluation' by evaluation date. Served from precomputed daily
+    buckets, so each call is a single indexed range read.
+    """
+    periods = request.args.get('periods')
+    basis = request.args.get('basis', 'submitted')
     
     try:
-        days = int(period)
-        start_date = datetime.utcnow() - timedelta(days=days)
+        if periods:
+            windows = [int(p) for p in periods.split(',') if p.strip()]
+            if len(windows) > 12:
+                raise ValueError('At most 12 periods per request')
+            return jsonify({'windows': get_window_stats(windows, basis=basis)})
         
-        # Get evaluations in period
-        evaluations = Evaluation.query.filter(
-            Evaluation.created_at >= start_date
-        ).all()
-        
-        # Calculate statistics
-        if evaluations:
-            avg_overall = sum(e.overall_rating for e in evaluations) / len(evaluations)
-            avg_reliability = sum(e.reliability_rating for e in evaluations) / len(evaluations)
-            avg_communication = sum(e.communication_rating for e in evaluations) / len(evaluations)
-            avg_teamwork = sum(e.teamwork_rating for e in evaluations) / len(evaluations)
-            avg_initiative = sum(e.initiative_rating for e in evaluations) / len(evaluations)
-            avg_quality = sum(e.quality_rating for e in evaluations) / len(evaluations)
-        else:
-            avg_overall = avg_reliability = avg_communication = 0
-            avg_teamwork = avg_initiative = avg_quality = 0
-        
-        return jsonify({
-            'period_days': days,
-            'evaluation_count': len(evaluations),
-            'averages': {
-                'overall': round(avg_overall, 2),
-                'reliability': round(avg_reliability, 2),
-                'communication': round(avg_communication, 2),
-                'teamwork': round(avg_teamwork, 2),
-                'initiative': round(avg_initiative, 2),
-                'quality': round(avg_quality, 2)
-            }
-        })
-    except Exception as e:
+        days = int(request.args.get('period', '30'))
+        return jsonify(get_window_stats([days], basis=basis)[0])
+    except ValueError as e:
         return jsonify({'error': str(e)}), 400
 
 @dashboard_bp.route('/admin')
@@ -258,7 +262,40 @@ def admin_panel():
         return redirect(url_for('dashboard.index'))
     
     users = User.query.order_by(User.created_at.desc()).all()
-    return render_template('admin-panel.html', users=users)
+    queue_status = get_queue_status(current_app) if queue_enabled() else None
+    return render_template('admin-panel.html', users=users, queue_status=queue_status)
+
+@dashboard_bp.route('/admin/submission-queue')
+@login_required
+def submission_queue_status():
+    """Write-behind submission queue backlog and failures (admin only)"""
+    if current_user.role != 'admin':
+        return jsonify({'success': False, 'message': 'Access denied'}), 403
+    
+    return jsonify(get_queue_status(current_app))
+
+@dashboard_bp.route('/admin/submission-queue/<action>', methods=['POST'])
+@login_required
+def manage_submission_queue(action):
+    """Retry failed or discard failed/duplicate queued submissions (admin only)"""
+    if current_user.role != 'admin':
+        return jsonify({'success': False, 'message': 'Access denied'}), 403
+    if action not in ('retry', 'discard'):
+        abort(404)
+    
+    data = request.get_json(silent=True) or {}
+    ids = data.get('ids')
+    if ids is not None and not (isinstance(ids, list) and all(isinstance(i, int) for i in ids)):
+        return jsonify({'success': False, 'message': 'ids must be a list of queue ids'}), 400
+    
+    if action == 'retry':
+        count = retry_failed(current_app, ids)
+        return jsonify({'success': True, 'message': f'{count} submissions queued again'})
+    
+    if not ids:
+        return jsonify({'success': False, 'message': 'ids are required to discard submissions'}), 400
+    count = discard_failed(current_app, ids)
+    return jsonify({'success': True, 'message': f'{count} submissions discarded'})
 
 @dashboard_bp.route('/admin/add-user', methods=['POST'])
 @login_required
@@ -373,7 +410,9 @@ def delete_user():
 @login_required
 def view_evaluation(evaluation_id):
     """View full evaluation details"""
-    evaluation = Evaluation.query.get_or_404(evaluation_id)
+    evaluation = Evaluation.query.options(
+        *Evaluation.related_loader_options()
+    ).filter_by(id=evaluation_id).first_or_404()
     return render_template('view-evaluation.html', evaluation=evaluation)
 
 @dashboard_bp.route('/evaluation/<int:evaluation_id>/delete', methods=['POST'])
@@ -386,8 +425,11 @@ def delete_evaluation(evaluation_id):
     try:
         evaluation = Evaluation.query.get_or_404(evaluation_id)
         volunteer_name = f"{evaluation.volunteer.first_name} {evaluation.volunteer.last_name}"
+        stat_days = get_evaluation_days(Evaluation.query.filter_by(id=evaluation.id))
         
         db.session.delete(evaluation)
+        record_evaluation_removed(evaluation)
+        refresh_daily_stats(stat_days)
         db.session.commit()
         
         return jsonify({'success': True, 'message': f'Evaluation for {volunteer_name} deleted successfully'})
@@ -408,7 +450,11 @@ def delete_volunteer(volunteer_id):
         volunteer_name = f"{volunteer.first_name} {volunteer.last_name}"
         
         # Delete all associated evaluations first
-        Evaluation.query.filter_by(volunteer_id=volunteer_id).delete()
+        volunteer_evaluations = Evaluation.query.filter_by(volunteer_id=volunteer_id)
+        stat_days = get_evaluation_days(volunteer_evaluations)
+        volunteer_evaluations.delete()
+        remove_volunteer_rollup(volunteer_id)
+        refresh_daily_stats(stat_days)
         
         db.session.delete(volunteer)
         db.session.commit()
@@ -423,64 +469,81 @@ def delete_volunteer(volunteer_id):
 @dashboard_bp.route('/export/evaluations')
 @login_required
 def export_evaluations():
-    """Export all evaluations to CSV"""
-    # Get all evaluations
-    evaluations = Evaluation.query.order_by(Evaluation.submitted_at.desc()).all()
-    
-    # Create CSV in memory
-    output = StringIO()
-    writer = csv.writer(output)
-    
-    # Write header
-    writer.writerow([
-        'Volunteer First Name',
-        'Volunteer Last Name',
-        'Evaluator Name',
-        'Event Name',
-        'Role Performed',
-        'Evaluation Date',
-        'Submitted At',
-        'Reliability',
-        'Communication',
-        'Teamwork',
-        'Initiative',
-        'Quality of Work',
-        'Overall Average',
-        'Strengths',
-        'Areas for Improvement',
-        'Additional Comments'
-    ])
-    
-    # Write data
-    for eval in evaluations:
-        overall = (eval.reliability + eval.communication + eval.teamwork + 
-                  eval.initiative + eval.quality_of_work) / 5.0
-        
-        writer.writerow([
-            eval.volunteer.first_name,
-            eval.volunteer.last_name,
-            eval.evaluator_name,
-            eval.event_name or '',
-            eval.role_performed or '',
-            eval.evaluation_date.strftime('%Y-%m-%d') if eval.evaluation_date else '',
-            eval.submitted_at.strftime('%Y-%m-%d %H:%M:%S'),
-            eval.reliability,
-            eval.communication,
-            eval.teamwork,
-            eval.initiative,
-            eval.quality_of_work,
-            f'{overall:.2f}',
-            eval.strengths or '',
-            eval.areas_for_improvement or '',
-            eval.additional_comments or ''
-        ])
-    
-    # Create response
-    output.seek(0)
+    """Export evaluations to CSV, streamed in batches
+
+    Optional filters: start_date, end_date, event, role, volunteer_id, evaluator.
+    Pass gzip=1 to download a compressed .csv.gz instead, and background=1
+    to queue the export as a job and download the file when it is ready.
+    """
+    try:
+        filters = parse_export_filters(request.args)
+    except ValueError as e:
+        if request.args.get('background') in ('1', 'true', 'yes'):
+            return jsonify({'success': False, 'message': str(e)}), 400
+        flash(f'Error exporting evaluations: {str(e)}', 'error')
+        return redirect(url_for('dashboard.index'))
+    
+    if request.args.get('background') in ('1', 'true', 'yes'):
+        job = start_export_job(
+            current_app._get_current_object(),
+            filters,
+            compressed=request.args.get('gzip') in ('1', 'true', 'yes'),
+            requested_by=current_user.username
+        )
+        status_url = url_for('dashboard.export_job_status', job_id=job['id'])
+        return jsonify(_export_job_response(job)), 202, {'Location': status_url}
+    
+    chunks = iter_csv(build_export_query(filters))
+    filename = f'evaluations_{datetime.now().strftime("%Y%m%d_%H%M%S")}.csv'
+    mimetype = 'text/csv'
+    
+    if request.args.get('gzip') in ('1', 'true', 'yes'):
+        chunks = gzip_stream(chunks)
+        filename += '.gz'
+        mimetype = 'application/gzip'
+    
     return Response(
-        output.getvalue(),
-        mimetype='text/csv',
+        stream_with_context(chunks),
+        mimetype=mimetype,
         headers={
-            'Content-Disposition': f'attachment; filename=evaluations_{datetime.now().strftime("%Y%m%d_%H%M%S")}.csv'
+            'Content-Disposition': f'attachment; filename={filename}'
         }
     )
+
+def _export_job_response(job):
+    """Job status plus status/download URLs"""
+    response = dict(job)
+    response['status_url'] = url_for('dashboard.export_job_status', job_id=job['id'])
+    response['download_url'] = (
+        url_for('dashboard.download_export_job', job_id=job['id']) if job['status'] == 'complete' else None
+    )
+    return response
+
+@dashboard_bp.route('/export/jobs/<job_id>')
+@login_required
+def export_job_status(job_id):
+    """Status of a background export job"""
+    job = get_export_job(current_app, job_id)
+    if job is None:
+        return jsonify({'success': False, 'message': 'Export job not found'}), 404
+    return jsonify(_export_job_response(job))
+
+@dashboard_bp.route('/export/jobs/<job_id>/download')
+@login_required
+def download_export_job(job_id):
+    """Download a finished export (supports conditional and range requests)"""
+    job = get_export_job(current_app, job_id)
+    if job is None:
+        abort(404)
+    if job['status'] != 'complete':
+        return jsonify({'success': False, 'message': f'Export is {job["status"]}'}), 409
+    
+    return send_file(
+        get_artifact_path(current_app, job),
+        mimetype='application/gzip' if job['compressed'] else 'text/csv',
+        as_attachment=True,
+        download_name=job['filename'],
+        conditional=True,
+        etag=True,
+        max_age=0
+    )
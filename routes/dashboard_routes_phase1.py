@@ -2,6 +2,7 @@ from flask import Blueprint, render_template, request, jsonify, redirect, url_fo
 from flask_login import login_required, current_user
 from models import db, Volunteer, Evaluation, Role, Event, User
 from sqlalchemy import func, desc
+from utils.analytics import get_performance_lists
 from datetime import datetime, timedelta
 
 dashboard_bp = Blueprint('dashboard', __name__, url_prefix='/dashboard')
@@ -13,33 +14,17 @@ def dashboard():
     # Get summary statistics
     total_volunteers = Volunteer.query.filter_by(status='Active').count()
     total_evaluations = Evaluation.query.count()
-    recent_evaluations = Evaluation.query.order_by(desc(Evaluation.submitted_at)).limit(10).all()
+    recent_evaluations = Evaluation.query.options(*Evaluation.related_loader_options())\
+        .order_by(desc(Evaluation.submitted_at)).limit(10).all()
     
     # Get upcoming events count
     today = datetime.now().date()
     upcoming_events = Event.query.filter(Event.event_date >= today).count()
     
-    # Get top performers (overall score >= 8)
-    top_performers = []
-    for volunteer in Volunteer.query.filter_by(status='Active').all():
-        avg_scores = volunteer.get_average_scores()
-        if avg_scores and avg_scores['overall'] >= 8.0:
-            top_performers.append({
-                'volunteer': volunteer,
-                'score': avg_scores['overall']
-            })
-    top_performers = sorted(top_performers, key=lambda x: x['score'], reverse=True)[:10]
-    
-    # Get volunteers needing attention (overall score < 6)
-    needs_attention = []
-    for volunteer in Volunteer.query.filter_by(status='Active').all():
-        avg_scores = volunteer.get_average_scores()
-        if avg_scores and avg_scores['overall'] < 6.0:
-            needs_attention.append({
-                'volunteer': volunteer,
-                'score': avg_scores['overall']
-            })
-    needs_attention = sorted(needs_attention, key=lambda x: x['score'])
+    # Get top performers (overall score >= 8) and volunteers needing attention (< 6)
+    top_performers, needs_attention = get_performance_lists(
+        top_threshold=8.0, attention_threshold=6.0, top_limit=10, status='Active'
+    )
     
     return render_template('dashboard.html',
                          total_volunteers=total_volunteers,
@@ -71,7 +56,8 @@ def all_evaluations():
     page = request.args.get('page', 1, type=int)
     per_page = 50
     
-    evaluations = Evaluation.query.order_by(desc(Evaluation.submitted_at))\
+    evaluations = Evaluation.query.options(*Evaluation.related_loader_options())\
+        .order_by(desc(Evaluation.submitted_at))\
         .paginate(page=page, per_page=per_page, error_out=False)
     
     return render_template('all-evaluations.html', evaluations=evaluations)
@@ -1,81 +1,93 @@
-from flask import Blueprint, render_template, request, redirect, url_for, flash, jsonify
+from flask import Blueprint, Response, render_template, request, redirect, url_for, flash, jsonify
 from datetime import datetime
-from models import db, Volunteer, Evaluation
-from config import Config
+from models import db
+from utils.rollups import record_evaluation_added
+from utils.daily_stats import add_evaluation_to_daily_stats
+from utils.live_feed import publish_evaluation_submitted, publish_evaluations_submitted
+from utils.id_allocator import next_evaluation_id, allocate_evaluation_numbers, format_evaluation_id
+from utils.submissions import insert_evaluation
+from utils.roster import get_roster, search_volunteers, parse_search_limit
+from utils.submission_queue import queue_enabled, enqueue_submission, enqueue_submissions
 
 evaluation_bp = Blueprint('evaluation', __name__)
 
+def _render_form():
+    """Evaluation form with the cached volunteer roster"""
+    return render_template('evaluation-form.html', volunteer_options=get_roster().options_html)
+
+def _form_values(form):
+    """Evaluation column values from the submitted form (raises ValueError on bad input)"""
+    # Parse evaluation date
+    eval_date_str = form.get('evaluation_date')
+    eval_date = datetime.strptime(eval_date_str, '%Y-%m-%d').date() if eval_date_str else datetime.utcnow().date()
+    
+    return dict(
+        volunteer_id=int(form.get('volunteer_id')),
+        role_id=None,  # Not using role table, using role_performed text field instead
+        date_of_service=datetime.utcnow().date(),
+        event_name=form.get('event_name'),
+        service_month=form.get('service_month'),
+        service_year=form.get('service_year'),
+        role_performed=form.get('role_performed'),
+        evaluation_date=eval_date,
+        evaluator_name=form.get('evaluator_name'),
+        evaluator_email=form.get('evaluator_email'),
+        evaluator_role=form.get('evaluator_role'),
+        reliability=int(form.get('reliability')),
+        quality_of_work=int(form.get('quality_of_work')),
+        initiative=int(form.get('initiative')),
+        teamwork=int(form.get('teamwork')),
+        communication=int(form.get('communication')),
+        models_the_work=int(form.get('models_the_work', 7)),
+        enthusiasm_to_serve_again=int(form.get('enthusiasm_to_serve_again', 7)),
+        strengths=form.get('strengths'),
+        areas_for_improvement=form.get('areas_for_improvement'),
+        additional_comments=form.get('additional_comments'),
+        would_work_again=form.get('would_work_again', ''),
+        recommended_roles=form.get('recommended_roles', '')
+    )
+
 @evaluation_bp.route('/')
 def index():
     """Landing page with link to evaluation form"""
-    volunteers = Volunteer.query.filter_by(status='active').order_by(Volunteer.last_name, Volunteer.first_name).all()
-    return render_template('evaluation-form.html', volunteers=volunteers)
+    return _render_form()
 
 @evaluation_bp.route('/evaluate', methods=['GET', 'POST'])
 def submit_evaluation():
     """Public form for submitting volunteer evaluations"""
     if request.method == 'GET':
-        volunteers = Volunteer.query.filter_by(status='active').order_by(Volunteer.last_name, Volunteer.first_name).all()
-        return render_template('evaluation-form.html', volunteers=volunteers)
+        return _render_form()
     
     # POST - Process form submission
     try:
-        volunteer_id = request.form.get('volunteer_id')
-        evaluator_name = request.form.get('evaluator_name')
-        event_name = request.form.get('event_name')
+        values = _form_values(request.form)
         
-        # Parse evaluation date
-        eval_date_str = request.form.get('evaluation_date')
-        eval_date = datetime.strptime(eval_date_str, '%Y-%m-%d').date() if eval_date_str else datetime.utcnow().date()
+        # Write-behind mode: journal it and let the background flusher store it
+        if queue_enabled():
+            if values['volunteer_id'] not in get_roster().ids:
+                flash('Please select a volunteer from the list.', 'error')
+                return _render_form()
+            values['submitted_at'] = datetime.utcnow()
+            enqueue_submission(values)
+            flash('Evaluation received! Thank you for your feedback.', 'success')
+            return redirect(url_for('evaluation.submit_evaluation'))
         
-        # Check for duplicate evaluation (same volunteer, evaluator, event, and date)
-        existing = Evaluation.query.filter_by(
-            volunteer_id=volunteer_id,
-            evaluator_name=evaluator_name,
-            event_name=event_name,
-            evaluation_date=eval_date
-        ).first()
+        # Atomic sequence/counter, no read of the last row; a duplicate just leaves a gap
+        values['evaluation_id'] = next_evaluation_id()
         
-        if existing:
-            flash('⚠️ You have already submitted an evaluation for this volunteer at this event on this date. If you need to update it, please contact an administrator.', 'warning')
-            volunteers = Volunteer.query.filter_by(status='active').order_by(Volunteer.last_name, Volunteer.first_name).all()
-            return render_template('evaluation-form.html', volunteers=volunteers)
+        # Insert unless the same evaluator already evaluated this volunteer at this
+        # event on this date - the unique index decides, no separate lookup
+        evaluation = insert_evaluation(values)
         
-        # Generate evaluation ID
-        last_eval = Evaluation.query.order_by(Evaluation.id.desc()).first()
-        eval_number = (last_eval.id + 1) if last_eval else 1
-        evaluation_id = f"EVAL-{eval_number:05d}"
-        
-        # Create new evaluation
-        evaluation = Evaluation(
-            evaluation_id=evaluation_id,
-            volunteer_id=volunteer_id,
-            role_id=None,  # Not using role table, using role_performed text field instead
-            date_of_service=datetime.utcnow().date(),
-            event_name=request.form.get('event_name'),
-            service_month=request.form.get('service_month'),
-            service_year=request.form.get('service_year'),
-            role_performed=request.form.get('role_performed'),
-            evaluation_date=eval_date,
-            evaluator_name=request.form.get('evaluator_name'),
-            evaluator_email=request.form.get('evaluator_email'),
-            evaluator_role=request.form.get('evaluator_role'),
-            reliability=int(request.form.get('reliability')),
-            quality_of_work=int(request.form.get('quality_of_work')),
-            initiative=int(request.form.get('initiative')),
-            teamwork=int(request.form.get('teamwork')),
-            communication=int(request.form.get('communication')),
-            models_the_work=int(request.form.get('models_the_work', 7)),
-            enthusiasm_to_serve_again=int(request.form.get('enthusiasm_to_serve_again', 7)),
-            strengths=request.form.get('strengths'),
-            areas_for_improvement=request.form.get('areas_for_improvement'),
-            additional_comments=request.form.get('additional_comments'),
-            would_work_again=request.form.get('would_work_again', ''),
-            recommended_roles=request.form.get('recommended_roles', '')
-        )
+        if evaluation is None:
+            db.session.rollback()
+            flash('⚠️ You have already submitted an evaluation for this volunteer at this event on this date. If you need to update it, please contact an administrator.', 'warning')
+            return _render_form()
         
-        db.session.add(evaluation)
+        record_evaluation_added(evaluation)
+        add_evaluation_to_daily_stats(evaluation)
         db.session.commit()
+        publish_evaluation_submitted(evaluation)
         
         flash('Evaluation submitted successfully! Thank you for your feedback.', 'success')
         return redirect(url_for('evaluation.submit_evaluation'))
@@ -85,13 +97,99 @@ def submit_evaluation():
         flash(f'Error submitting evaluation: {str(e)}', 'error')
         return redirect(url_for('evaluation.submit_evaluation'))
 
-@evaluation_bp.route('/api/volunteers')
+MAX_BATCH_EVALUATIONS = 50
+
+# Fields every evaluation in a batch shares; the rest are per volunteer
+SHARED_FIELDS = ['event_name', 'evaluation_date', 'service_month', 'service_year',
+                 'evaluator_name', 'evaluator_email', 'evaluator_role']
+
+def _batch_entries(form):
+    """Per-volunteer field dicts from evaluations-<n>-<field> form keys, in order"""
+    entries = {}
+    for key, value in form.items():
+        prefix, _, rest = key.partition('-')
+        index, _, field = rest.partition('-')
+        if prefix == 'evaluations' and index.isdigit() and field and field not in SHARED_FIELDS:
+            entries.setdefault(int(index), {})[field] = value
+    return [entries[index] for index in sorted(entries)]
+
+@evaluation_bp.route('/evaluate/batch', methods=['POST'])
+def submit_evaluation_batch():
+    """Evaluations of several volunteers sharing event, date and evaluator, in one transaction"""
+    shared = {field: request.form.get(field) for field in SHARED_FIELDS if field in request.form}
+    entries = _batch_entries(request.form)
+    
+    if not entries:
+        flash('Add at least one volunteer to submit.', 'error')
+        return _render_form()
+    if len(entries) > MAX_BATCH_EVALUATIONS:
+        flash(f'At most {MAX_BATCH_EVALUATIONS} evaluations can be submitted at once.', 'error')
+        return _render_form()
+    
+    # Validate everything before storing anything
+    roster = get_roster()
+    rows = []
+    for number, entry in enumerate(entries, 1):
+        try:
+            values = _form_values({**shared, **entry})
+        except (TypeError, ValueError):
+            flash(f'Evaluation {number} is incomplete or has an invalid rating. Nothing was submitted.', 'error')
+            return _render_form()
+        if values['volunteer_id'] not in roster.ids:
+            flash(f'Evaluation {number} does not name a volunteer from the list. Nothing was submitted.', 'error')
+            return _render_form()
+        rows.append(values)
+    
+    if len({values['volunteer_id'] for values in rows}) != len(rows):
+        flash('Each volunteer can only be evaluated once per submission. Nothing was submitted.', 'error')
+        return _render_form()
+    
+    if queue_enabled():
+        now = datetime.utcnow()
+        for values in rows:
+            values['submitted_at'] = now
+        enqueue_submissions(rows)
+        flash(f'{len(rows)} evaluations received! Thank you for your feedback.', 'success')
+        return redirect(url_for('evaluation.submit_evaluation'))
+    
+    try:
+        created = []
+        skipped = []
+        for values, number in zip(rows, allocate_evaluation_numbers(len(rows))):
+            values['evaluation_id'] = format_evaluation_id(number)
+            evaluation = insert_evaluation(values)
+            if evaluation is None:
+                skipped.append(values['volunteer_id'])
+                continue
+            record_evaluation_added(evaluation)
+            add_evaluation_to_daily_stats(evaluation)
+            created.append(evaluation)
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        flash(f'Error submitting evaluations: {str(e)}. Nothing was submitted.', 'error')
+        return _render_form()
+    
+    publish_evaluations_submitted(created)
+    
+    if skipped:
+        names = {id: f'{first_name} {last_name}' for id, first_name, last_name in roster.volunteers}
+        flash(f'⚠️ Already submitted earlier, skipped: {", ".join(names[id] for id in skipped)}.', 'warning')
+    flash(f'{len(created)} evaluations submitted successfully! Thank you for your feedback.', 'success')
+    return redirect(url_for('evaluation.submit_evaluation'))
+
+@evaluation_bp.route('/evaluate/volunteers')
 def get_volunteers():
-    """API endpoint to get list of active volunteers"""
-    volunteers = Volunteer.query.filter_by(status='active').order_by(Volunteer.name).all()
-    return jsonify([{
-        'id': v.id,
-        'name': v.name,
-        'department': v.department,
-        'role': v.role
-    } for v in volunteers])
+    """Active volunteers for the public form, from the cached roster"""
+    return Response(get_roster().json, mimetype='application/json')
+
+@evaluation_bp.route('/evaluate/volunteers/search')
+def search_volunteer_names():
+    """Typeahead: active volunteers whose first, last or full name starts with ?q="""
+    try:
+        limit = parse_search_limit(request.args.get('limit'))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    return jsonify([{'id': v['id'], 'name': v['name']}
+                    for v in search_volunteers(request.args.get('q', ''), limit)])
@@ -1,18 +1,22 @@
 from flask import Blueprint, render_template, request, jsonify, redirect, url_for
 from models import db, Evaluation, Volunteer, Role, Event
 from datetime import datetime
+from utils.rollups import record_evaluation_added
+from utils.daily_stats import add_evaluation_to_daily_stats
+from utils.live_feed import publish_evaluation_submitted
+from utils.id_allocator import next_evaluation_id
+from utils.roster import get_roster
 
 evaluation_bp = Blueprint('evaluation', __name__, url_prefix='/evaluate')
 
 @evaluation_bp.route('/', methods=['GET'])
 def evaluation_form():
     """Display the public evaluation form"""
-    volunteers = Volunteer.query.filter_by(status='Active').order_by(Volunteer.last_name).all()
     roles = Role.query.all()
     events = Event.query.order_by(Event.event_date.desc()).limit(20).all()
     
     return render_template('evaluation-form.html', 
-                         volunteers=volunteers,
+                         volunteer_options=get_roster().options_html,
                          roles=roles,
                          events=events)
 
@@ -22,10 +26,8 @@ def submit_evaluation():
     try:
         data = request.form
         
-        # Generate evaluation ID
-        last_eval = Evaluation.query.order_by(Evaluation.id.desc()).first()
-        eval_number = (last_eval.id + 1) if last_eval else 1
-        evaluation_id = f"EVAL-{eval_number:05d}"
+        # Generate evaluation ID (atomic sequence/counter, no read of the last row)
+        evaluation_id = next_evaluation_id()
         
         # Create evaluation
         evaluation = Evaluation(
@@ -47,7 +49,10 @@ def submit_evaluation():
         )
         
         db.session.add(evaluation)
+        record_evaluation_added(evaluation)
+        add_evaluation_to_daily_stats(evaluation)
         db.session.commit()
+        publish_evaluation_submitted(evaluation)
         
         return jsonify({
             'success': True,
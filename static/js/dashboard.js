@@ -4,12 +4,112 @@ document.addEventListener('DOMContentLoaded', function() {
     // Load statistics
     loadStats();
     
-    // Auto-refresh stats every 5 minutes
-    setInterval(loadStats, 300000);
+    // Live updates pushed by the server; fall back to polling every 5 minutes
+    if (window.EventSource) {
+        connectLiveFeed();
+    } else {
+        setInterval(loadStats, 300000);
+    }
 });
 
+function connectLiveFeed() {
+    const source = new EventSource('/dashboard/live');
+    
+    source.addEventListener('evaluation', event => {
+        addRecentEvaluation(JSON.parse(event.data));
+    });
+    
+    source.addEventListener('aggregate', event => {
+        const data = JSON.parse(event.data);
+        updateLiveStat('total_evaluations', data.total_evaluations);
+        updateLiveStat('total_volunteers', data.total_volunteers);
+        updateStatsDisplay(data.last_30_days);
+    });
+    
+    // The server refused the stream (too many live dashboards) - poll instead
+    source.addEventListener('error', () => {
+        if (source.readyState === EventSource.CLOSED) {
+            setInterval(loadStats, 300000);
+        }
+    });
+}
+
+function updateLiveStat(name, value) {
+    const element = document.querySelector(`[data-live-stat="${name}"]`);
+    if (element && value !== undefined) {
+        element.textContent = value;
+    }
+}
+
+function addRecentEvaluation(evaluation) {
+    const tbody = document.getElementById('recent-evaluations-body');
+    if (!tbody) {
+        return;
+    }
+    
+    const row = document.createElement('tr');
+    const addCell = (content) => {
+        const cell = document.createElement('td');
+        if (content instanceof Node) {
+            cell.appendChild(content);
+        } else {
+            cell.textContent = content;
+        }
+        row.appendChild(cell);
+        return cell;
+    };
+    
+    let dateText = 'N/A';
+    if (evaluation.evaluation_date) {
+        const [year, month, day] = evaluation.evaluation_date.split('-');
+        dateText = `${month}/${day}/${year}`;
+    }
+    addCell(dateText);
+    
+    const link = document.createElement('a');
+    link.href = `/dashboard/volunteer/${evaluation.volunteer_id}`;
+    link.textContent = evaluation.volunteer_name;
+    addCell(link);
+    
+    addCell(evaluation.role_performed || 'N/A');
+    addCell(evaluation.event_name || 'N/A');
+    
+    const score = document.createElement('span');
+    const scoreClass = evaluation.overall >= 8 ? 'score-excellent' : evaluation.overall >= 6 ? 'score-good' : 'score-low';
+    score.className = `score-badge ${scoreClass}`;
+    score.textContent = evaluation.overall.toFixed(1);
+    addCell(score);
+    
+    const workAgain = document.createElement('span');
+    if (evaluation.would_work_again) {
+        const badgeClass = {'Yes': 'yes', 'No': 'no'}[evaluation.would_work_again] || 'maybe';
+        workAgain.className = `work-again-badge ${badgeClass}`;
+        workAgain.textContent = evaluation.would_work_again;
+    } else {
+        workAgain.style.color = '#94a3b8';
+        workAgain.textContent = '—';
+    }
+    addCell(workAgain);
+    
+    const evaluatorCell = addCell(evaluation.evaluator_name || '');
+    if (evaluation.evaluator_role) {
+        const badge = document.createElement('span');
+        badge.className = 'evaluator-role-badge';
+        badge.textContent = evaluation.evaluator_role;
+        evaluatorCell.appendChild(document.createTextNode(' '));
+        evaluatorCell.appendChild(badge);
+    }
+    
+    tbody.insertBefore(row, tbody.firstChild);
+    
+    // Keep the table at the same 10 rows the server renders
+    while (tbody.rows.length > 10) {
+        tbody.deleteRow(tbody.rows.length - 1);
+    }
+}
+
 function loadStats(period = 30) {
-    fetch(`/api/stats?period=${period}`)
+    fetch(`/dashboard/api/stats?period=${period}`)
         .then(response => response.json())
         .then(data => {
             updateStatsDisplay(data);
@@ -0,0 +1,118 @@
+"""
+Shared fixtures: the app on a throwaway SQLite database, seeded volunteers
+and evaluations, a logged-in client and a SQL statement counter.
+"""
+import os
+import sys
+import tempfile
+from contextlib import contextmanager
+from datetime import date, datetime, timedelta
+
+import pytest
+from sqlalchemy import event
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Config reads DATABASE_URL when it is imported
+_database_dir = tempfile.mkdtemp(prefix='volunteer-eval-tests-')
+os.environ['DATABASE_URL'] = 'sqlite:///' + os.path.join(_database_dir, 'test.db')
+
+from app_new import app as flask_app  # noqa: E402
+from models import db, User, Volunteer, Evaluation  # noqa: E402
+from utils.cache import analytics_cache, fragment_cache  # noqa: E402
+from utils.roster import roster_cache  # noqa: E402
+from utils.conditional import ensure_data_version  # noqa: E402
+from utils.id_allocator import ensure_evaluation_counter  # noqa: E402
+from utils.submissions import ensure_submission_index  # noqa: E402
+from utils.rollups import rebuild_rollups  # noqa: E402
+from utils.daily_stats import rebuild_daily_stats  # noqa: E402
+
+ADMIN_USERNAME = 'admin'
+ADMIN_PASSWORD = 'test-password'
+
+
+@pytest.fixture
+def app():
+    """The app with empty tables (plus an admin user) and empty caches"""
+    flask_app.config.update(TESTING=True)
+    with flask_app.app_context():
+        db.drop_all()
+        db.create_all()
+        ensure_data_version()
+        ensure_evaluation_counter()
+        ensure_submission_index()
+        admin = User(username=ADMIN_USERNAME, role='admin')
+        admin.set_password(ADMIN_PASSWORD)
+        db.session.add(admin)
+        db.session.commit()
+    analytics_cache.clear()
+    fragment_cache.clear()
+    roster_cache.invalidate()
+    yield flask_app
+    with flask_app.app_context():
+        db.session.remove()
+
+
+@pytest.fixture
+def client(app):
+    """Test client logged in as the admin"""
+    client = app.test_client()
+    # Following the redirect renders (and clears) the login flash message
+    client.post('/login', data={'username': ADMIN_USERNAME, 'password': ADMIN_PASSWORD}, follow_redirects=True)
+    return client
+
+
+@pytest.fixture
+def seed(app):
+    """seed(evaluations_per_volunteer, volunteers=1) -> ids of the new volunteers
+
+    Evaluations are inserted directly and the rollups and daily buckets
+    rebuilt afterwards, as an import would.
+    """
+    def seed(evaluations_per_volunteer, volunteers=1):
+        with app.app_context():
+            first = Volunteer.query.count()
+            new_volunteers = [Volunteer(first_name=f'First{first + i}', last_name=f'Last{first + i}', status='active')
+                              for i in range(volunteers)]
+            db.session.add_all(new_volunteers)
+            db.session.flush()
+
+            number = Evaluation.query.count()
+            today = date.today()
+            for volunteer in new_volunteers:
+                for i in range(evaluations_per_volunteer):
+                    number += 1
+                    rating = (volunteer.id + i) % 10 + 1
+                    db.session.add(Evaluation(
+                        evaluation_id=f'SEED-{number:05d}', volunteer_id=volunteer.id, date_of_service=today,
+                        reliability=rating, quality_of_work=rating, initiative=rating, teamwork=rating,
+                        communication=rating, event_name=f'Event {i}', evaluator_name=f'Lead {i}',
+                        role_performed='Greeter', would_work_again='Yes',
+                        evaluation_date=today - timedelta(days=i), submitted_at=datetime.utcnow() - timedelta(days=i)
+                    ))
+            db.session.commit()
+            rebuild_rollups()
+            rebuild_daily_stats()
+            return [volunteer.id for volunteer in new_volunteers]
+    return seed
+
+
+@pytest.fixture
+def count_queries(app):
+    """Context manager collecting the SQL statements executed inside it"""
+    with app.app_context():
+        engine = db.engine
+
+    @contextmanager
+    def count_queries():
+        statements = []
+
+        def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+
+        event.listen(engine, 'before_cursor_execute', before_cursor_execute)
+        try:
+            yield statements
+        finally:
+            event.remove(engine, 'before_cursor_execute', before_cursor_execute)
+    return count_queries
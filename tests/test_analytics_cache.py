@@ -0,0 +1,41 @@
+"""Cached analytics follow writes made by other worker processes"""
+from sqlalchemy import text
+from models import db
+from utils.analytics import calculate_all_volunteer_stats
+
+
+def _write_from_another_worker(app, volunteer_id):
+    """Copy an evaluation and bump a data version shard outside this process's session hooks"""
+    with app.app_context(), db.engine.begin() as connection:
+        connection.execute(text(
+            "INSERT INTO evaluations (evaluation_id, volunteer_id, date_of_service, reliability, quality_of_work, "
+            "initiative, teamwork, communication, event_name, evaluator_name, role_performed, would_work_again, "
+            "evaluation_date, submitted_at) "
+            "SELECT 'OTHER-00001', volunteer_id, date_of_service, reliability, quality_of_work, initiative, "
+            "teamwork, communication, 'Other worker', evaluator_name, role_performed, would_work_again, "
+            "evaluation_date, submitted_at FROM evaluations WHERE volunteer_id = :id LIMIT 1"
+        ), {'id': volunteer_id})
+        connection.execute(text("UPDATE data_versions SET version = version + 1 WHERE name = 'data:3'"))
+
+
+def test_cache_is_keyed_on_the_shared_data_version(app, seed):
+    volunteer_id, = seed(2)
+    with app.app_context():
+        assert calculate_all_volunteer_stats()[volunteer_id]['evaluation_count'] == 2
+
+    _write_from_another_worker(app, volunteer_id)
+
+    with app.app_context():
+        assert calculate_all_volunteer_stats()[volunteer_id]['evaluation_count'] == 3
+
+
+def test_volunteers_page_is_not_pinned_to_a_stale_body(app, client, seed):
+    volunteer_id, = seed(2)
+    first = client.get('/dashboard/volunteers')
+
+    _write_from_another_worker(app, volunteer_id)
+
+    response = client.get('/dashboard/volunteers', headers={'If-None-Match': first.headers['ETag']})
+    assert response.status_code == 200
+    assert response.headers['ETag'] != first.headers['ETag']
+    assert response.data != first.data
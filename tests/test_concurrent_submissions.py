@@ -0,0 +1,72 @@
+"""Stress test: simultaneous form submissions get unique ids and correct totals"""
+import threading
+
+import pytest
+
+from models import db, Evaluation, VolunteerScoreRollup, EvaluationDailyStats
+from utils import id_allocator
+from utils.rollups import rebuild_rollups
+from utils.daily_stats import rebuild_daily_stats
+
+THREADS = 8
+SUBMISSIONS_PER_THREAD = 10
+
+
+def _rollup_rows():
+    return {
+        r.volunteer_id: (r.evaluation_count, r.reliability_sum, r.communication_count,
+                         r.work_again_yes_count, r.last_evaluation_date, round(r.overall_average, 6))
+        for r in VolunteerScoreRollup.query
+    }
+
+
+def _daily_rows():
+    return {
+        (r.basis, r.day): (r.evaluation_count, r.reliability_sum, r.communication_sum)
+        for r in EvaluationDailyStats.query
+    }
+
+
+@pytest.mark.parametrize('block_size', [1, 10])
+def test_concurrent_submissions(app, seed, monkeypatch, block_size):
+    volunteer_ids = seed(3, volunteers=4)
+    monkeypatch.setitem(app.config, 'EVALUATION_ID_BLOCK_SIZE', block_size)
+    # Numbers reserved against an earlier test's database
+    id_allocator._block['numbers'].clear()
+
+    errors = []
+
+    def submit(thread):
+        client = app.test_client()
+        for i in range(SUBMISSIONS_PER_THREAD):
+            response = client.post('/evaluate', data={
+                'volunteer_id': volunteer_ids[(thread + i) % len(volunteer_ids)],
+                'evaluator_name': f'Lead {thread}-{i}',
+                'event_name': 'Stress Test',
+                'evaluation_date': '2026-10-01',
+                'role_performed': 'Greeter',
+                'would_work_again': 'Yes',
+                'reliability': 8, 'quality_of_work': 7, 'initiative': 9, 'teamwork': 8, 'communication': 6,
+            })
+            if response.status_code != 302:
+                errors.append(response.status_code)
+
+    threads = [threading.Thread(target=submit, args=(n,)) for n in range(THREADS)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert errors == []
+    with app.app_context():
+        evaluation_ids = [e.evaluation_id for e in Evaluation.query.filter_by(event_name='Stress Test')]
+        assert len(evaluation_ids) == THREADS * SUBMISSIONS_PER_THREAD
+        assert len(set(evaluation_ids)) == len(evaluation_ids)
+
+        # Incrementally maintained totals match a recount from the evaluations
+        rollups, daily = _rollup_rows(), _daily_rows()
+        rebuild_rollups()
+        rebuild_daily_stats()
+        assert rollups == _rollup_rows()
+        assert daily == _daily_rows()
+        db.session.remove()
@@ -0,0 +1,42 @@
+"""ETag / Last-Modified handling for the dashboard and API"""
+from utils.conditional import get_data_version
+
+
+def test_unchanged_page_is_not_modified(client):
+    etag = client.get('/dashboard/volunteers').headers['ETag']
+
+    response = client.get('/dashboard/volunteers', headers={'If-None-Match': etag})
+
+    assert response.status_code == 304
+
+
+def test_anonymous_request_is_redirected_to_login(app, client):
+    last_modified = client.get('/dashboard/volunteers').headers['Last-Modified']
+
+    response = app.test_client().get('/dashboard/volunteers', headers={'If-Modified-Since': last_modified})
+
+    assert response.status_code == 302
+    assert '/login' in response.headers['Location']
+
+
+def test_writes_change_the_data_version(app, client, seed):
+    with app.app_context():
+        before = get_data_version()[0]
+    etag = client.get('/dashboard/volunteers').headers['ETag']
+
+    # Enough transactions to land on several shards
+    for _ in range(5):
+        seed(1)
+
+    with app.app_context():
+        assert get_data_version()[0] == before + 5
+    assert client.get('/dashboard/volunteers', headers={'If-None-Match': etag}).status_code == 200
+
+
+def test_api_answers_304_while_a_login_flash_is_pending(app):
+    client = app.test_client()
+    # Log in without following the redirect, as an API client would
+    client.post('/login', data={'username': 'admin', 'password': 'test-password'})
+    etag = client.get('/api/volunteers').headers['ETag']
+
+    assert client.get('/api/volunteers', headers={'If-None-Match': etag}).status_code == 304
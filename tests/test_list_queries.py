@@ -0,0 +1,34 @@
+"""N+1 regression tests: list pages run a constant number of queries"""
+import pytest
+
+LIST_URLS = [
+    '/dashboard/',  # recent evaluations panel
+    '/dashboard/volunteers',
+    '/api/evaluations?limit=100',
+    '/api/volunteers',
+]
+
+
+def _query_count(client, count_queries, url):
+    with count_queries() as statements:
+        response = client.get(url)
+    assert response.status_code == 200
+    return len(statements)
+
+
+@pytest.mark.parametrize('url', LIST_URLS)
+def test_list_query_count_does_not_grow_with_rows(client, seed, count_queries, url):
+    seed(2, volunteers=2)
+    few = _query_count(client, count_queries, url)
+
+    seed(5, volunteers=15)
+    many = _query_count(client, count_queries, url)
+
+    assert many == few
+
+
+def test_recent_evaluations_render_each_volunteer(client, seed):
+    seed(1, volunteers=3)
+    html = client.get('/dashboard/').get_data(as_text=True)
+    for i in range(3):
+        assert f'First{i} Last{i}' in html
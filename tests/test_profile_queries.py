@@ -0,0 +1,35 @@
+"""Query bounds for the volunteer profile page"""
+from utils.analytics import get_volunteer_profile
+
+# Login user, data version, volunteer, rollup and evaluations
+PROFILE_PAGE_MAX_QUERIES = 5
+
+
+def _evaluation_selects(statements):
+    return [s for s in statements if s.lstrip().upper().startswith('SELECT') and 'FROM evaluations' in s]
+
+
+def test_profile_fetches_evaluations_once(app, seed, count_queries):
+    volunteer_id, = seed(12)
+
+    with app.app_context(), count_queries() as statements:
+        profile = get_volunteer_profile(volunteer_id)
+
+    assert len(_evaluation_selects(statements)) == 1
+    assert len(statements) == 4  # volunteer, evaluations, data version, rollup
+    assert profile['stats']['evaluation_count'] == 12
+    assert len(profile['evaluations']) == 12
+    assert profile['stats']['work_again_summary'] == {'Yes': 12, 'Maybe': 0, 'No': 0}
+
+
+def test_profile_page_query_count_does_not_grow_with_history(client, seed, count_queries):
+    short_history, long_history = seed(2), seed(30)
+
+    with count_queries() as short_statements:
+        assert client.get(f'/dashboard/volunteer/{short_history[0]}').status_code == 200
+    with count_queries() as long_statements:
+        assert client.get(f'/dashboard/volunteer/{long_history[0]}').status_code == 200
+
+    assert len(long_statements) == len(short_statements)
+    assert len(long_statements) <= PROFILE_PAGE_MAX_QUERIES
+    assert len(_evaluation_selects(long_statements)) == 1
@@ -0,0 +1,43 @@
+"""Score rollups give the same averages as computing them from the evaluations"""
+from datetime import date
+from sqlalchemy import text
+from models import db, Volunteer, Evaluation
+from utils.rollups import record_evaluation_added, rebuild_rollups
+
+
+def _add_evaluation(volunteer_id, number, **ratings):
+    values = dict(reliability=8, quality_of_work=8, initiative=8, teamwork=8, communication=8)
+    values.update(ratings)
+    evaluation = Evaluation(evaluation_id=f'TEST-{number:05d}', volunteer_id=volunteer_id,
+                            evaluator_name=f'Lead {number}', evaluation_date=date(2026, 10, 4),
+                            date_of_service=date(2026, 10, 4), **values)
+    db.session.add(evaluation)
+    db.session.flush()
+    record_evaluation_added(evaluation)
+    db.session.commit()
+
+
+def test_zero_ratings_are_not_counted(app, seed):
+    volunteer_id, = seed(0)
+    with app.app_context():
+        _add_evaluation(volunteer_id, 1, teamwork=6)
+        _add_evaluation(volunteer_id, 2, teamwork=0)
+        incremental = db.session.get(Volunteer, volunteer_id).get_average_scores()
+
+        rebuild_rollups(volunteer_id)
+        rebuilt = db.session.get(Volunteer, volunteer_id).get_average_scores()
+
+    assert incremental['teamwork'] == rebuilt['teamwork'] == 6
+    assert incremental == rebuilt
+
+
+def test_average_scores_without_a_rollup_row(app, seed):
+    volunteer_id, = seed(3)
+    with app.app_context():
+        expected = db.session.get(Volunteer, volunteer_id).get_average_scores()
+        # As if the evaluations had been imported outside the app
+        db.session.execute(text('DELETE FROM volunteer_score_rollups'))
+        db.session.commit()
+
+        assert db.session.get(Volunteer, volunteer_id).get_average_scores() == expected
+        assert db.session.get(Volunteer, seed(0)[0]).get_average_scores() is None
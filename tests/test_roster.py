@@ -0,0 +1,62 @@
+"""The cached volunteer roster follows changes made by other worker processes"""
+from sqlalchemy import text
+from models import db, Evaluation
+from utils.roster import get_roster
+
+
+def _add_volunteer_from_another_worker(app):
+    """Insert a volunteer and bump a data version shard outside this process's session hooks"""
+    with app.app_context(), db.engine.begin() as connection:
+        volunteer_id = connection.execute(text(
+            "INSERT INTO volunteers (first_name, last_name, status) VALUES ('Newly', 'Added', 'active') RETURNING id"
+        )).scalar()
+        connection.execute(text("UPDATE data_versions SET version = version + 1 WHERE name = 'data:5'"))
+    return volunteer_id
+
+
+def test_roster_sees_volunteers_added_by_another_worker(app, seed):
+    seed(1)
+    with app.app_context():
+        get_roster()
+
+    volunteer_id = _add_volunteer_from_another_worker(app)
+
+    with app.app_context():
+        assert volunteer_id in get_roster().ids
+
+
+def test_batch_accepts_a_volunteer_added_by_another_worker(app, seed):
+    seed(1)
+    client = app.test_client()
+    client.get('/evaluate')  # builds the roster
+
+    volunteer_id = _add_volunteer_from_another_worker(app)
+
+    ratings = {f'evaluations-0-{field}': '8' for field in
+               ['reliability', 'quality_of_work', 'initiative', 'teamwork', 'communication']}
+    response = client.post('/evaluate/batch', data={
+        'event_name': 'Sunday', 'evaluation_date': '2026-10-04', 'evaluator_name': 'Lead',
+        'evaluations-0-volunteer_id': str(volunteer_id), **ratings
+    })
+
+    assert response.status_code == 302
+    with app.app_context():
+        assert Evaluation.query.filter_by(volunteer_id=volunteer_id).count() == 1
+
+
+def test_search_finds_volunteers_added_by_another_worker(app, client, seed):
+    seed(1)
+    assert client.get('/api/volunteers/search?q=newly').get_json() == []
+
+    volunteer_id = _add_volunteer_from_another_worker(app)
+
+    assert [v['id'] for v in client.get('/api/volunteers/search?q=newly').get_json()] == [volunteer_id]
+
+
+def test_volunteers_list_search_is_capped(client, seed, monkeypatch):
+    monkeypatch.setattr('routes.dashboard_routes.VOLUNTEER_SEARCH_PAGE_SIZE', 3)
+    seed(0, volunteers=5)
+
+    response = client.get('/dashboard/volunteers?search=first')
+
+    assert b'Showing the first <strong>3</strong>' in response.data
@@ -0,0 +1,29 @@
+"""Duplicate evaluation detection, with and without the unique submission index"""
+from datetime import date
+import pytest
+from models import db, Evaluation
+import utils.submissions
+from utils.submissions import insert_evaluation
+
+
+def _values(volunteer_id, number, evaluator_name):
+    return dict(
+        evaluation_id=f'TEST-{number:05d}', volunteer_id=volunteer_id, evaluator_name=evaluator_name,
+        event_name='Sunday', evaluation_date=date(2026, 10, 4), date_of_service=date(2026, 10, 4),
+        reliability=8, quality_of_work=8, initiative=8, teamwork=8, communication=8
+    )
+
+
+@pytest.mark.parametrize('index_available', [True, False])
+@pytest.mark.parametrize('evaluator_name', ['Lead', None])
+def test_second_submission_is_a_duplicate(app, seed, monkeypatch, index_available, evaluator_name):
+    volunteer_id, = seed(0)
+    if not index_available:
+        # Databases where the index could not be created check before inserting
+        monkeypatch.setattr(utils.submissions, '_index_available', False)
+
+    with app.app_context():
+        assert insert_evaluation(_values(volunteer_id, 1, evaluator_name)) is not None
+        db.session.commit()
+        assert insert_evaluation(_values(volunteer_id, 2, evaluator_name)) is None
+        assert Evaluation.query.filter_by(volunteer_id=volunteer_id).count() == 1
@@ -0,0 +1,141 @@
+"""
+Ad-hoc aggregate reports over evaluations
+
+Translates whitelisted group_by dimensions and metrics into a single SQL
+GROUP BY, so questions like "average teamwork by event and role per
+month" run in the database. Results go through the analytics cache.
+"""
+from sqlalchemy import func
+from models import db, Volunteer, Evaluation
+from utils.analytics import overall_score_expression
+from utils.cache import cached_analytics
+from utils.export import apply_evaluation_filters
+
+# Dimension name -> columns to group by (the first one names the output key)
+DIMENSIONS = {
+    'volunteer': [Evaluation.volunteer_id, Volunteer.first_name, Volunteer.last_name],
+    'event_name': [Evaluation.event_name],
+    'role_performed': [Evaluation.role_performed],
+    'evaluator_name': [Evaluation.evaluator_name],
+    'service_year': [Evaluation.service_year],
+    'service_month': [Evaluation.service_month],
+}
+
+RATING_COLUMNS = {
+    'reliability': Evaluation.reliability,
+    'quality_of_work': Evaluation.quality_of_work,
+    'initiative': Evaluation.initiative,
+    'teamwork': Evaluation.teamwork,
+    'communication': Evaluation.communication,
+    'models_the_work': Evaluation.models_the_work,
+    'enthusiasm_to_serve_again': Evaluation.enthusiasm_to_serve_again,
+}
+
+FUNCTIONS = {
+    'avg': func.avg,
+    'min': func.min,
+    'max': func.max,
+}
+
+DEFAULT_METRICS = ['count', 'avg_overall']
+DEFAULT_LIMIT = 1000
+MAX_LIMIT = 5000
+
+def _rating_expression(name):
+    if name == 'overall':
+        return overall_score_expression()
+    return RATING_COLUMNS[name]
+
+def _metric_expression(metric):
+    """SQL expression for a metric name such as count or avg_teamwork"""
+    if metric == 'count':
+        return func.count(Evaluation.id)
+    function, _, rating = metric.partition('_')
+    return FUNCTIONS[function](_rating_expression(rating))
+
+def available_metrics():
+    ratings = list(RATING_COLUMNS) + ['overall']
+    return ['count'] + [f'{fn}_{rating}' for fn in FUNCTIONS for rating in ratings]
+
+def parse_aggregate_request(args):
+    """(group_by, metrics, order_by, limit) from request args
+
+    Raises ValueError for anything outside the whitelists.
+    """
+    group_by = [g.strip() for g in args.get('group_by', '').split(',') if g.strip()]
+    unknown = [g for g in group_by if g not in DIMENSIONS]
+    if unknown:
+        raise ValueError(f'Unknown group_by: {", ".join(unknown)} (available: {", ".join(DIMENSIONS)})')
+
+    metrics = [m.strip() for m in args.get('metrics', '').split(',') if m.strip()] or DEFAULT_METRICS
+    allowed = available_metrics()
+    unknown = [m for m in metrics if m not in allowed]
+    if unknown:
+        raise ValueError(f'Unknown metrics: {", ".join(unknown)} (available: {", ".join(allowed)})')
+
+    order_by = args.get('order_by', '').strip() or None
+    if order_by and order_by.lstrip('-') not in group_by + metrics:
+        raise ValueError('order_by must be one of the requested group_by fields or metrics')
+
+    try:
+        limit = int(args.get('limit', DEFAULT_LIMIT))
+    except ValueError:
+        raise ValueError(f'Invalid limit "{args.get("limit")}"')
+    if not 1 <= limit <= MAX_LIMIT:
+        raise ValueError(f'limit must be between 1 and {MAX_LIMIT}')
+
+    return tuple(dict.fromkeys(group_by)), tuple(dict.fromkeys(metrics)), order_by, limit
+
+def _dimension_values(dimension, values):
+    if dimension == 'volunteer':
+        volunteer_id, first_name, last_name = values
+        return {'volunteer_id': volunteer_id, 'volunteer_name': f'{first_name} {last_name}'}
+    return {dimension: values[0]}
+
+def _metric_value(value):
+    if value is None or isinstance(value, int):
+        return value
+    return round(float(value), 2)
+
+@cached_analytics
+def run_aggregate(group_by, metrics, filters=(), order_by=None, limit=DEFAULT_LIMIT):
+    """Run one GROUP BY query; returns (rows, truncated)
+
+    group_by and metrics must already be validated (see
+    parse_aggregate_request); filters is a tuple of (name, value) pairs as
+    produced by parse_export_filters.
+    """
+    group_columns = [column for g in group_by for column in DIMENSIONS[g]]
+    metric_columns = [_metric_expression(m).label(m) for m in metrics]
+
+    query = db.session.query(*group_columns, *metric_columns)
+    if 'volunteer' in group_by:
+        query = query.join(Volunteer, Volunteer.id == Evaluation.volunteer_id)
+    else:
+        query = query.select_from(Evaluation)
+    query = apply_evaluation_filters(query, dict(filters))
+    if group_columns:
+        query = query.group_by(*group_columns)
+
+    if order_by:
+        name = order_by.lstrip('-')
+        column = metric_columns[metrics.index(name)] if name in metrics else DIMENSIONS[name][0]
+        query = query.order_by(column.desc() if order_by.startswith('-') else column)
+    elif group_columns:
+        query = query.order_by(*group_columns)
+
+    results = query.limit(limit + 1).all()
+
+    rows = []
+    for result in results[:limit]:
+        row = {}
+        position = 0
+        for dimension in group_by:
+            width = len(DIMENSIONS[dimension])
+            row.update(_dimension_values(dimension, result[position:position + width]))
+            position += width
+        for metric in metrics:
+            row[metric] = _metric_value(result[position])
+            position += 1
+        rows.append(row)
+    return rows, len(results) > limit
@@ -1,53 +1,58 @@
 from models import db, Volunteer, Evaluation
+from utils.rollups import get_volunteer_rollup, compute_volunteer_rollup
+from utils.snapshot import EvaluationSnapshot
+from utils.cache import cached_analytics
 from sqlalchemy import func
 from datetime import datetime, timedelta
 import numpy as np
 
-def calculate_volunteer_stats(volunteer_id):
-    """Calculate comprehensive statistics for a volunteer"""
-    volunteer = Volunteer.query.get(volunteer_id)
-    if not volunteer:
-        return None
-    
-    evaluations = volunteer.evaluations.all()
-    
-    if not evaluations:
+# The 5 core categories that make up a volunteer's overall rating
+OVERALL_METRICS = ['reliability', 'quality_of_work', 'initiative', 'teamwork', 'communication']
+
+def overall_score_expression():
+    """SQL expression for an evaluation's overall rating (mean of the 5 core categories)"""
+    return (Evaluation.reliability + Evaluation.quality_of_work + Evaluation.initiative +
+            Evaluation.teamwork + Evaluation.communication) / 5.0
+
+def _evaluation_overall(e):
+    """Overall rating of one evaluation (mean of the 5 core categories)"""
+    return (e.reliability + e.quality_of_work + e.initiative + e.teamwork + e.communication) / 5
+
+def _stats_from_rollup(rollup):
+    """Evaluation count, category averages and work-again answers from a score rollup"""
+    if rollup is None or not rollup.evaluation_count:
         return {
             'evaluation_count': 0,
             'average_overall': None,
             'average_by_category': {},
-            'trend': None,
-            'recent_performance': None
+            'work_again_summary': None
         }
     
-    # Calculate averages from the 5 individual ratings
-    avg_reliability = sum(e.reliability for e in evaluations) / len(evaluations)
-    avg_communication = sum(e.communication for e in evaluations) / len(evaluations)
-    avg_teamwork = sum(e.teamwork for e in evaluations) / len(evaluations)
-    avg_initiative = sum(e.initiative for e in evaluations) / len(evaluations)
-    avg_quality = sum(e.quality_of_work for e in evaluations) / len(evaluations)
-    
-    # Calculate overall average from the 5 categories
-    avg_overall = (avg_reliability + avg_communication + avg_teamwork + avg_initiative + avg_quality) / 5
-    
+    return {
+        'evaluation_count': rollup.evaluation_count,
+        'average_overall': round(rollup.overall_average, 2),
+        'average_by_category': {
+            'reliability': round(rollup.get_metric_average('reliability') or 0, 2),
+            'communication': round(rollup.get_metric_average('communication') or 0, 2),
+            'teamwork': round(rollup.get_metric_average('teamwork') or 0, 2),
+            'initiative': round(rollup.get_metric_average('initiative') or 0, 2),
+            'quality': round(rollup.get_metric_average('quality_of_work') or 0, 2)
+        },
+        'work_again_summary': rollup.get_work_again_summary()
+    }
+
+def _recent_stats_from_evaluations(evaluations):
+    """Trend and last-30-days performance from an already-loaded list of evaluations"""
     # Calculate trend (comparing recent vs older evaluations)
     trend = None
     if len(evaluations) >= 4:
         sorted_evals = sorted(evaluations, key=lambda e: e.evaluation_date if e.evaluation_date else e.submitted_at)
         half = len(sorted_evals) // 2
         
-        # Calculate average for older half
-        older_scores = []
-        for e in sorted_evals[:half]:
-            score = (e.reliability + e.quality_of_work + e.initiative + e.teamwork + e.communication) / 5
-            older_scores.append(score)
+        older_scores = [_evaluation_overall(e) for e in sorted_evals[:half]]
         older_avg = sum(older_scores) / len(older_scores)
         
-        # Calculate average for recent half
-        recent_scores = []
-        for e in sorted_evals[half:]:
-            score = (e.reliability + e.quality_of_work + e.initiative + e.teamwork + e.communication) / 5
-            recent_scores.append(score)
+        recent_scores = [_evaluation_overall(e) for e in sorted_evals[half:]]
         recent_avg = sum(recent_scores) / len(recent_scores)
         
         trend = 'improving' if recent_avg > older_avg else 'declining' if recent_avg < older_avg else 'stable'
@@ -57,50 +62,31 @@ def calculate_volunteer_stats(volunteer_id):
     recent_evals = [e for e in evaluations if e.submitted_at >= thirty_days_ago]
     recent_performance = None
     if recent_evals:
-        recent_scores = [(e.reliability + e.quality_of_work + e.initiative + e.teamwork + e.communication) / 5 for e in recent_evals]
+        recent_scores = [_evaluation_overall(e) for e in recent_evals]
         recent_performance = sum(recent_scores) / len(recent_scores)
     
     return {
-        'evaluation_count': len(evaluations),
-        'average_overall': round(avg_overall, 2),
-        'average_by_category': {
-            'reliability': round(avg_reliability, 2),
-            'communication': round(avg_communication, 2),
-            'teamwork': round(avg_teamwork, 2),
-            'initiative': round(avg_initiative, 2),
-            'quality': round(avg_quality, 2)
-        },
         'trend': trend,
         'recent_performance': round(recent_performance, 2) if recent_performance else None,
         'recent_evaluation_count': len(recent_evals)
     }
 
-def get_department_summary():
-    """Get summary statistics by department"""
-    # Since we don't have department field, return empty list
-    return []
-
-def get_trend_data(volunteer_id, months=6):
-    """Get monthly trend data for a volunteer"""
-    volunteer = Volunteer.query.get(volunteer_id)
-    if not volunteer:
-        return []
-    
+def _trend_from_evaluations(evaluations, months=6):
+    """Monthly trend data from an already-loaded list of evaluations"""
     start_date = datetime.utcnow() - timedelta(days=months * 30)
-    evaluations = volunteer.evaluations.filter(
-        Evaluation.submitted_at >= start_date
-    ).order_by(Evaluation.submitted_at).all()
+    recent = sorted(
+        (e for e in evaluations if e.submitted_at >= start_date),
+        key=lambda e: e.submitted_at
+    )
     
     # Group by month
     monthly_data = {}
-    for eval in evaluations:
+    for eval in recent:
         date_to_use = eval.evaluation_date if eval.evaluation_date else eval.submitted_at
         month_key = date_to_use.strftime('%Y-%m')
         if month_key not in monthly_data:
             monthly_data[month_key] = []
-        # Calculate overall rating from 5 categories
-        overall = (eval.reliability + eval.quality_of_work + eval.initiative + eval.teamwork + eval.communication) / 5
-        monthly_data[month_key].append(overall)
+        monthly_data[month_key].append(_evaluation_overall(eval))
     
     # Calculate monthly averages
     trend_data = []
@@ -113,47 +99,147 @@ def get_trend_data(volunteer_id, months=6):
     
     return trend_data
 
+@cached_analytics
+def calculate_volunteer_stats(volunteer_id):
+    """Evaluation count, averages and work-again answers from the score rollup
+    
+    A primary-key lookup however many evaluations the volunteer has; none
+    are loaded. Returns None if the volunteer does not exist.
+    """
+    rollup = get_volunteer_rollup(volunteer_id)
+    if rollup is None:
+        if db.session.get(Volunteer, volunteer_id) is None:
+            return None
+        # Evaluations written outside the app (e.g. direct imports) - one grouped query
+        rollup = compute_volunteer_rollup(volunteer_id)
+    
+    return _stats_from_rollup(rollup)
+
+def get_volunteer_profile(volunteer_id, months=6):
+    """Everything the profile page needs from a single evaluations fetch
+    
+    Returns the volunteer, stats, monthly trend and evaluations ordered
+    newest first, or None if the volunteer does not exist. Counts and
+    averages come from the (cached) rollup stats; the evaluations, which
+    the page lists, add the trend and recent performance. Not cached
+    itself: the volunteer and evaluations belong to this request's session.
+    """
+    volunteer = db.session.get(Volunteer, volunteer_id)
+    if not volunteer:
+        return None
+    
+    evaluations = Evaluation.query.filter_by(volunteer_id=volunteer_id).order_by(
+        Evaluation.submitted_at.desc()
+    ).all()
+    
+    stats = dict(calculate_volunteer_stats(volunteer_id))
+    stats.update(_recent_stats_from_evaluations(evaluations))
+    
+    return {
+        'volunteer': volunteer,
+        'stats': stats,
+        'trend_data': _trend_from_evaluations(evaluations, months),
+        'evaluations': evaluations
+    }
+
+@cached_analytics
+def calculate_all_volunteer_stats():
+    """Statistics for every evaluated volunteer from one columnar snapshot
+
+    Returns a dict of volunteer id -> the same stats as the volunteer
+    profile's (without work_again_summary), computed with vectorized NumPy
+    group-bys instead of a query and Python loop per volunteer.
+    """
+    return EvaluationSnapshot.load().volunteer_stats()
+
+def get_department_summary():
+    """Get summary statistics by department"""
+    # Since we don't have department field, return empty list
+    return []
+
+def get_volunteer_aggregates(min_evaluations=1, status=None, having=None):
+    """Per-volunteer evaluation counts and averages from a single grouped query
+
+    Returns a list of dicts with the volunteer (id, first_name, last_name
+    and status as a dict, so results can be cached), its evaluation count
+    and the average overall rating (mean of the 5 core categories per
+    evaluation). `having` is an optional extra SQL condition on the
+    aggregated columns.
+    """
+    overall = overall_score_expression()
+    evaluation_count = func.count(Evaluation.id)
+    average_rating = func.avg(overall)
+    
+    query = db.session.query(
+        Volunteer.id,
+        Volunteer.first_name,
+        Volunteer.last_name,
+        Volunteer.status,
+        evaluation_count.label('evaluation_count'),
+        average_rating.label('average_rating')
+    ).join(Evaluation, Evaluation.volunteer_id == Volunteer.id)
+    
+    if status:
+        query = query.filter(func.lower(Volunteer.status) == status.lower())
+    
+    query = query.group_by(Volunteer.id).having(evaluation_count >= min_evaluations)
+    if having is not None:
+        query = query.having(having(evaluation_count, average_rating))
+    
+    results = []
+    for volunteer_id, first_name, last_name, volunteer_status, count, avg in query.all():
+        if avg is None:
+            continue
+        results.append({
+            'volunteer': {'id': volunteer_id, 'first_name': first_name, 'last_name': last_name,
+                          'status': volunteer_status},
+            'score': float(avg),
+            'average_rating': round(float(avg), 2),
+            'evaluation_count': count
+        })
+    return results
+
+@cached_analytics
+def get_performance_lists(top_threshold=8.0, attention_threshold=6.0, top_limit=10,
+                          attention_limit=None, min_evaluations=1, status=None):
+    """Top performers and needs-attention lists from one aggregate query"""
+    rows = get_volunteer_aggregates(
+        min_evaluations=min_evaluations,
+        status=status,
+        having=lambda count, avg: db.or_(avg >= top_threshold, avg < attention_threshold)
+    )
+    
+    top_performers = sorted(
+        (r for r in rows if r['score'] >= top_threshold),
+        key=lambda x: x['score'], reverse=True
+    )
+    needs_attention = sorted(
+        (r for r in rows if r['score'] < attention_threshold),
+        key=lambda x: x['score']
+    )
+    
+    if top_limit is not None:
+        top_performers = top_performers[:top_limit]
+    if attention_limit is not None:
+        needs_attention = needs_attention[:attention_limit]
+    return top_performers, needs_attention
+
+@cached_analytics
 def identify_top_performers(limit=10, min_evaluations=3):
     """Identify top performing volunteers"""
-    # Calculate averages manually since we don't have overall_rating field
-    top_performers = []
-    volunteers = Volunteer.query.all()
-    
-    for vol in volunteers:
-        evals = vol.evaluations.all()
-        if len(evals) >= min_evaluations:
-            total = 0
-            for e in evals:
-                total += (e.reliability + e.quality_of_work + e.initiative + e.teamwork + e.communication) / 5
-            avg = total / len(evals)
-            top_performers.append({
-                'volunteer': vol,
-                'average_rating': round(avg, 2),
-                'evaluation_count': len(evals)
-            })
+    top_performers = get_volunteer_aggregates(min_evaluations=min_evaluations)
     
     # Sort by average rating descending
     top_performers.sort(key=lambda x: x['average_rating'], reverse=True)
     return top_performers[:limit]
 
+@cached_analytics
 def identify_needs_attention(threshold=6.0, min_evaluations=2):
     """Identify volunteers who may need additional support"""
-    needs_attention = []
-    volunteers = Volunteer.query.all()
-    
-    for vol in volunteers:
-        evals = vol.evaluations.all()
-        if len(evals) >= min_evaluations:
-            total = 0
-            for e in evals:
-                total += (e.reliability + e.quality_of_work + e.initiative + e.teamwork + e.communication) / 5
-            avg = total / len(evals)
-            if avg < threshold:
-                needs_attention.append({
-                    'volunteer': vol,
-                    'average_rating': round(avg, 2),
-                    'evaluation_count': len(evals)
-                })
+    needs_attention = get_volunteer_aggregates(
+        min_evaluations=min_evaluations,
+        having=lambda count, avg: avg < threshold
+    )
     
     # Sort by average rating ascending (worst first)
     needs_attention.sort(key=lambda x: x['average_rating'])
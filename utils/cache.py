@@ -0,0 +1,157 @@
+"""
+In-process analytics result cache
+
+Results are keyed by function, arguments and the shared data version
+(utils.conditional), which every transaction that writes app data bumps in
+the database. Each gunicorn worker keeps its own cache, but all of them see
+the same version, so an entry computed before any worker's write is never
+served after it, and never under an ETag that claims newer data.
+ANALYTICS_CACHE_TTL only bounds memory held by entries nobody asks for.
+
+One cached value is handed to every thread that asks for it, so cached
+functions must return plain data (dicts, lists, tuples, numbers, strings)
+rather than ORM instances, which belong to a single session. Callers must
+not modify the values they get back.
+"""
+import functools
+import threading
+import time
+from collections import OrderedDict
+from models import db
+from utils.conditional import get_data_version
+
+
+class AnalyticsCache:
+    """Thread-safe LRU cache with an entry limit and optional TTL"""
+
+    config_prefix = 'ANALYTICS_CACHE'
+
+    def __init__(self, max_entries=512, ttl=300):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.enabled = True
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        """Read size/TTL limits from the app config"""
+        prefix = self.config_prefix
+        self.max_entries = app.config.get(f'{prefix}_MAX_ENTRIES', self.max_entries)
+        self.ttl = app.config.get(f'{prefix}_TTL', self.ttl)
+        self.enabled = app.config.get(f'{prefix}_ENABLED', True)
+        self.clear()
+
+    def get(self, key):
+        """Return (found, value) for a key, refreshing its LRU position"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                value, stored_at = entry
+                if not self.ttl or time.monotonic() - stored_at < self.ttl:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return True, value
+                del self._entries[key]
+            self.misses += 1
+            return False, None
+
+    def set(self, key, value):
+        with self._lock:
+            self._entries[key] = (value, time.monotonic())
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        """Counters for monitoring"""
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'max_entries': self.max_entries,
+                'hits': self.hits,
+                'misses': self.misses
+            }
+
+
+class FragmentCache(AnalyticsCache):
+    """Rendered HTML fragments keyed by (panel, variant, data version)
+
+    Keeps hit/miss counters per panel on top of the overall ones.
+    """
+
+    config_prefix = 'FRAGMENT_CACHE'
+
+    def __init__(self, max_entries=64, ttl=300):
+        super().__init__(max_entries=max_entries, ttl=ttl)
+        self.panel_counters = {}
+
+    def render(self, panel, variant, version, render):
+        """Return the cached fragment, calling render() to build it on a miss"""
+        if not self.enabled or version is None:
+            return render()
+
+        found, html = self.get((panel, variant, version))
+        with self._lock:
+            counters = self.panel_counters.setdefault(panel, {'hits': 0, 'misses': 0})
+            counters['hits' if found else 'misses'] += 1
+        if found:
+            return html
+
+        html = render()
+        self.set((panel, variant, version), html)
+        return html
+
+    def clear(self):
+        super().clear()
+        with self._lock:
+            self.panel_counters = {}
+
+    def stats(self):
+        stats = super().stats()
+        with self._lock:
+            stats['panels'] = {panel: dict(counters) for panel, counters in self.panel_counters.items()}
+        return stats
+
+
+analytics_cache = AnalyticsCache()
+fragment_cache = FragmentCache()
+
+def _check_plain(value):
+    """Raise TypeError if a result contains ORM instances (see module docstring)"""
+    if isinstance(value, db.Model):
+        raise TypeError(f'Cached analytics must return plain data, not {type(value).__name__} instances')
+    if isinstance(value, dict):
+        for item in value.values():
+            _check_plain(item)
+    elif isinstance(value, (list, tuple, set)):
+        for item in value:
+            _check_plain(item)
+
+def cached_analytics(func):
+    """Cache a function's result per (arguments, data version)"""
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        data_version = get_data_version() if analytics_cache.enabled else None
+        if data_version is None:
+            return func(*args, **kwargs)
+
+        key = (func.__module__, func.__qualname__, args, tuple(sorted(kwargs.items())), data_version[0])
+        try:
+            found, value = analytics_cache.get(key)
+        except TypeError:
+            # Unhashable arguments - skip caching
+            return func(*args, **kwargs)
+        if found:
+            return value
+
+        value = func(*args, **kwargs)
+        _check_plain(value)
+        analytics_cache.set(key, value)
+        return value
+    return wrapper
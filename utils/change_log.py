@@ -0,0 +1,118 @@
+"""
+Change log for delta syncs
+
+Every flushed insert, update or delete of a Volunteer, Evaluation, Event
+or Role is collected during the transaction and appended to change_log
+just before it commits, so a rolled back change never shows up. Bulk
+UPDATE/DELETE statements are logged by selecting the affected ids before
+they run; bulk INSERTs must call record_changes with the new ids.
+
+/api/changes pages through the log by id, so ids must be handed out in
+commit order: a transaction that allocated a lower id but committed later
+would be skipped by a reader already past it. Entries are therefore only
+written at commit, under a lock held until the commit completes (a
+transaction-level advisory lock on PostgreSQL; SQLite writers already hold
+the database write lock). Only that final insert and the commit itself are
+serialized, not the rest of the transaction.
+"""
+from datetime import datetime
+from sqlalchemy import event, insert, select, text
+from sqlalchemy.orm import Session
+from models import db, ChangeLog, Volunteer, Evaluation, Event, Role
+
+TRACKED_ENTITIES = {
+    Volunteer: 'volunteer',
+    Evaluation: 'evaluation',
+    Event: 'event',
+    Role: 'role',
+}
+
+# pg_advisory_xact_lock key serializing change log appends
+CHANGE_LOG_LOCK_KEY = 7243012
+
+def _entity_name(obj):
+    for model, name in TRACKED_ENTITIES.items():
+        if isinstance(obj, model):
+            return name
+    return None
+
+def _collect(session, entries):
+    if entries:
+        session.info.setdefault('change_log', []).extend(entries)
+
+def record_changes(entity, ids, operation):
+    """Log changes made by statements that bypass the flush (bulk inserts)"""
+    _collect(db.session(), [(entity, entity_id, operation) for entity_id in ids])
+
+
+@event.listens_for(Session, 'after_flush')
+def _log_flush(session, flush_context):
+    entries = []
+    for obj in session.new:
+        entity = _entity_name(obj)
+        if entity:
+            entries.append((entity, obj.id, 'insert'))
+    for obj in session.dirty:
+        entity = _entity_name(obj)
+        if entity and session.is_modified(obj, include_collections=False):
+            entries.append((entity, obj.id, 'update'))
+    for obj in session.deleted:
+        entity = _entity_name(obj)
+        if entity:
+            entries.append((entity, obj.id, 'delete'))
+    _collect(session, entries)
+
+@event.listens_for(Session, 'do_orm_execute')
+def _log_bulk_write(orm_execute_state):
+    if not (orm_execute_state.is_update or orm_execute_state.is_delete):
+        return
+    mapper = orm_execute_state.bind_mapper
+    entity = TRACKED_ENTITIES.get(mapper.class_) if mapper is not None else None
+    if entity is None:
+        return
+
+    # Ids the statement is about to touch
+    statement = orm_execute_state.statement
+    ids = select(mapper.primary_key[0])
+    if statement.whereclause is not None:
+        ids = ids.where(statement.whereclause)
+    session = orm_execute_state.session
+    entity_ids = session.connection().execute(ids).scalars().all()
+
+    operation = 'update' if orm_execute_state.is_update else 'delete'
+    _collect(session, [(entity, entity_id, operation) for entity_id in entity_ids])
+
+@event.listens_for(Session, 'before_commit')
+def _write_log(session):
+    # Flush first so pending changes are collected by _log_flush
+    session.flush()
+    entries = session.info.pop('change_log', None)
+    if not entries:
+        return
+    connection = session.connection()
+    if connection.dialect.name == 'postgresql':
+        # Released when the transaction ends, after these ids are committed
+        connection.execute(text('SELECT pg_advisory_xact_lock(:key)'), {'key': CHANGE_LOG_LOCK_KEY})
+    now = datetime.utcnow()
+    connection.execute(insert(ChangeLog.__table__), [
+        {'entity': entity, 'entity_id': entity_id, 'operation': operation, 'changed_at': now}
+        for entity, entity_id, operation in entries
+    ])
+
+@event.listens_for(Session, 'after_rollback')
+def _reset_on_rollback(session):
+    session.info.pop('change_log', None)
+
+
+def get_changes_since(after_id=0, limit=500, entities=None):
+    """Log entries with id > after_id, oldest first; returns (changes, has_more)"""
+    query = ChangeLog.query.filter(ChangeLog.id > after_id)
+    if entities:
+        query = query.filter(ChangeLog.entity.in_(entities))
+
+    rows = query.order_by(ChangeLog.id).limit(limit + 1).all()
+    return rows[:limit], len(rows) > limit
+
+def get_latest_change_id():
+    """Id of the newest log entry (0 if none), for starting a sync at "now" """
+    return db.session.query(db.func.max(ChangeLog.id)).scalar() or 0
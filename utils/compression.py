@@ -0,0 +1,96 @@
+"""
+Response compression
+
+gzip/deflate-encodes responses for clients that accept it. Buffered
+responses are compressed only above COMPRESSION_MIN_SIZE bytes; streamed
+responses (exports) are compressed chunk by chunk as they are sent, so
+they stay streamed. Content that is already compressed, file downloads
+(which may be served as byte ranges) and event streams are left alone.
+"""
+import zlib
+from flask import request
+
+# Container window bits for zlib.compressobj
+ENCODINGS = {
+    'gzip': 31,
+    'deflate': 15,
+}
+
+SKIP_MIMETYPES = {
+    'application/gzip',
+    'application/x-gzip',
+    'application/zip',
+    'application/pdf',
+    'application/octet-stream',
+    'text/event-stream',  # Compressors buffer, which would delay live events
+    'font/woff',
+    'font/woff2',
+}
+SKIP_MIMETYPE_PREFIXES = ('image/', 'audio/', 'video/')
+COMPRESSIBLE_IMAGES = {'image/svg+xml'}
+
+def _is_compressible(mimetype):
+    if not mimetype or mimetype in SKIP_MIMETYPES:
+        return False
+    if mimetype in COMPRESSIBLE_IMAGES:
+        return True
+    return not mimetype.startswith(SKIP_MIMETYPE_PREFIXES)
+
+def _compress_stream(chunks, encoding, level):
+    compressor = zlib.compressobj(level, zlib.DEFLATED, ENCODINGS[encoding])
+    try:
+        for chunk in chunks:
+            data = compressor.compress(chunk)
+            if data:
+                yield data
+        yield compressor.flush()
+    finally:
+        if hasattr(chunks, 'close'):
+            chunks.close()
+
+def compress_response(response, min_size=500, level=6):
+    """Encode a response for the current request if worthwhile"""
+    if (
+        request.method == 'HEAD'
+        or response.status_code < 200
+        or response.status_code in (204, 206, 304)
+        or response.direct_passthrough
+        or 'Content-Encoding' in response.headers
+        or not _is_compressible(response.mimetype)
+    ):
+        return response
+
+    response.vary.add('Accept-Encoding')
+    encoding = request.accept_encodings.best_match(list(ENCODINGS))
+    if encoding is None:
+        return response
+
+    if response.is_streamed:
+        response.response = _compress_stream(response.iter_encoded(), encoding, level)
+        response.headers.pop('Content-Length', None)
+    else:
+        data = response.get_data()
+        if len(data) < min_size:
+            return response
+        compressor = zlib.compressobj(level, zlib.DEFLATED, ENCODINGS[encoding])
+        response.set_data(compressor.compress(data) + compressor.flush())
+
+    response.headers['Content-Encoding'] = encoding
+
+    # The encoded body is a different representation of the same resource
+    etag, weak = response.get_etag()
+    if etag and not weak:
+        response.set_etag(etag, weak=True)
+    return response
+
+def init_compression(app):
+    """Compress the app's responses according to its COMPRESSION_* config"""
+    @app.after_request
+    def compress(response):
+        if not app.config.get('COMPRESSION_ENABLED', True):
+            return response
+        return compress_response(
+            response,
+            min_size=app.config.get('COMPRESSION_MIN_SIZE', 500),
+            level=app.config.get('COMPRESSION_LEVEL', 6)
+        )
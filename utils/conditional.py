@@ -0,0 +1,179 @@
+"""
+Conditional HTTP responses (ETag / Last-Modified)
+
+A data_versions counter is bumped inside every transaction that writes app
+data, so all workers agree on it. Blueprints registered with
+register_conditional_responses answer signed-in GET requests whose
+validators still match with 304 Not Modified before the view runs, and tag
+full responses with ETag and Last-Modified.
+
+The bump's row lock is held until the transaction commits, so concurrent
+writers bumping the same row commit one at a time. The counter is
+therefore split over DATA_VERSION_SHARDS rows, each transaction bumps a
+random one, and the version is their sum. The bump is also the last
+statement before the commit, so the lock is held as briefly as possible.
+"""
+import hashlib
+import random
+from datetime import datetime, timezone
+from flask import request, session, g, current_app, has_app_context
+from flask_login import current_user
+from sqlalchemy import event, func, select, update
+from sqlalchemy.orm import Session
+from models import db, DataVersion, Volunteer, Evaluation, Event, Role, User
+# Registers its before_commit hook first, so the version bump runs after it
+import utils.change_log  # noqa: F401
+
+DATA_VERSION_NAME = 'data'
+DATA_VERSION_SHARDS = 8
+# The first shard keeps the original single row's name
+DATA_VERSION_NAMES = [DATA_VERSION_NAME] + [f'{DATA_VERSION_NAME}:{i}' for i in range(1, DATA_VERSION_SHARDS)]
+
+# Models whose writes change what dashboard/API pages render
+VERSIONED_MODELS = (Volunteer, Evaluation, Event, Role, User)
+
+def ensure_data_version():
+    """Create any data version shard rows that do not exist yet"""
+    existing = set(db.session.scalars(
+        select(DataVersion.name).where(DataVersion.name.in_(DATA_VERSION_NAMES))
+    ))
+    missing = [name for name in DATA_VERSION_NAMES if name not in existing]
+    if missing:
+        now = datetime.utcnow()
+        db.session.add_all(DataVersion(name=name, version=0, updated_at=now) for name in missing)
+        db.session.commit()
+        g.pop('data_version', None)
+
+def get_data_version():
+    """(version, updated_at) of the app data, or None if not initialised
+
+    Read once per app context (request) and again after this context
+    commits a write, so the ETag and the caches keyed on the version agree.
+    """
+    if 'data_version' not in g:
+        version, updated_at, shards = db.session.execute(
+            select(func.sum(DataVersion.version), func.max(DataVersion.updated_at), func.count())
+            .where(DataVersion.name.in_(DATA_VERSION_NAMES))
+        ).one()
+        g.data_version = (version, updated_at) if shards else None
+    return g.data_version
+
+
+# Bump the version in the same transaction as the write
+
+@event.listens_for(Session, 'after_flush')
+def _track_flush(session, flush_context):
+    changed = session.new | session.dirty | session.deleted
+    if any(isinstance(obj, VERSIONED_MODELS) for obj in changed):
+        session.info['data_version_dirty'] = True
+
+@event.listens_for(Session, 'do_orm_execute')
+def _track_bulk_write(orm_execute_state):
+    if orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete:
+        mapper = orm_execute_state.bind_mapper
+        if mapper is not None and issubclass(mapper.class_, VERSIONED_MODELS):
+            orm_execute_state.session.info['data_version_dirty'] = True
+
+@event.listens_for(Session, 'before_commit')
+def _bump_data_version(session):
+    # Flush first so pending changes are seen by _track_flush
+    session.flush()
+    if session.info.pop('data_version_dirty', False):
+        table = DataVersion.__table__
+        session.connection().execute(
+            update(table)
+            .where(table.c.name == random.choice(DATA_VERSION_NAMES))
+            .values(version=table.c.version + 1, updated_at=datetime.utcnow())
+        )
+        session.info['data_version_bumped'] = True
+
+@event.listens_for(Session, 'after_commit')
+def _forget_data_version(session):
+    if session.info.pop('data_version_bumped', False) and has_app_context():
+        g.pop('data_version', None)
+
+@event.listens_for(Session, 'after_rollback')
+def _reset_on_rollback(session):
+    session.info.pop('data_version_dirty', None)
+    session.info.pop('data_version_bumped', None)
+
+
+def _validators():
+    """(etag, last_modified) for the current request, or None to skip"""
+    data_version = get_data_version()
+    if data_version is None:
+        return None
+    version, updated_at = data_version
+
+    # Pages differ per user (nav, admin-only actions) and windowed stats
+    # move with the date, so both are part of the validator
+    today = datetime.utcnow().date()
+    user_key = f'{current_user.get_id()}:{current_user.role}'
+    raw = f'{version}|{user_key}|{today.isoformat()}'
+    etag = hashlib.sha1(raw.encode()).hexdigest()
+
+    midnight = datetime.combine(today, datetime.min.time())
+    last_modified = max(updated_at or midnight, midnight).replace(microsecond=0, tzinfo=timezone.utc)
+    return etag, last_modified
+
+def _is_not_modified(etag, last_modified):
+    if request.if_none_match:
+        # Weak comparison: compressed responses carry a weak ETag
+        return request.if_none_match.contains_weak(etag)
+    if request.if_modified_since:
+        return last_modified <= request.if_modified_since
+    return False
+
+def register_conditional_responses(blueprint, exempt=(), html=True):
+    """Enable ETag/Last-Modified handling for a blueprint's GET views
+
+    exempt: view function names whose output does not depend only on app
+    data (streams, job status, files with their own validators).
+    html: whether the views render pages that display flashed messages.
+    JSON blueprints pass False so a pending flash (e.g. from the login
+    form, which an API client never renders) does not disable 304s.
+    """
+    exempt_endpoints = {f'{blueprint.name}.{name}' for name in exempt}
+
+    def applies():
+        return (
+            current_app.config.get('CONDITIONAL_RESPONSES_ENABLED', True)
+            and request.method in ('GET', 'HEAD')
+            and request.endpoint not in exempt_endpoints
+            # A full render is needed to display pending flash messages
+            and not (html and '_flashes' in session)
+            # Let the view's login check redirect anonymous requests
+            and current_user.is_authenticated
+        )
+
+    @blueprint.before_request
+    def check_not_modified():
+        if not applies():
+            return None
+        validators = _validators()
+        if validators is None:
+            return None
+        g.conditional_validators = validators
+        etag, last_modified = validators
+        if _is_not_modified(etag, last_modified):
+            response = current_app.response_class(status=304)
+            response.set_etag(etag)
+            response.last_modified = last_modified
+            response.headers['Cache-Control'] = 'private, no-cache'
+            response.vary.add('Cookie')
+            return response
+        return None
+
+    @blueprint.after_request
+    def add_validators(response):
+        validators = g.pop('conditional_validators', None)
+        if validators is None or response.status_code != 200 or response.is_streamed:
+            return response
+        etag, last_modified = validators
+        if not response.get_etag()[0]:
+            response.set_etag(etag)
+        if response.last_modified is None:
+            response.last_modified = last_modified
+        response.headers.setdefault('Cache-Control', 'private, no-cache')
+        response.vary.add('Cookie')
+        return response
@@ -0,0 +1,191 @@
+"""
+Daily evaluation buckets for windowed dashboard statistics
+
+evaluation_daily_stats holds per-day sums and counts, bucketed both by
+submission date and by evaluation date. New evaluations are added with an
+atomic upsert; deletions recompute just the affected days. Windowed
+averages are then a range read over at most a few hundred bucket rows.
+"""
+from models import db, Evaluation, EvaluationDailyStats
+from utils.rollups import upsert_insert_for
+from sqlalchemy import func, select, case, insert, delete, literal, and_, or_
+from datetime import datetime, timedelta
+
+CORE_METRICS = EvaluationDailyStats.CORE_METRICS
+BASES = EvaluationDailyStats.BASES
+
+# Keys used in the stats API response for each metric
+METRIC_KEYS = {
+    'reliability': 'reliability',
+    'communication': 'communication',
+    'teamwork': 'teamwork',
+    'initiative': 'initiative',
+    'quality_of_work': 'quality',
+}
+
+MAX_WINDOW_DAYS = 3650
+
+def _table():
+    return EvaluationDailyStats.__table__
+
+def _day_expression(basis):
+    if basis == 'submitted':
+        return func.date(Evaluation.submitted_at)
+    return func.coalesce(Evaluation.evaluation_date, Evaluation.date_of_service)
+
+def _evaluation_day(evaluation, basis):
+    if basis == 'submitted':
+        return evaluation.submitted_at.date() if evaluation.submitted_at else None
+    return evaluation.evaluation_date or evaluation.date_of_service
+
+def _bucket_select(basis):
+    """Grouped select producing bucket rows for one basis"""
+    day = _day_expression(basis)
+    overall = (Evaluation.reliability + Evaluation.quality_of_work + Evaluation.initiative +
+               Evaluation.teamwork + Evaluation.communication) / 5.0
+
+    columns = [literal(basis), day, func.count(Evaluation.id)]
+    names = ['basis', 'day', 'evaluation_count']
+    for metric in CORE_METRICS:
+        column = getattr(Evaluation, metric)
+        columns.extend([func.coalesce(func.sum(column), 0), func.count(column)])
+        names.extend([f'{metric}_sum', f'{metric}_count'])
+    columns.extend([func.coalesce(func.sum(overall), 0), func.count(overall)])
+    names.extend(['overall_sum', 'overall_count'])
+
+    return names, select(*columns).where(day.isnot(None)).group_by(day)
+
+def add_evaluation_to_daily_stats(evaluation):
+    """Add a newly inserted evaluation to its day buckets"""
+    db.session.flush()
+    table = _table()
+
+    deltas = {'evaluation_count': 1}
+    for metric in CORE_METRICS:
+        value = getattr(evaluation, metric)
+        deltas[f'{metric}_sum'] = value or 0
+        deltas[f'{metric}_count'] = 1 if value is not None else 0
+    scores = [getattr(evaluation, m) for m in CORE_METRICS]
+    if None not in scores:
+        deltas['overall_sum'] = sum(scores) / 5.0
+        deltas['overall_count'] = 1
+    else:
+        deltas['overall_sum'] = 0
+        deltas['overall_count'] = 0
+
+    dialect_insert = upsert_insert_for(db.session.get_bind().dialect.name)
+    for basis in BASES:
+        day = _evaluation_day(evaluation, basis)
+        if day is None:
+            continue
+        if dialect_insert is not None:
+            stmt = dialect_insert(table).values(basis=basis, day=day, **deltas)
+            stmt = stmt.on_conflict_do_update(
+                index_elements=['basis', 'day'],
+                set_={col: table.c[col] + stmt.excluded[col] for col in deltas}
+            )
+            db.session.execute(stmt)
+        else:
+            refresh_daily_stats({basis: [day]})
+
+def get_evaluation_days(query):
+    """Bucket days touched by the evaluations a query returns, per basis
+
+    Collect these before deleting evaluations, then pass the result to
+    refresh_daily_stats once they are gone.
+    """
+    days = {}
+    for basis in BASES:
+        day = _day_expression(basis)
+        rows = query.with_entities(day).distinct().all()
+        days[basis] = [row[0] for row in rows if row[0] is not None]
+    return days
+
+def refresh_daily_stats(days_by_basis):
+    """Recompute specific day buckets from the evaluations table"""
+    db.session.flush()
+    table = _table()
+
+    for basis, days in days_by_basis.items():
+        for day in days:
+            if isinstance(day, str):
+                day = datetime.strptime(day, '%Y-%m-%d').date()
+            if basis == 'submitted':
+                # Range condition rather than date(submitted_at) so an index can be used
+                start = datetime.combine(day, datetime.min.time())
+                day_filter = and_(Evaluation.submitted_at >= start,
+                                  Evaluation.submitted_at < start + timedelta(days=1))
+            else:
+                day_filter = or_(
+                    Evaluation.evaluation_date == day,
+                    and_(Evaluation.evaluation_date.is_(None), Evaluation.date_of_service == day)
+                )
+
+            names, source = _bucket_select(basis)
+            db.session.execute(delete(table).where(table.c.basis == basis, table.c.day == day))
+            db.session.execute(insert(table).from_select(names, source.where(day_filter)))
+
+def rebuild_daily_stats():
+    """Recompute every day bucket. Commits and returns the bucket count."""
+    table = _table()
+    db.session.execute(delete(table))
+    for basis in BASES:
+        names, source = _bucket_select(basis)
+        db.session.execute(insert(table).from_select(names, source))
+    db.session.commit()
+
+    return db.session.query(func.count()).select_from(table).scalar()
+
+def get_window_stats(windows, basis='submitted', today=None):
+    """Counts and averages for several trailing windows in one query
+
+    windows: iterable of day counts; each window covers the last N days
+    including today. Returns one dict per window, in the order given.
+    """
+    windows = [int(w) for w in windows]
+    if not windows or any(w < 1 or w > MAX_WINDOW_DAYS for w in windows):
+        raise ValueError(f'Windows must be between 1 and {MAX_WINDOW_DAYS} days')
+    if basis not in BASES:
+        raise ValueError(f'Unknown basis "{basis}" (expected one of {", ".join(BASES)})')
+
+    today = today or datetime.utcnow().date()
+    T = EvaluationDailyStats
+    starts = [today - timedelta(days=w - 1) for w in windows]
+
+    # Conditional aggregation: one SUM per window per column
+    fields = ['evaluation_count', 'overall_sum', 'overall_count']
+    for metric in CORE_METRICS:
+        fields.extend([f'{metric}_sum', f'{metric}_count'])
+
+    columns = []
+    for start in starts:
+        for field in fields:
+            columns.append(func.sum(case((T.day >= start, getattr(T, field)), else_=0)))
+
+    row = db.session.query(*columns).filter(
+        T.basis == basis,
+        T.day >= min(starts),
+        T.day <= today
+    ).one()
+
+    results = []
+    for i, days in enumerate(windows):
+        values = dict(zip(fields, row[i * len(fields):(i + 1) * len(fields)]))
+        values = {key: value or 0 for key, value in values.items()}
+
+        def average(total, count):
+            return round(float(total) / count, 2) if count else 0
+
+        averages = {'overall': average(values['overall_sum'], values['overall_count'])}
+        for metric, key in METRIC_KEYS.items():
+            averages[key] = average(values[f'{metric}_sum'], values[f'{metric}_count'])
+
+        results.append({
+            'period_days': days,
+            'basis': basis,
+            'start_date': starts[i].isoformat(),
+            'end_date': today.isoformat(),
+            'evaluation_count': int(values['evaluation_count']),
+            'averages': averages
+        })
+    return results
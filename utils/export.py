@@ -0,0 +1,166 @@
+"""
+Streaming evaluation export
+
+Builds the filtered export query and turns it into CSV or NDJSON text
+chunks (and optionally a gzip stream) batch by batch, so memory use stays
+flat no matter how many evaluations are exported.
+"""
+import csv
+import json
+import zlib
+from io import StringIO
+from datetime import datetime
+from models import Evaluation
+
+EXPORT_BATCH_SIZE = 1000
+
+EXPORT_HEADER = [
+    'Volunteer First Name',
+    'Volunteer Last Name',
+    'Evaluator Name',
+    'Event Name',
+    'Role Performed',
+    'Evaluation Date',
+    'Submitted At',
+    'Reliability',
+    'Communication',
+    'Teamwork',
+    'Initiative',
+    'Quality of Work',
+    'Overall Average',
+    'Strengths',
+    'Areas for Improvement',
+    'Additional Comments'
+]
+
+def _parse_date(value, name):
+    try:
+        return datetime.strptime(value, '%Y-%m-%d').date()
+    except ValueError:
+        raise ValueError(f'Invalid {name} "{value}" (expected YYYY-MM-DD)')
+
+def parse_since(value):
+    """Datetime from a since= parameter (YYYY-MM-DD or ISO datetime), or None"""
+    if not value:
+        return None
+    try:
+        return datetime.fromisoformat(value)
+    except ValueError:
+        raise ValueError(f'Invalid since "{value}" (expected YYYY-MM-DD or an ISO datetime)')
+
+def parse_export_filters(args):
+    """Read export filters from request args
+
+    Supports start_date/end_date (evaluation date, inclusive), event, role,
+    volunteer_id and evaluator. Raises ValueError on malformed values.
+    """
+    filters = {}
+
+    if args.get('start_date'):
+        filters['start_date'] = _parse_date(args['start_date'], 'start_date')
+    if args.get('end_date'):
+        filters['end_date'] = _parse_date(args['end_date'], 'end_date')
+    if args.get('event'):
+        filters['event'] = args['event'].strip()
+    if args.get('role'):
+        filters['role'] = args['role'].strip()
+    if args.get('evaluator'):
+        filters['evaluator'] = args['evaluator'].strip()
+    if args.get('volunteer_id'):
+        try:
+            filters['volunteer_id'] = int(args['volunteer_id'])
+        except ValueError:
+            raise ValueError(f'Invalid volunteer_id "{args["volunteer_id"]}"')
+
+    return filters
+
+def apply_evaluation_filters(query, filters):
+    """Restrict an Evaluation query (entity or column) to parsed filters"""
+    if 'start_date' in filters:
+        query = query.filter(Evaluation.evaluation_date >= filters['start_date'])
+    if 'end_date' in filters:
+        query = query.filter(Evaluation.evaluation_date <= filters['end_date'])
+    if 'event' in filters:
+        query = query.filter(Evaluation.event_name == filters['event'])
+    if 'role' in filters:
+        query = query.filter(Evaluation.role_performed == filters['role'])
+    if 'evaluator' in filters:
+        query = query.filter(Evaluation.evaluator_name == filters['evaluator'])
+    if 'volunteer_id' in filters:
+        query = query.filter(Evaluation.volunteer_id == filters['volunteer_id'])
+    return query
+
+def build_export_query(filters):
+    """Evaluations matching the export filters, newest first"""
+    query = Evaluation.query.options(*Evaluation.related_loader_options())
+    query = apply_evaluation_filters(query, filters)
+    return query.order_by(Evaluation.submitted_at.desc(), Evaluation.id.desc())
+
+def _export_row(eval):
+    overall = (eval.reliability + eval.communication + eval.teamwork +
+              eval.initiative + eval.quality_of_work) / 5.0
+
+    return [
+        eval.volunteer.first_name,
+        eval.volunteer.last_name,
+        eval.evaluator_name,
+        eval.event_name or '',
+        eval.role_performed or '',
+        eval.evaluation_date.strftime('%Y-%m-%d') if eval.evaluation_date else '',
+        eval.submitted_at.strftime('%Y-%m-%d %H:%M:%S'),
+        eval.reliability,
+        eval.communication,
+        eval.teamwork,
+        eval.initiative,
+        eval.quality_of_work,
+        f'{overall:.2f}',
+        eval.strengths or '',
+        eval.areas_for_improvement or '',
+        eval.additional_comments or ''
+    ]
+
+def iter_csv(query, batch_size=EXPORT_BATCH_SIZE):
+    """Yield CSV text in chunks of up to batch_size rows
+
+    Rows are fetched with yield_per, which uses a server-side cursor on
+    PostgreSQL, so only one batch is held in memory at a time.
+    """
+    buffer = StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(EXPORT_HEADER)
+
+    pending = 0
+    for eval in query.yield_per(batch_size):
+        writer.writerow(_export_row(eval))
+        pending += 1
+        if pending >= batch_size:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+            pending = 0
+
+    yield buffer.getvalue()
+
+def gzip_stream(chunks, level=6):
+    """Gzip-compress a stream of text chunks incrementally"""
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 31)  # 31 = gzip container
+    for chunk in chunks:
+        data = compressor.compress(chunk.encode('utf-8'))
+        if data:
+            yield data
+    yield compressor.flush()
+
+def stream_rows(query, batch_size=EXPORT_BATCH_SIZE):
+    """Iterate a query's rows through a server-side cursor, batch_size at a time"""
+    return query.yield_per(batch_size)
+
+def iter_ndjson(rows, serialize, batch_size=EXPORT_BATCH_SIZE):
+    """Yield newline-delimited JSON in chunks of up to batch_size rows"""
+    lines = []
+    for row in rows:
+        lines.append(json.dumps(serialize(row)))
+        if len(lines) >= batch_size:
+            yield '\n'.join(lines) + '\n'
+            lines = []
+    if lines:
+        yield '\n'.join(lines) + '\n'
@@ -0,0 +1,130 @@
+"""
+Background evaluation export jobs
+
+Large exports run on a small thread pool and are written to an artifacts
+directory instead of holding a gunicorn worker for the whole download. Job
+status lives in a JSON file next to the artifact, so any worker on the host
+can report on or serve a job started by another.
+"""
+import json
+import os
+import re
+import time
+import uuid
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from utils.export import build_export_query, iter_csv, gzip_stream
+
+JOB_ID_PATTERN = re.compile(r'^[0-9a-f]{32}$')
+
+_executor = None
+_executor_lock = threading.Lock()
+
+def _get_executor(app):
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=app.config.get('EXPORT_JOB_WORKERS', 2),
+                thread_name_prefix='export-job'
+            )
+        return _executor
+
+def get_artifacts_dir(app):
+    """Absolute path of the export artifacts directory (created if missing)"""
+    path = app.config.get('EXPORT_ARTIFACTS_DIR') or 'exports'
+    if not os.path.isabs(path):
+        path = os.path.join(app.root_path, path)
+    os.makedirs(path, exist_ok=True)
+    return path
+
+def _status_path(app, job_id):
+    return os.path.join(get_artifacts_dir(app), f'{job_id}.json')
+
+def _write_status(app, job):
+    path = _status_path(app, job['id'])
+    tmp_path = f'{path}.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump(job, f)
+    os.replace(tmp_path, path)
+
+def get_export_job(app, job_id):
+    """Job status dict, or None for unknown/malformed ids"""
+    if not JOB_ID_PATTERN.match(job_id or ''):
+        return None
+    try:
+        with open(_status_path(app, job_id)) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+def get_artifact_path(app, job):
+    return os.path.join(get_artifacts_dir(app), job['artifact'])
+
+def cleanup_expired_artifacts(app):
+    """Delete job files older than EXPORT_ARTIFACT_MAX_AGE seconds"""
+    max_age = app.config.get('EXPORT_ARTIFACT_MAX_AGE', 24 * 60 * 60)
+    cutoff = time.time() - max_age
+    directory = get_artifacts_dir(app)
+    for name in os.listdir(directory):
+        path = os.path.join(directory, name)
+        try:
+            if os.path.getmtime(path) < cutoff:
+                os.remove(path)
+        except OSError:
+            pass
+
+def _run_export_job(app, job, filters):
+    job['status'] = 'running'
+    job['started_at'] = datetime.utcnow().isoformat()
+    _write_status(app, job)
+
+    artifact_path = get_artifact_path(app, job)
+    tmp_path = f'{artifact_path}.part'
+    try:
+        with app.app_context():
+            chunks = iter_csv(build_export_query(filters))
+            if job['compressed']:
+                with open(tmp_path, 'wb') as f:
+                    for data in gzip_stream(chunks):
+                        f.write(data)
+            else:
+                with open(tmp_path, 'w', newline='', encoding='utf-8') as f:
+                    for text in chunks:
+                        f.write(text)
+        os.replace(tmp_path, artifact_path)
+
+        job['status'] = 'complete'
+        job['size'] = os.path.getsize(artifact_path)
+    except Exception as e:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        job['status'] = 'failed'
+        job['error'] = str(e)
+
+    job['finished_at'] = datetime.utcnow().isoformat()
+    _write_status(app, job)
+
+def start_export_job(app, filters, compressed=False, requested_by=None):
+    """Queue an export and return its initial status"""
+    cleanup_expired_artifacts(app)
+
+    job_id = uuid.uuid4().hex
+    extension = 'csv.gz' if compressed else 'csv'
+    job = {
+        'id': job_id,
+        'status': 'queued',
+        'compressed': compressed,
+        'filters': {key: str(value) for key, value in filters.items()},
+        'requested_by': requested_by,
+        'created_at': datetime.utcnow().isoformat(),
+        'artifact': f'{job_id}.{extension}',
+        'filename': f'evaluations_{datetime.now().strftime("%Y%m%d_%H%M%S")}.{extension}',
+        'size': None,
+        'error': None
+    }
+    _write_status(app, job)
+
+    _get_executor(app).submit(_run_export_job, app, dict(job), filters)
+    return job
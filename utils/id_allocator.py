@@ -0,0 +1,132 @@
+"""
+Evaluation id allocation
+
+EVAL-xxxxx numbers come from a PostgreSQL sequence, or elsewhere (SQLite)
+from an id_counters row bumped with an atomic UPDATE. Like a sequence,
+numbers are allocated in their own short transaction: they are never
+handed out twice, but a rolled back submission leaves a gap.
+
+With EVALUATION_ID_BLOCK_SIZE > 1 each worker process reserves numbers a
+block at a time and hands them out from memory, so most submissions need
+no allocation round trip at all. Numbers then follow allocation order
+per worker rather than submission order across workers.
+"""
+import os
+import threading
+from collections import deque
+from flask import current_app
+from sqlalchemy import func, select, update, insert, text
+from models import db, Evaluation, IdCounter
+
+EVALUATION_COUNTER = 'evaluation'
+EVALUATION_SEQUENCE = 'evaluation_number_seq'
+
+_block_lock = threading.Lock()
+_block = {'pid': None, 'numbers': deque()}
+
+def format_evaluation_id(number):
+    return f'EVAL-{number:05d}'
+
+def _uses_sequence():
+    return db.engine.dialect.name == 'postgresql'
+
+def _highest_existing_number(connection):
+    """Largest number already used by an evaluation id (or row id)"""
+    # Longest id first: EVAL-100000 sorts before EVAL-99999 as text
+    latest = connection.execute(
+        select(Evaluation.evaluation_id)
+        .where(Evaluation.evaluation_id.like('EVAL-%'))
+        .order_by(func.length(Evaluation.evaluation_id).desc(), Evaluation.evaluation_id.desc())
+        .limit(1)
+    ).scalar()
+    highest = connection.execute(select(func.max(Evaluation.id))).scalar() or 0
+    try:
+        highest = max(highest, int(latest.split('-', 1)[1])) if latest else highest
+    except ValueError:
+        pass
+    return highest
+
+def ensure_evaluation_counter():
+    """Create the sequence/counter and move it past any existing evaluation id"""
+    with db.engine.begin() as connection:
+        highest = _highest_existing_number(connection)
+        if _uses_sequence():
+            connection.execute(text(f'CREATE SEQUENCE IF NOT EXISTS {EVALUATION_SEQUENCE}'))
+            if highest:
+                connection.execute(text(
+                    f'SELECT setval(:name, GREATEST(:highest, (SELECT last_value FROM {EVALUATION_SEQUENCE})))'
+                ), {'name': EVALUATION_SEQUENCE, 'highest': highest})
+            return
+
+        table = IdCounter.__table__
+        exists = connection.execute(
+            select(table.c.name).where(table.c.name == EVALUATION_COUNTER)
+        ).scalar()
+        if exists is None:
+            connection.execute(insert(table).values(name=EVALUATION_COUNTER, value=highest))
+        else:
+            connection.execute(
+                update(table)
+                .where(table.c.name == EVALUATION_COUNTER, table.c.value < highest)
+                .values(value=highest)
+            )
+
+def _allocate(count):
+    """Reserve count numbers in a separate, immediately committed transaction"""
+    if _uses_sequence():
+        with db.engine.begin() as connection:
+            return list(connection.execute(
+                text(f"SELECT nextval('{EVALUATION_SEQUENCE}') FROM generate_series(1, :count)"),
+                {'count': count}
+            ).scalars())
+
+    table = IdCounter.__table__
+    for attempt in range(2):
+        with db.engine.begin() as connection:
+            # The UPDATE takes the write lock, so the read below sees our increment
+            result = connection.execute(
+                update(table)
+                .where(table.c.name == EVALUATION_COUNTER)
+                .values(value=table.c.value + count)
+            )
+            if result.rowcount:
+                last = connection.execute(
+                    select(table.c.value).where(table.c.name == EVALUATION_COUNTER)
+                ).scalar()
+                return list(range(last - count + 1, last + 1))
+        ensure_evaluation_counter()
+    raise RuntimeError('Evaluation id counter is missing')
+
+def allocate_evaluation_numbers(count=1):
+    """count unused evaluation numbers"""
+    block_size = current_app.config.get('EVALUATION_ID_BLOCK_SIZE', 1)
+    if count != 1 or block_size <= 1:
+        return _allocate(count)
+
+    with _block_lock:
+        # A forked worker must not reuse its parent's block
+        if _block['pid'] != os.getpid():
+            _block['pid'] = os.getpid()
+            _block['numbers'] = deque()
+        if not _block['numbers']:
+            _block['numbers'].extend(_allocate(block_size))
+        return [_block['numbers'].popleft()]
+
+def next_evaluation_id():
+    """Allocate one EVAL-xxxxx id"""
+    return format_evaluation_id(allocate_evaluation_numbers(1)[0])
+
+def peek_next_evaluation_number():
+    """Number the next allocation will start from (ignores worker blocks)"""
+    with db.engine.connect() as connection:
+        if _uses_sequence():
+            last_value, is_called = connection.execute(
+                text(f'SELECT last_value, is_called FROM {EVALUATION_SEQUENCE}')
+            ).one()
+            return last_value + 1 if is_called else last_value
+
+        table = IdCounter.__table__
+        value = connection.execute(
+            select(table.c.value).where(table.c.name == EVALUATION_COUNTER)
+        ).scalar()
+        return (value if value is not None else _highest_existing_number(connection)) + 1
@@ -0,0 +1,230 @@
+"""
+Bulk evaluation ingestion
+
+Validates a list of evaluation dicts (e.g. paper forms keyed in after an
+event), finds duplicates with one set-based query (the submission index
+catches any that race in), numbers the new evaluations in a single block
+and inserts them with one multi-row INSERT per batch.
+
+Each batch is committed in its own transaction together with the rollups
+and daily buckets of the volunteers and days it touched (refreshed once
+per batch rather than per row), so a failing batch is rolled back on its
+own and never leaves evaluations without their totals. (Per-batch
+savepoints inside one transaction would not be atomic on SQLite.)
+"""
+import json
+from datetime import datetime
+from sqlalchemy import insert
+from models import db, Volunteer, Evaluation
+from utils.rollups import refresh_rollups
+from utils.daily_stats import refresh_daily_stats
+from utils.change_log import record_changes
+from utils.id_allocator import allocate_evaluation_numbers, format_evaluation_id
+from utils.submissions import conflict_insert, normalize_submission_key
+
+INGEST_BATCH_SIZE = 500
+MAX_INGEST_ROWS = 5000
+
+REQUIRED_RATINGS = ['reliability', 'quality_of_work', 'initiative', 'teamwork', 'communication']
+OPTIONAL_RATINGS = ['models_the_work', 'enthusiasm_to_serve_again']
+TEXT_FIELDS = {
+    'event_name': 100,
+    'role_performed': 100,
+    'evaluator_name': 100,
+    'evaluator_email': 120,
+    'evaluator_role': 100,
+    'would_work_again': 50,
+    'strengths': None,
+    'areas_for_improvement': None,
+    'additional_comments': None,
+    'recommended_roles': None,
+}
+
+def parse_ingest_body(data, content_type):
+    """List of evaluation dicts from a JSON array or NDJSON request body
+
+    A JSON object with an "evaluations" list is accepted as well. Raises
+    ValueError if the body cannot be parsed.
+    """
+    text = data.decode('utf-8') if isinstance(data, bytes) else data
+    if 'ndjson' in (content_type or '') or 'jsonlines' in (content_type or ''):
+        rows = []
+        for number, line in enumerate(text.splitlines(), 1):
+            if not line.strip():
+                continue
+            try:
+                rows.append(json.loads(line))
+            except ValueError:
+                raise ValueError(f'Line {number} is not valid JSON')
+    else:
+        try:
+            rows = json.loads(text)
+        except ValueError:
+            raise ValueError('Request body is not valid JSON')
+        if isinstance(rows, dict):
+            rows = rows.get('evaluations')
+        if not isinstance(rows, list):
+            raise ValueError('Expected a JSON array of evaluations')
+
+    if len(rows) > MAX_INGEST_ROWS:
+        raise ValueError(f'At most {MAX_INGEST_ROWS} evaluations can be ingested per request')
+    return rows
+
+def _validate_row(row, today):
+    """(values, errors) for one submitted evaluation"""
+    if not isinstance(row, dict):
+        return None, ['Expected a JSON object']
+
+    errors = []
+    values = {}
+
+    try:
+        values['volunteer_id'] = int(row.get('volunteer_id'))
+    except (TypeError, ValueError):
+        errors.append('volunteer_id is required and must be an integer')
+
+    for name in REQUIRED_RATINGS + OPTIONAL_RATINGS:
+        value = row.get(name)
+        if value in (None, ''):
+            if name in REQUIRED_RATINGS:
+                errors.append(f'{name} is required')
+            continue
+        try:
+            value = int(value)
+        except (TypeError, ValueError):
+            errors.append(f'{name} must be an integer')
+            continue
+        if not 1 <= value <= 10:
+            errors.append(f'{name} must be between 1 and 10')
+            continue
+        values[name] = value
+
+    for name, max_length in TEXT_FIELDS.items():
+        value = row.get(name)
+        if value is None:
+            continue
+        value = str(value).strip()
+        if max_length and len(value) > max_length:
+            errors.append(f'{name} must be at most {max_length} characters')
+            continue
+        values[name] = value or None
+
+    if not values.get('evaluator_name'):
+        errors.append('evaluator_name is required')
+
+    evaluation_date = row.get('evaluation_date')
+    if evaluation_date:
+        try:
+            values['evaluation_date'] = datetime.strptime(str(evaluation_date), '%Y-%m-%d').date()
+        except ValueError:
+            errors.append('evaluation_date must be YYYY-MM-DD')
+    else:
+        values['evaluation_date'] = today
+
+    return values, errors
+
+def _existing_keys(candidates):
+    """Submission keys already stored, from one query over the candidates"""
+    volunteer_ids = {v['volunteer_id'] for v in candidates}
+    dates = {v['evaluation_date'] for v in candidates}
+    rows = db.session.query(*Evaluation.submission_key()).filter(
+        Evaluation.volunteer_id.in_(volunteer_ids),
+        Evaluation.evaluation_date.in_(dates)
+    ).all()
+    return {tuple(row) for row in rows}
+
+def _store_batch(stmt, batch, now):
+    """Insert one batch with its rollups and daily buckets and commit it
+
+    Returns {evaluation_id: id} of the rows inserted. Raises on failure;
+    the caller rolls back.
+    """
+    created = db.session.execute(
+        stmt.returning(Evaluation.id, Evaluation.evaluation_id),
+        [values for _, values in batch]
+    ).all()
+    record_changes('evaluation', [id for id, _ in created], 'insert')
+
+    ids = {evaluation_id: id for id, evaluation_id in created}
+    inserted = [values for _, values in batch if values['evaluation_id'] in ids]
+    if inserted:
+        refresh_rollups({values['volunteer_id'] for values in inserted})
+        refresh_daily_stats({
+            'submitted': [now.date()],
+            'evaluation': sorted({values['evaluation_date'] for values in inserted})
+        })
+    db.session.commit()
+    return ids
+
+def ingest_evaluations(rows, batch_size=INGEST_BATCH_SIZE):
+    """Validate, de-duplicate and insert evaluations; commits once per batch
+
+    Returns one result dict per input row, in order, with a status of
+    'created', 'duplicate', 'invalid' or 'error'.
+    """
+    today = datetime.utcnow().date()
+    results = [None] * len(rows)
+    valid = []
+
+    for index, row in enumerate(rows):
+        values, errors = _validate_row(row, today)
+        if errors:
+            results[index] = {'index': index, 'status': 'invalid', 'errors': errors}
+        else:
+            valid.append((index, values))
+
+    # Unknown volunteers - one IN query
+    if valid:
+        volunteer_ids = {values['volunteer_id'] for _, values in valid}
+        known = {vid for (vid,) in db.session.query(Volunteer.id).filter(Volunteer.id.in_(volunteer_ids))}
+        remaining = []
+        for index, values in valid:
+            if values['volunteer_id'] in known:
+                remaining.append((index, values))
+            else:
+                results[index] = {'index': index, 'status': 'invalid',
+                                  'errors': [f'Volunteer {values["volunteer_id"]} does not exist']}
+        valid = remaining
+
+    # Duplicates - against stored evaluations and earlier rows of this request
+    pending = []
+    if valid:
+        seen = _existing_keys([values for _, values in valid])
+        for index, values in valid:
+            key = normalize_submission_key(values)
+            if key in seen:
+                results[index] = {'index': index, 'status': 'duplicate'}
+            else:
+                seen.add(key)
+                pending.append((index, values))
+
+    if pending:
+        now = datetime.utcnow()
+        numbers = allocate_evaluation_numbers(len(pending))
+        for number, (index, values) in zip(numbers, pending):
+            values['evaluation_id'] = format_evaluation_id(number)
+            values['date_of_service'] = today
+            values['submitted_at'] = now
+
+        # Skips rows a concurrent submission stored after the check above
+        stmt = conflict_insert()
+        if stmt is None:
+            stmt = insert(Evaluation)
+        for start in range(0, len(pending), batch_size):
+            batch = pending[start:start + batch_size]
+            try:
+                ids = _store_batch(stmt, batch, now)
+            except Exception as e:
+                db.session.rollback()
+                for index, values in batch:
+                    results[index] = {'index': index, 'status': 'error', 'error': str(e.__cause__ or e)}
+                continue
+            for index, values in batch:
+                if values['evaluation_id'] not in ids:
+                    results[index] = {'index': index, 'status': 'duplicate'}
+                    continue
+                results[index] = {'index': index, 'status': 'created', 'id': ids[values['evaluation_id']],
+                                  'evaluation_id': values['evaluation_id']}
+
+    db.session.commit()
+    return results
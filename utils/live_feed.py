@@ -0,0 +1,188 @@
+"""
+Live dashboard feed (server-sent events)
+
+One in-process publisher per worker fans events out to the dashboards
+connected to it; each dashboard holds one text/event-stream connection
+instead of polling. Events are encoded once and shared by all subscribers.
+
+Submissions publish their new-evaluation events after they commit, to the
+worker that stored them. Updated aggregates come from a sync thread in
+each worker that checks the shared data version every
+LIVE_FEED_SYNC_INTERVAL seconds (and straight away after a local commit),
+so every worker's dashboards see totals from all workers and a burst of
+submissions costs one aggregate query per worker rather than one each.
+
+Every open stream holds a worker thread, so each worker accepts at most
+LIVE_FEED_MAX_SUBSCRIBERS streams and answers the rest with 503; the
+dashboard then falls back to polling.
+"""
+import json
+import os
+import queue
+import threading
+import time
+from flask import current_app
+from models import Evaluation, Volunteer
+from utils.daily_stats import get_window_stats
+from utils.conditional import get_data_version
+
+SUBSCRIBER_QUEUE_SIZE = 100
+
+_sync = {'pid': None, 'thread': None, 'wake': threading.Event()}
+_sync_lock = threading.Lock()
+
+class LiveFeedPublisher:
+    """Fan-out of encoded SSE messages to subscriber queues"""
+
+    def __init__(self, max_subscribers=None):
+        self.max_subscribers = max_subscribers
+        self._subscribers = set()
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        self.max_subscribers = app.config.get('LIVE_FEED_MAX_SUBSCRIBERS', self.max_subscribers)
+
+    def subscribe(self):
+        """New subscriber queue, or None if max_subscribers are connected"""
+        subscriber = queue.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+        with self._lock:
+            if self.max_subscribers and len(self._subscribers) >= self.max_subscribers:
+                return None
+            self._subscribers.add(subscriber)
+        return subscriber
+
+    def unsubscribe(self, subscriber):
+        with self._lock:
+            self._subscribers.discard(subscriber)
+
+    def is_subscribed(self, subscriber):
+        with self._lock:
+            return subscriber in self._subscribers
+
+    @property
+    def subscriber_count(self):
+        with self._lock:
+            return len(self._subscribers)
+
+    def publish(self, event, data):
+        """Send an event to every subscriber; returns how many received it"""
+        message = encode_event(event, data)
+        with self._lock:
+            subscribers = list(self._subscribers)
+
+        delivered = 0
+        for subscriber in subscribers:
+            try:
+                subscriber.put_nowait(message)
+                delivered += 1
+            except queue.Full:
+                # Client stopped reading - drop it, EventSource will reconnect
+                self.unsubscribe(subscriber)
+        return delivered
+
+
+live_feed = LiveFeedPublisher()
+
+def encode_event(event, data):
+    """Format one server-sent event"""
+    return f'event: {event}\ndata: {json.dumps(data)}\n\n'
+
+def stream_events(subscriber, heartbeat_interval=15, max_duration=None):
+    """Yield SSE messages for one subscriber until it is dropped
+
+    Sends a comment line every heartbeat_interval seconds so proxies keep
+    the connection open. max_duration seconds after the stream started it
+    ends and the browser reconnects, which frees the worker thread
+    periodically.
+    """
+    deadline = time.monotonic() + max_duration if max_duration is not None else None
+    try:
+        yield 'retry: 5000\n\n'
+        while live_feed.is_subscribed(subscriber):
+            timeout = heartbeat_interval
+            if deadline is not None:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                timeout = min(timeout, remaining)
+            try:
+                message = subscriber.get(timeout=timeout)
+            except queue.Empty:
+                yield ': keep-alive\n\n'
+                continue
+            yield message
+    finally:
+        live_feed.unsubscribe(subscriber)
+
+def _evaluation_event(evaluation):
+    overall = (evaluation.reliability + evaluation.quality_of_work + evaluation.initiative +
+               evaluation.teamwork + evaluation.communication) / 5.0
+    return {
+        'id': evaluation.id,
+        'volunteer_id': evaluation.volunteer_id,
+        'volunteer_name': f'{evaluation.volunteer.first_name} {evaluation.volunteer.last_name}',
+        'evaluation_date': evaluation.evaluation_date.isoformat() if evaluation.evaluation_date else None,
+        'submitted_at': evaluation.submitted_at.isoformat() if evaluation.submitted_at else None,
+        'event_name': evaluation.event_name,
+        'role_performed': evaluation.role_performed,
+        'evaluator_name': evaluation.evaluator_name,
+        'evaluator_role': evaluation.evaluator_role,
+        'would_work_again': evaluation.would_work_again,
+        'overall': round(overall, 2)
+    }
+
+def _aggregate_event():
+    return {
+        'total_evaluations': Evaluation.query.count(),
+        'total_volunteers': Volunteer.query.filter_by(status='active').count(),
+        'last_30_days': get_window_stats([30])[0]
+    }
+
+def publish_evaluations_submitted(evaluations):
+    """Publish committed evaluations; the sync thread follows with aggregates
+
+    Does nothing when no dashboard is connected. Errors are logged rather
+    than raised: the evaluations are already saved at this point.
+    """
+    if not live_feed.subscriber_count:
+        return
+    for evaluation in evaluations:
+        try:
+            live_feed.publish('evaluation', _evaluation_event(evaluation))
+        except Exception:
+            current_app.logger.exception('Failed to publish evaluation %s to the live feed', evaluation.id)
+    _sync['wake'].set()
+
+def publish_evaluation_submitted(evaluation):
+    """Publish one committed evaluation (see publish_evaluations_submitted)"""
+    publish_evaluations_submitted([evaluation])
+
+def _run_sync(app):
+    interval = app.config.get('LIVE_FEED_SYNC_INTERVAL', 5)
+    wake = _sync['wake']
+    last_version = None
+    while True:
+        wake.wait(interval)
+        wake.clear()
+        if not live_feed.subscriber_count:
+            last_version = None
+            continue
+        try:
+            with app.app_context():
+                version = get_data_version()
+                if version != last_version:
+                    live_feed.publish('aggregate', _aggregate_event())
+                    last_version = version
+        except Exception:
+            app.logger.exception('Live feed aggregate sync failed')
+
+def start_sync(app):
+    """Start this worker's aggregate sync thread (once per process)"""
+    with _sync_lock:
+        # A forked worker does not inherit its parent's thread
+        if _sync['pid'] == os.getpid() and _sync['thread'].is_alive():
+            return
+        thread = threading.Thread(target=_run_sync, args=(app,), name='live-feed-sync', daemon=True)
+        _sync['pid'] = os.getpid()
+        _sync['thread'] = thread
+        thread.start()
@@ -0,0 +1,44 @@
+"""
+Keyset (cursor) pagination helpers
+
+A cursor is an opaque token holding the sort key of the last row a client
+has seen. The next page is fetched with a WHERE on that key instead of an
+OFFSET, so every page costs the same no matter how deep it is and rows
+inserted meanwhile do not shift page boundaries.
+"""
+import base64
+import json
+from datetime import datetime
+from sqlalchemy import and_, or_
+
+def encode_cursor(values):
+    """Opaque cursor token for a row's sort key values"""
+    raw = json.dumps([v.isoformat() if isinstance(v, datetime) else v for v in values])
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+def decode_cursor(token, types):
+    """Sort key values from a cursor token
+
+    types: one converter per key column (datetime for ISO timestamps).
+    Raises ValueError for malformed or tampered tokens.
+    """
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        if not isinstance(values, list) or len(values) != len(types):
+            raise ValueError
+        return [datetime.fromisoformat(v) if t is datetime else t(v) for v, t in zip(values, types)]
+    except (ValueError, TypeError, UnicodeDecodeError):
+        raise ValueError(f'Invalid cursor "{token}"')
+
+def keyset_condition(columns, values, descending=True):
+    """WHERE clause selecting rows after a key in (columns...) order
+
+    Spelled out as nested OR/AND rather than a row-value comparison so it
+    works on every backend and can use an index on the leading column.
+    """
+    conditions = []
+    for i, (column, value) in enumerate(zip(columns, values)):
+        after = column < value if descending else column > value
+        conditions.append(and_(*[c == v for c, v in zip(columns[:i], values[:i])], after))
+    return or_(*conditions)
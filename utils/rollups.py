@@ -0,0 +1,212 @@
+"""Incremental maintenance of the volunteer_score_rollups table
+
+Each helper only adds statements to the current session; the caller's
+commit (or rollback) applies them together with the evaluation change.
+"""
+from models import db, Evaluation, VolunteerScoreRollup
+from sqlalchemy import func, select, case, insert, update, delete
+from datetime import datetime
+
+METRICS = VolunteerScoreRollup.METRICS
+CORE_METRICS = VolunteerScoreRollup.CORE_METRICS
+WORK_AGAIN_ANSWERS = VolunteerScoreRollup.WORK_AGAIN_ANSWERS
+
+def _table():
+    return VolunteerScoreRollup.__table__
+
+def _evaluation_date(evaluation):
+    """Date an evaluation counts towards for last_evaluation_date"""
+    return evaluation.evaluation_date or evaluation.date_of_service
+
+def _deltas(evaluation, sign):
+    """Column increments contributed by one evaluation (sign=1 add, -1 remove)"""
+    deltas = {'evaluation_count': sign}
+    for metric in METRICS:
+        value = getattr(evaluation, metric)
+        deltas[f'{metric}_sum'] = sign * (value or 0)
+        # 0 means "not rated", as in the columnar snapshot
+        deltas[f'{metric}_count'] = sign if value else 0
+    answer = evaluation.would_work_again or ''
+    for prefix, column in WORK_AGAIN_ANSWERS.items():
+        deltas[column] = sign if answer.startswith(prefix) else 0
+    return deltas
+
+def _overall_expression(table):
+    """SQL expression for the mean of the 5 core category averages"""
+    averages = [
+        func.coalesce(table.c[f'{m}_sum'] * 1.0 / func.nullif(table.c[f'{m}_count'], 0), 0)
+        for m in CORE_METRICS
+    ]
+    total = averages[0]
+    for avg in averages[1:]:
+        total = total + avg
+    return case((table.c.evaluation_count > 0, total / len(CORE_METRICS)), else_=None)
+
+def _refresh_overall(volunteer_id=None):
+    table = _table()
+    stmt = update(table).values(overall_average=_overall_expression(table))
+    if volunteer_id is not None:
+        stmt = stmt.where(table.c.volunteer_id == volunteer_id)
+    db.session.execute(stmt)
+
+def upsert_insert_for(dialect_name):
+    """Dialect insert construct supporting ON CONFLICT, or None if unsupported"""
+    if dialect_name == 'postgresql':
+        from sqlalchemy.dialects.postgresql import insert as dialect_insert
+    elif dialect_name == 'sqlite':
+        from sqlalchemy.dialects.sqlite import insert as dialect_insert
+    else:
+        return None
+    return dialect_insert
+
+def record_evaluation_added(evaluation):
+    """Add a newly inserted evaluation to its volunteer's rollup"""
+    db.session.flush()
+    table = _table()
+    deltas = _deltas(evaluation, 1)
+    eval_date = _evaluation_date(evaluation)
+    now = datetime.utcnow()
+
+    dialect_insert = upsert_insert_for(db.session.get_bind().dialect.name)
+    if dialect_insert is not None:
+        # Atomic increment so concurrent submissions never lose an update
+        stmt = dialect_insert(table).values(
+            volunteer_id=evaluation.volunteer_id,
+            last_evaluation_date=eval_date,
+            updated_at=now,
+            **deltas
+        )
+        last_date = table.c.last_evaluation_date
+        new_date = stmt.excluded.last_evaluation_date
+        set_ = {col: table.c[col] + stmt.excluded[col] for col in deltas}
+        set_['last_evaluation_date'] = case(
+            (last_date.is_(None), new_date),
+            (new_date > last_date, new_date),
+            else_=last_date
+        )
+        set_['updated_at'] = now
+        db.session.execute(stmt.on_conflict_do_update(index_elements=['volunteer_id'], set_=set_))
+    else:
+        rollup = db.session.get(VolunteerScoreRollup, evaluation.volunteer_id, with_for_update=True)
+        if rollup is None:
+            rollup = VolunteerScoreRollup(volunteer_id=evaluation.volunteer_id, last_evaluation_date=eval_date,
+                                          **deltas)
+            db.session.add(rollup)
+        else:
+            for col, delta in deltas.items():
+                setattr(rollup, col, getattr(rollup, col) + delta)
+            if eval_date and (rollup.last_evaluation_date is None or eval_date > rollup.last_evaluation_date):
+                rollup.last_evaluation_date = eval_date
+        db.session.flush()
+
+    _refresh_overall(evaluation.volunteer_id)
+
+def record_evaluation_removed(evaluation):
+    """Remove a deleted evaluation from its volunteer's rollup
+
+    Call after db.session.delete(evaluation) so the last evaluation date is
+    recomputed without it.
+    """
+    db.session.flush()
+    table = _table()
+    volunteer_id = evaluation.volunteer_id
+    deltas = _deltas(evaluation, -1)
+
+    last_date = select(
+        func.max(func.coalesce(Evaluation.evaluation_date, Evaluation.date_of_service))
+    ).where(Evaluation.volunteer_id == volunteer_id).scalar_subquery()
+
+    values = {col: table.c[col] + delta for col, delta in deltas.items()}
+    values['last_evaluation_date'] = last_date
+    values['updated_at'] = datetime.utcnow()
+    db.session.execute(update(table).where(table.c.volunteer_id == volunteer_id).values(**values))
+
+    # Drop rollups for volunteers left with no evaluations
+    db.session.execute(delete(table).where(
+        table.c.volunteer_id == volunteer_id,
+        table.c.evaluation_count <= 0
+    ))
+    _refresh_overall(volunteer_id)
+
+def remove_volunteer_rollup(volunteer_id):
+    """Delete a volunteer's rollup along with the volunteer"""
+    table = _table()
+    db.session.execute(delete(table).where(table.c.volunteer_id == volunteer_id))
+
+def get_volunteer_rollup(volunteer_id):
+    """Primary-key lookup of a volunteer's rollup (None if never evaluated)"""
+    return db.session.get(VolunteerScoreRollup, volunteer_id)
+
+def _rollup_source():
+    """Grouped select producing rollup rows from the evaluations table"""
+    columns = [
+        Evaluation.volunteer_id,
+        func.count(Evaluation.id),
+    ]
+    names = ['volunteer_id', 'evaluation_count']
+    for metric in METRICS:
+        column = getattr(Evaluation, metric)
+        columns.extend([func.coalesce(func.sum(column), 0), func.count(func.nullif(column, 0))])
+        names.extend([f'{metric}_sum', f'{metric}_count'])
+    for prefix, column in WORK_AGAIN_ANSWERS.items():
+        columns.append(func.coalesce(func.sum(case((Evaluation.would_work_again.like(f'{prefix}%'), 1), else_=0)), 0))
+        names.append(column)
+    columns.extend([
+        func.max(func.coalesce(Evaluation.evaluation_date, Evaluation.date_of_service)),
+        func.current_timestamp()
+    ])
+    names.extend(['last_evaluation_date', 'updated_at'])
+
+    return names, select(*columns).group_by(Evaluation.volunteer_id)
+
+def compute_volunteer_rollup(volunteer_id):
+    """Unsaved rollup computed from the evaluations table with one grouped query
+
+    For volunteers whose evaluations were written outside the app and have
+    no rollup row yet. Returns None if the volunteer has no evaluations.
+    """
+    names, source = _rollup_source()
+    row = db.session.execute(source.where(Evaluation.volunteer_id == volunteer_id)).first()
+    if row is None:
+        return None
+    rollup = VolunteerScoreRollup(**dict(zip(names, row)))
+    averages = [rollup.get_metric_average(m) or 0 for m in CORE_METRICS]
+    rollup.overall_average = sum(averages) / len(CORE_METRICS)
+    return rollup
+
+def refresh_rollups(volunteer_ids):
+    """Recompute several volunteers' rollups with set-based statements
+
+    Used after bulk inserts, where per-evaluation increments would cost a
+    statement per row. Does not commit.
+    """
+    volunteer_ids = list(volunteer_ids)
+    if not volunteer_ids:
+        return
+    table = _table()
+    names, source = _rollup_source()
+    db.session.execute(delete(table).where(table.c.volunteer_id.in_(volunteer_ids)))
+    db.session.execute(insert(table).from_select(
+        names, source.where(Evaluation.volunteer_id.in_(volunteer_ids))
+    ))
+    db.session.execute(update(table).where(table.c.volunteer_id.in_(volunteer_ids))
+                       .values(overall_average=_overall_expression(table)))
+
+def rebuild_rollups(volunteer_id=None):
+    """Recompute rollups (all, or one volunteer's) from the evaluations table
+
+    Commits and returns the number of rollup rows rebuilt.
+    """
+    table = _table()
+    names, source = _rollup_source()
+    clear = delete(table)
+    if volunteer_id is not None:
+        source = source.where(Evaluation.volunteer_id == volunteer_id)
+        clear = clear.where(table.c.volunteer_id == volunteer_id)
+
+    db.session.execute(clear)
+    result = db.session.execute(insert(table).from_select(names, source))
+    _refresh_overall(volunteer_id)
+    db.session.commit()
+
+    return result.rowcount
@@ -0,0 +1,183 @@
+"""
+Cached volunteer roster for the public evaluation form and name search
+
+The form's volunteer dropdown is built once into a RosterSnapshot holding
+the rendered <option> list and the JSON served to the form, so rendering
+the form only needs the data version lookup. The snapshot also keeps a
+sorted index of normalised first, last and full names for prefix
+(typeahead) search, answered with a binary search instead of a LIKE '%q%'
+scan. Each worker keeps its own copy, stamped with the shared data version
+(utils.conditional) it was built at; once any worker commits a write the
+version moves on and the next get() rebuilds it, so every worker sees new,
+renamed and removed volunteers straight away.
+"""
+import json
+import threading
+import time
+import unicodedata
+from bisect import bisect_left
+from markupsafe import Markup, escape
+from models import db, Volunteer
+from utils.conditional import get_data_version
+
+ACTIVE_STATUS = 'active'
+
+DEFAULT_SEARCH_LIMIT = 10
+MAX_SEARCH_LIMIT = 50
+
+
+def normalize_name(text):
+    """Lower-cased name without accents or repeated spaces, for matching"""
+    text = text or ''
+    if not text.isascii():
+        text = unicodedata.normalize('NFKD', text)
+        text = ''.join(c for c in text if not unicodedata.combining(c))
+    return ' '.join(text.lower().split())
+
+
+class RosterSnapshot:
+    """Active volunteers plus their pre-rendered representations and a name index"""
+
+    def __init__(self, rows, data_version=None):
+        # rows: (id, first_name, last_name, status) tuples sorted by last, first name
+        self.data_version = data_version
+        self.names = {id: (first_name, last_name, status) for id, first_name, last_name, status in rows}
+        # (id, first_name, last_name) of active volunteers, in the same order
+        volunteers = [(id, first_name, last_name) for id, first_name, last_name, status in rows
+                      if status == ACTIVE_STATUS]
+        self.volunteers = volunteers
+        self.ids = frozenset(id for id, _, _ in volunteers)
+        self.options_html = Markup(''.join(
+            f'<option value="{id}">{escape(first_name)} {escape(last_name)}</option>'
+            for id, first_name, last_name in volunteers
+        ))
+        self.json = json.dumps([
+            {'id': id, 'first_name': first_name, 'last_name': last_name, 'name': f'{first_name} {last_name}'}
+            for id, first_name, last_name in volunteers
+        ])
+
+        # Sorted (key, id) pairs: first name, last name, "first last" and "last first"
+        keys = set()
+        for id, first_name, last_name, _ in rows:
+            first, last = normalize_name(first_name), normalize_name(last_name)
+            for key in (first, last, f'{first} {last}', f'{last} {first}'):
+                if key:
+                    keys.add((key, id))
+        self._name_keys = sorted(keys)
+        self.built_at = time.monotonic()
+
+    def search(self, query, limit=DEFAULT_SEARCH_LIMIT, status=ACTIVE_STATUS):
+        """Ids of volunteers with a name starting with query, best matches first
+
+        Only volunteers with the given status are returned (any status if
+        None); limit=None returns every match. Matches are ordered by the
+        matching name key, so "smi" lists every Smith before Smithson.
+        """
+        prefix = normalize_name(query)
+        if not prefix:
+            return []
+        ids = []
+        seen = set()
+        keys = self._name_keys
+        position = bisect_left(keys, (prefix,))
+        while position < len(keys) and keys[position][0].startswith(prefix):
+            id = keys[position][1]
+            position += 1
+            if id in seen or (status is not None and self.names[id][2] != status):
+                continue
+            seen.add(id)
+            ids.append(id)
+            if limit and len(ids) >= limit:
+                break
+        return ids
+
+
+class RosterCache:
+    """Holds the current RosterSnapshot, rebuilding it after volunteer changes"""
+
+    def __init__(self, ttl=300):
+        self.ttl = ttl
+        self.enabled = True
+        self.builds = 0
+        self._snapshot = None
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        self.ttl = app.config.get('ROSTER_CACHE_TTL', self.ttl)
+        self.enabled = app.config.get('ROSTER_CACHE_ENABLED', True)
+        self.invalidate()
+
+    def _fresh(self, snapshot, data_version):
+        return (snapshot is not None and data_version is not None
+                and snapshot.data_version == data_version
+                and (not self.ttl or time.monotonic() - snapshot.built_at < self.ttl))
+
+    def _build(self, data_version=None):
+        rows = db.session.query(
+            Volunteer.id, Volunteer.first_name, Volunteer.last_name, Volunteer.status
+        ).order_by(Volunteer.last_name, Volunteer.first_name).all()
+        return RosterSnapshot([tuple(row) for row in rows], data_version)
+
+    def get(self):
+        """Current snapshot, building it if missing, expired or older than the data version"""
+        if not self.enabled:
+            return self._build()
+        current = get_data_version()
+        data_version = current[0] if current else None
+        snapshot = self._snapshot
+        if self._fresh(snapshot, data_version):
+            return snapshot
+
+        with self._lock:
+            # Another thread may have rebuilt it while we waited
+            if self._fresh(self._snapshot, data_version):
+                return self._snapshot
+            snapshot = self._build(data_version)
+            self.builds += 1
+            # Keep the newest; a thread on an older request may build after us
+            if self._snapshot is None or (data_version or 0) >= (self._snapshot.data_version or 0):
+                self._snapshot = snapshot
+            return snapshot
+
+    def invalidate(self):
+        self._snapshot = None
+
+    def stats(self):
+        snapshot = self._snapshot
+        return {
+            'cached': snapshot is not None,
+            'data_version': snapshot.data_version if snapshot else None,
+            'volunteers': len(snapshot.volunteers) if snapshot else None,
+            'name_keys': len(snapshot._name_keys) if snapshot else None,
+            'builds': self.builds
+        }
+
+
+roster_cache = RosterCache()
+
+def get_roster():
+    """Active volunteers for the evaluation form (a RosterSnapshot)"""
+    return roster_cache.get()
+
+def parse_search_limit(value):
+    """Typeahead result limit from a request arg; raises ValueError"""
+    if value in (None, ''):
+        return DEFAULT_SEARCH_LIMIT
+    try:
+        limit = int(value)
+    except ValueError:
+        raise ValueError(f'Invalid limit "{value}"')
+    if not 1 <= limit <= MAX_SEARCH_LIMIT:
+        raise ValueError(f'limit must be between 1 and {MAX_SEARCH_LIMIT}')
+    return limit
+
+def search_volunteers(query, limit=DEFAULT_SEARCH_LIMIT, status=ACTIVE_STATUS):
+    """[{'id', 'first_name', 'last_name', 'name', 'status'}] whose names start with query"""
+    snapshot = roster_cache.get()
+    results = []
+    for id in snapshot.search(query, limit, status):
+        first_name, last_name, status = snapshot.names[id]
+        results.append({'id': id, 'first_name': first_name, 'last_name': last_name,
+                        'name': f'{first_name} {last_name}', 'status': status})
+    return results
+
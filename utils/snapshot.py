@@ -0,0 +1,148 @@
+"""
+Columnar analytics snapshot
+
+Loads every evaluation's ratings once into contiguous NumPy arrays and
+computes per-volunteer statistics for all volunteers with vectorized
+group-by operations instead of per-volunteer queries and Python loops.
+"""
+import numpy as np
+from datetime import datetime
+from sqlalchemy import select, func
+from models import db, Evaluation
+
+# Column order of the ratings matrix; the first 5 make up the overall rating
+SNAPSHOT_METRICS = ['reliability', 'quality_of_work', 'initiative', 'teamwork', 'communication',
+                    'models_the_work', 'enthusiasm_to_serve_again']
+CORE_METRIC_COUNT = 5
+
+# Output keys used by the profile stats' average_by_category
+CATEGORY_COLUMNS = {
+    'reliability': SNAPSHOT_METRICS.index('reliability'),
+    'communication': SNAPSHOT_METRICS.index('communication'),
+    'teamwork': SNAPSHOT_METRICS.index('teamwork'),
+    'initiative': SNAPSHOT_METRICS.index('initiative'),
+    'quality': SNAPSHOT_METRICS.index('quality_of_work'),
+}
+
+
+class EvaluationSnapshot:
+    """All evaluation ratings held as column arrays (one row per evaluation)
+
+    volunteer_ids: int64, evaluation_dates / submitted_at: datetime64[us]
+    (NaT when missing), ratings: int8 matrix in SNAPSHOT_METRICS order with
+    0 meaning "not rated".
+    """
+
+    def __init__(self, volunteer_ids, evaluation_dates, submitted_at, ratings):
+        self.volunteer_ids = volunteer_ids
+        self.evaluation_dates = evaluation_dates
+        self.submitted_at = submitted_at
+        self.ratings = ratings
+
+    def __len__(self):
+        return len(self.volunteer_ids)
+
+    @classmethod
+    def load(cls, batch_size=50000):
+        """Read all evaluations in batches into preallocated arrays"""
+        total = db.session.query(func.count(Evaluation.id)).scalar() or 0
+
+        volunteer_ids = np.empty(total, dtype=np.int64)
+        evaluation_dates = np.empty(total, dtype='datetime64[us]')
+        submitted_at = np.empty(total, dtype='datetime64[us]')
+        ratings = np.empty((total, len(SNAPSHOT_METRICS)), dtype=np.int8)
+
+        stmt = select(
+            Evaluation.volunteer_id,
+            Evaluation.evaluation_date,
+            Evaluation.submitted_at,
+            *[func.coalesce(getattr(Evaluation, m), 0) for m in SNAPSHOT_METRICS]
+        ).order_by(Evaluation.id).execution_options(yield_per=batch_size)
+
+        offset = 0
+        for batch in db.session.execute(stmt).partitions():
+            # Rows added since the count was taken are left for the next snapshot
+            batch = batch[:total - offset]
+            if not batch:
+                break
+            end = offset + len(batch)
+            columns = list(zip(*batch))
+            volunteer_ids[offset:end] = columns[0]
+            evaluation_dates[offset:end] = np.array(columns[1], dtype='datetime64[us]')
+            submitted_at[offset:end] = np.array(columns[2], dtype='datetime64[us]')
+            ratings[offset:end] = np.array(columns[3:], dtype=np.int8).T
+            offset = end
+
+        return cls(volunteer_ids[:offset], evaluation_dates[:offset], submitted_at[:offset], ratings[:offset])
+
+    def volunteer_stats(self, now=None):
+        """Statistics for every evaluated volunteer, keyed by volunteer id
+
+        Each value has the shape of the volunteer profile's stats, without
+        work_again_summary.
+        """
+        if len(self) == 0:
+            return {}
+
+        now = np.datetime64(now or datetime.utcnow(), 'us')
+        volunteers, group = np.unique(self.volunteer_ids, return_inverse=True)
+        size = len(volunteers)
+        counts = np.bincount(group, minlength=size)
+
+        # Per-metric means over rated (non-zero) values
+        rated = self.ratings > 0
+        metric_means = np.empty((size, len(SNAPSHOT_METRICS)))
+        for col in range(len(SNAPSHOT_METRICS)):
+            sums = np.bincount(group, weights=self.ratings[:, col], minlength=size)
+            rated_counts = np.bincount(group, weights=rated[:, col], minlength=size)
+            metric_means[:, col] = np.divide(sums, rated_counts, out=np.zeros(size), where=rated_counts > 0)
+        average_overall = metric_means[:, :CORE_METRIC_COUNT].mean(axis=1)
+
+        # Overall rating of each evaluation (mean of its rated core categories)
+        core = self.ratings[:, :CORE_METRIC_COUNT]
+        core_rated = rated[:, :CORE_METRIC_COUNT].sum(axis=1)
+        evaluation_overall = np.divide(core.sum(axis=1, dtype=np.float64), core_rated,
+                                       out=np.zeros(len(self)), where=core_rated > 0)
+
+        # Trend: older half vs recent half of each volunteer's evaluations by date
+        sort_dates = np.where(np.isnat(self.evaluation_dates), self.submitted_at, self.evaluation_dates)
+        order = np.lexsort((sort_dates, group))
+        sorted_group = group[order]
+        starts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+        position = np.arange(len(self)) - starts[sorted_group]
+        older = position < (counts // 2)[sorted_group]
+        sorted_overall = evaluation_overall[order]
+        older_counts = np.bincount(sorted_group, weights=older, minlength=size)
+        older_avg = np.bincount(sorted_group, weights=sorted_overall * older, minlength=size) / np.maximum(older_counts, 1)
+        recent_half_avg = (np.bincount(sorted_group, weights=sorted_overall * ~older, minlength=size)
+                           / np.maximum(counts - older_counts, 1))
+
+        # Recent performance (last 30 days)
+        recent = self.submitted_at >= now - np.timedelta64(30, 'D')
+        recent_counts = np.bincount(group, weights=recent, minlength=size).astype(np.int64)
+        recent_sums = np.bincount(group, weights=evaluation_overall * recent, minlength=size)
+
+        stats = {}
+        for i, volunteer_id in enumerate(volunteers.tolist()):
+            trend = None
+            if counts[i] >= 4:
+                if recent_half_avg[i] > older_avg[i]:
+                    trend = 'improving'
+                elif recent_half_avg[i] < older_avg[i]:
+                    trend = 'declining'
+                else:
+                    trend = 'stable'
+
+            recent_performance = recent_sums[i] / recent_counts[i] if recent_counts[i] else None
+
+            stats[volunteer_id] = {
+                'evaluation_count': int(counts[i]),
+                'average_overall': round(float(average_overall[i]), 2),
+                'average_by_category': {
+                    key: round(float(metric_means[i, col]), 2) for key, col in CATEGORY_COLUMNS.items()
+                },
+                'trend': trend,
+                'recent_performance': round(float(recent_performance), 2) if recent_performance else None,
+                'recent_evaluation_count': int(recent_counts[i])
+            }
+        return stats
@@ -0,0 +1,306 @@
+"""
+Write-behind queue for evaluation form submissions
+
+With SUBMISSION_QUEUE_ENABLED the public form validates a submission,
+appends it to a local SQLite journal (WAL mode, fsync on commit) and
+returns straight away instead of waiting on the main database's write
+lock. A background thread in each worker claims queued submissions in
+batches and commits each batch in one transaction. If the batch fails it
+is rolled back and its submissions are stored one transaction each, so
+one bad submission does not hold back the rest. No savepoints are used:
+pysqlite commits on RELEASE SAVEPOINT unless the driver workaround is
+installed, which would break the batch's atomicity.
+
+A submission only leaves the journal once its transaction has committed.
+If a worker dies between the commit and the journal update, the rows are
+claimed again after SUBMISSION_QUEUE_CLAIM_TIMEOUT and the unique
+submission index turns the replay into duplicates, so nothing is stored
+twice. Duplicates are kept as 'duplicate' and submissions that fail
+SUBMISSION_QUEUE_MAX_ATTEMPTS times as 'failed', for admins to review,
+retry or discard.
+"""
+import json
+import os
+import sqlite3
+import threading
+import time
+from datetime import date, datetime
+from flask import current_app
+from models import db
+from utils.id_allocator import allocate_evaluation_numbers, format_evaluation_id
+from utils.rollups import record_evaluation_added
+from utils.daily_stats import add_evaluation_to_daily_stats
+from utils.live_feed import publish_evaluations_submitted
+from utils.submissions import insert_evaluation
+
+DATE_FIELDS = ['date_of_service', 'evaluation_date']
+DATETIME_FIELDS = ['submitted_at']
+
+DUPLICATE_ERROR = 'Duplicate of an existing evaluation'
+
+_flusher = {'pid': None, 'thread': None, 'wake': threading.Event()}
+_flusher_lock = threading.Lock()
+
+def get_queue_path(app):
+    """Absolute path of the journal database (directory created if missing)"""
+    path = app.config.get('SUBMISSION_QUEUE_PATH') or 'instance/submission_queue.db'
+    if not os.path.isabs(path):
+        path = os.path.join(app.root_path, path)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    return path
+
+def _connect(app):
+    connection = sqlite3.connect(get_queue_path(app), timeout=30, isolation_level=None)
+    connection.execute('PRAGMA journal_mode=WAL')
+    connection.execute('PRAGMA synchronous=FULL')
+    connection.execute('''
+        CREATE TABLE IF NOT EXISTS queued_submissions (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            payload TEXT NOT NULL,
+            status TEXT NOT NULL DEFAULT 'pending',
+            attempts INTEGER NOT NULL DEFAULT 0,
+            error TEXT,
+            queued_at REAL NOT NULL,
+            claimed_at REAL
+        )
+    ''')
+    return connection
+
+def _encode(values):
+    return json.dumps({
+        name: value.isoformat() if isinstance(value, (date, datetime)) else value
+        for name, value in values.items()
+    })
+
+def _decode(payload):
+    values = json.loads(payload)
+    for name in DATE_FIELDS:
+        if values.get(name):
+            values[name] = date.fromisoformat(values[name])
+    for name in DATETIME_FIELDS:
+        if values.get(name):
+            values[name] = datetime.fromisoformat(values[name])
+    return values
+
+def queue_enabled(app=None):
+    return (app or current_app).config.get('SUBMISSION_QUEUE_ENABLED', False)
+
+def enqueue_submissions(rows):
+    """Durably append validated submissions in one journal transaction"""
+    app = current_app._get_current_object()
+    now = time.time()
+    connection = _connect(app)
+    try:
+        connection.execute('BEGIN IMMEDIATE')
+        connection.executemany(
+            'INSERT INTO queued_submissions (payload, queued_at) VALUES (?, ?)',
+            [(_encode(values), now) for values in rows]
+        )
+        connection.execute('COMMIT')
+    finally:
+        connection.close()
+    _flusher['wake'].set()
+
+def enqueue_submission(values):
+    """Durably append one validated submission"""
+    enqueue_submissions([values])
+
+def _claim(app, limit):
+    """Mark up to limit pending (or abandoned) submissions as claimed"""
+    now = time.time()
+    stale = now - app.config.get('SUBMISSION_QUEUE_CLAIM_TIMEOUT', 300)
+    connection = _connect(app)
+    try:
+        connection.execute('BEGIN IMMEDIATE')
+        rows = connection.execute(
+            "SELECT id, payload, attempts FROM queued_submissions "
+            "WHERE status = 'pending' OR (status = 'claimed' AND claimed_at < ?) "
+            "ORDER BY id LIMIT ?",
+            (stale, limit)
+        ).fetchall()
+        connection.executemany(
+            "UPDATE queued_submissions SET status = 'claimed', claimed_at = ?, attempts = attempts + 1 WHERE id = ?",
+            [(now, row[0]) for row in rows]
+        )
+        connection.execute('COMMIT')
+    finally:
+        connection.close()
+    return [(queue_id, payload, attempts + 1) for queue_id, payload, attempts in rows]
+
+def _settle(app, done, duplicates, failed):
+    """Delete stored submissions, keep duplicates and record errors for the others"""
+    max_attempts = app.config.get('SUBMISSION_QUEUE_MAX_ATTEMPTS', 5)
+    connection = _connect(app)
+    try:
+        connection.execute('BEGIN IMMEDIATE')
+        connection.executemany('DELETE FROM queued_submissions WHERE id = ?', [(i,) for i in done])
+        connection.executemany(
+            "UPDATE queued_submissions SET status = 'duplicate', error = ?, claimed_at = NULL WHERE id = ?",
+            [(DUPLICATE_ERROR, i) for i in duplicates]
+        )
+        connection.executemany(
+            "UPDATE queued_submissions SET status = CASE WHEN attempts >= ? THEN 'failed' ELSE 'pending' END, "
+            "error = ?, claimed_at = NULL WHERE id = ?",
+            [(max_attempts, error, queue_id) for queue_id, error in failed.items()]
+        )
+        connection.execute('COMMIT')
+    finally:
+        connection.close()
+
+def _store_batch(rows):
+    """Insert (queue_id, values) rows in one transaction and commit it
+
+    Returns ([(queue_id, evaluation)] created, [queue_id] duplicates).
+    Raises on failure; the caller rolls back.
+    """
+    created = []
+    duplicates = []
+    for queue_id, values in rows:
+        evaluation = insert_evaluation(values)
+        if evaluation is None:
+            duplicates.append(queue_id)
+            continue
+        record_evaluation_added(evaluation)
+        add_evaluation_to_daily_stats(evaluation)
+        created.append((queue_id, evaluation))
+    db.session.commit()
+    return created, duplicates
+
+def flush_submissions(app, batch_size=None):
+    """Commit one batch of queued submissions; returns how many were claimed
+
+    Needs an app context. Stored submissions leave the queue and duplicates
+    are kept as 'duplicate'; a submission that cannot be stored goes back
+    to pending with its error, or to failed after
+    SUBMISSION_QUEUE_MAX_ATTEMPTS tries.
+    """
+    batch_size = batch_size or app.config.get('SUBMISSION_QUEUE_BATCH_SIZE', 50)
+    claimed = _claim(app, batch_size)
+    if not claimed:
+        return 0
+
+    rows = []
+    failed = {}
+    numbers = allocate_evaluation_numbers(len(claimed))
+    for (queue_id, payload, _), number in zip(claimed, numbers):
+        try:
+            values = _decode(payload)
+        except ValueError as e:
+            failed[queue_id] = str(e)
+            continue
+        values['evaluation_id'] = format_evaluation_id(number)
+        rows.append((queue_id, values))
+
+    try:
+        created, duplicates = _store_batch(rows)
+    except Exception:
+        db.session.rollback()
+        app.logger.warning('Could not commit %d queued evaluation submissions together, '
+                           'storing them one at a time', len(rows), exc_info=True)
+        created, duplicates = [], []
+        for queue_id, values in rows:
+            try:
+                row_created, row_duplicates = _store_batch([(queue_id, values)])
+            except Exception as e:
+                db.session.rollback()
+                failed[queue_id] = str(e.__cause__ or e)
+                continue
+            created += row_created
+            duplicates += row_duplicates
+
+    # Only committed submissions are settled; anything else stays claimed
+    _settle(app, [queue_id for queue_id, _ in created], duplicates, failed)
+    if duplicates:
+        app.logger.warning('%d queued evaluation submissions were duplicates', len(duplicates))
+    if failed:
+        app.logger.error('%d queued evaluation submissions could not be stored', len(failed))
+    publish_evaluations_submitted([evaluation for _, evaluation in created])
+    return len(claimed)
+
+def _run_flusher(app):
+    interval = app.config.get('SUBMISSION_QUEUE_FLUSH_INTERVAL', 1.0)
+    batch_size = app.config.get('SUBMISSION_QUEUE_BATCH_SIZE', 50)
+    wake = _flusher['wake']
+    while True:
+        wake.wait(interval)
+        wake.clear()
+        try:
+            with app.app_context():
+                # Keep going while full batches come back
+                while flush_submissions(app, batch_size) == batch_size:
+                    pass
+        except Exception:
+            app.logger.exception('Submission queue flush failed')
+
+def start_flusher(app):
+    """Start this worker's background flusher (once per process)"""
+    with _flusher_lock:
+        # A forked worker does not inherit its parent's thread
+        if _flusher['pid'] == os.getpid() and _flusher['thread'].is_alive():
+            return
+        thread = threading.Thread(target=_run_flusher, args=(app,), name='submission-flusher', daemon=True)
+        _flusher['pid'] = os.getpid()
+        _flusher['thread'] = thread
+        thread.start()
+
+def get_queue_status(app, failed_limit=50):
+    """Counts per status, age of the oldest waiting submission and recent failures
+
+    failures lists both 'failed' and 'duplicate' submissions, newest first.
+    """
+    connection = _connect(app)
+    try:
+        counts = dict(connection.execute(
+            'SELECT status, COUNT(*) FROM queued_submissions GROUP BY status'
+        ).fetchall())
+        oldest = connection.execute(
+            "SELECT MIN(queued_at) FROM queued_submissions WHERE status IN ('pending', 'claimed')"
+        ).fetchone()[0]
+        failed = connection.execute(
+            "SELECT id, status, payload, attempts, error, queued_at FROM queued_submissions "
+            "WHERE status IN ('failed', 'duplicate') ORDER BY id DESC LIMIT ?",
+            (failed_limit,)
+        ).fetchall()
+    finally:
+        connection.close()
+
+    return {
+        'enabled': queue_enabled(app),
+        'pending': counts.get('pending', 0),
+        'claimed': counts.get('claimed', 0),
+        'failed': counts.get('failed', 0),
+        'duplicate': counts.get('duplicate', 0),
+        'oldest_waiting_seconds': round(time.time() - oldest, 1) if oldest else None,
+        'failures': [{
+            'id': queue_id,
+            'status': status,
+            'submission': json.loads(payload),
+            'attempts': attempts,
+            'error': error,
+            'queued_at': datetime.utcfromtimestamp(queued_at).isoformat()
+        } for queue_id, status, payload, attempts, error, queued_at in failed]
+    }
+
+def retry_failed(app, ids=None):
+    """Put failed submissions (all, or the given ids) back in the queue"""
+    connection = _connect(app)
+    try:
+        query = "UPDATE queued_submissions SET status = 'pending', attempts = 0 WHERE status = 'failed'"
+        if ids is None:
+            count = connection.execute(query).rowcount
+        else:
+            count = sum(connection.execute(f'{query} AND id = ?', (i,)).rowcount for i in ids)
+    finally:
+        connection.close()
+    _flusher['wake'].set()
+    return count
+
+def discard_failed(app, ids):
+    """Delete the given failed or duplicate submissions"""
+    connection = _connect(app)
+    try:
+        return sum(connection.execute(
+            "DELETE FROM queued_submissions WHERE status IN ('failed', 'duplicate') AND id = ?", (i,)
+        ).rowcount for i in ids)
+    finally:
+        connection.close()
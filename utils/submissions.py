@@ -0,0 +1,84 @@
+"""
+Duplicate-safe evaluation inserts
+
+A unique index on Evaluation.submission_key() (volunteer, normalised
+evaluator and event names, evaluation date) rejects duplicate
+submissions. Evaluations are inserted with ON CONFLICT DO NOTHING against
+it, so detecting a duplicate costs no extra query and two simultaneous
+submissions cannot both get in. Databases created before the index, where
+it could not be added because duplicates exist, fall back to checking
+before inserting.
+"""
+from flask import current_app
+from sqlalchemy import insert
+from sqlalchemy.schema import CreateIndex
+from sqlalchemy.exc import IntegrityError
+from models import db, Evaluation, evaluation_submission_index
+from utils.rollups import upsert_insert_for
+from utils.change_log import record_changes
+
+_index_available = None
+
+def normalize_submission_key(values):
+    """Python equivalent of Evaluation.submission_key() for a dict of evaluation values"""
+    return (
+        values.get('volunteer_id'),
+        (values.get('evaluator_name') or '').strip().lower(),
+        (values.get('event_name') or '').strip().lower(),
+        values.get('evaluation_date')
+    )
+
+def ensure_submission_index():
+    """Create the unique submission index if missing; returns whether it exists"""
+    global _index_available
+    # create_all only adds it along with a new evaluations table
+    try:
+        with db.engine.begin() as connection:
+            connection.execute(CreateIndex(evaluation_submission_index, if_not_exists=True))
+        _index_available = True
+    except IntegrityError:
+        current_app.logger.warning(
+            'Duplicate evaluations exist, so uq_evaluations_submission could not be created; '
+            'see migrations/012_add_evaluation_submission_index.sql'
+        )
+        _index_available = False
+    return _index_available
+
+def submission_index_available():
+    if _index_available is None:
+        ensure_submission_index()
+    return _index_available
+
+def _is_duplicate(values):
+    key = normalize_submission_key(values)
+    return db.session.query(Evaluation.id).filter(
+        *[column == value for column, value in zip(Evaluation.submission_key(), key)]
+    ).first() is not None
+
+def conflict_insert():
+    """INSERT statement for evaluations that skips duplicate submissions
+
+    Rows that conflict with the submission index are silently left out, so
+    callers can tell duplicates by what the statement returns. Returns None
+    when the database cannot do this (no index or no ON CONFLICT support).
+    """
+    dialect_insert = upsert_insert_for(db.session.get_bind().dialect.name)
+    if dialect_insert is None or not submission_index_available():
+        return None
+    return dialect_insert(Evaluation).on_conflict_do_nothing(index_elements=Evaluation.submission_key())
+
+def insert_evaluation(values):
+    """Insert one evaluation unless it duplicates an existing submission
+
+    Returns the new Evaluation, or None for a duplicate. Does not commit.
+    """
+    stmt = conflict_insert()
+    if stmt is None:
+        if _is_duplicate(values):
+            return None
+        stmt = insert(Evaluation)
+
+    evaluation = db.session.scalars(stmt.values(**values).returning(Evaluation)).first()
+    if evaluation is not None:
+        record_changes('evaluation', [evaluation.id], 'insert')
+    return evaluation